@@ -0,0 +1,63 @@
+from app.core.cache.base import CacheBackend
+from app.core.cache.memory import MemoryCacheBackend
+from app.core.cache.redis import RedisCacheBackend
+from app.core.cache.sqlite import SQLiteCacheBackend
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+__all__ = [
+    "CacheBackend",
+    "MemoryCacheBackend",
+    "RedisCacheBackend",
+    "SQLiteCacheBackend",
+    "get_cache_backend",
+    "close_cache_backend",
+]
+
+_backend: CacheBackend | None = None
+
+
+def create_cache_backend() -> CacheBackend:
+    """
+    Builds the cache backend selected by the CACHE_BACKEND environment variable.
+
+    - "sqlite" (default): file at CACHE_SQLITE_PATH, shared by all workers on the host
+    - "redis": server at REDIS_URL, shared by all workers and hosts
+    - "memory": per-process only, for development and tests
+    """
+    kind = os.getenv("CACHE_BACKEND", "sqlite").lower()
+    max_bytes = int(os.getenv("CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+    if kind == "sqlite":
+        path = os.getenv("CACHE_SQLITE_PATH", ".cache/gitdiagram.sqlite3")
+        return SQLiteCacheBackend(path, max_bytes=max_bytes)
+    if kind == "redis":
+        url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        return RedisCacheBackend(url, max_bytes=max_bytes)
+    if kind == "memory":
+        return MemoryCacheBackend(max_bytes=max_bytes)
+    raise ValueError(f"Unknown CACHE_BACKEND: {kind}. Use sqlite, redis or memory.")
+
+
+def get_cache_backend() -> CacheBackend:
+    """Returns the worker-wide cache backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        _backend = create_cache_backend()
+    return _backend
+
+
+def set_cache_backend(backend: CacheBackend | None):
+    """Replaces the worker-wide cache backend (e.g. in tests)."""
+    global _backend
+    _backend = backend
+
+
+async def close_cache_backend():
+    """Closes the worker-wide cache backend (called on app shutdown)."""
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
@@ -0,0 +1,52 @@
+from abc import ABC, abstractmethod
+from typing import Any
+import json
+
+
+class CacheBackend(ABC):
+    """
+    Interface for the shared repository cache.
+
+    Values are JSON-serializable objects. Every backend supports per-entry
+    TTLs (None means the entry never expires) and evicts least recently
+    used entries once its total size exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+
+    @abstractmethod
+    async def get(self, key: str) -> Any | None:
+        """Returns the value stored under `key`, or None if missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float | None = None):
+        """Stores `value` under `key`, expiring after `ttl` seconds if given."""
+
+    @abstractmethod
+    async def add(self, key: str, value: Any, ttl: float | None = None) -> bool:
+        """
+        Stores `value` only if `key` is absent (or expired).
+
+        Returns True if the value was stored. Atomic across workers, so it can
+        be used as a short-lived lock.
+        """
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Removes `key` if present."""
+
+    @abstractmethod
+    async def keys(self, prefix: str = "") -> list[str]:
+        """Returns the live keys starting with `prefix`."""
+
+    async def close(self):
+        """Releases connections held by the backend."""
+
+    @staticmethod
+    def _dumps(value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    @staticmethod
+    def _loads(raw: bytes | str) -> Any:
+        return json.loads(raw)
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from typing import Any
+import time
+
+from app.core.cache.base import CacheBackend
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process cache backend.
+
+    Not shared between workers and lost on restart; meant for development,
+    tests and single-worker setups.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(max_bytes)
+        # key -> (serialized value, expires_at)
+        self._entries: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+        self._size = 0
+
+    def _live(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        raw, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            self._remove(key)
+            return None
+        return raw
+
+    def _remove(self, key: str):
+        raw, _ = self._entries.pop(key)
+        self._size -= len(raw)
+
+    async def get(self, key: str) -> Any | None:
+        raw = self._live(key)
+        if raw is None:
+            return None
+        self._entries.move_to_end(key)
+        return self._loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float | None = None):
+        raw = self._dumps(value)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (raw, time.time() + ttl if ttl is not None else None)
+        self._size += len(raw)
+
+        while self._size > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    async def add(self, key: str, value: Any, ttl: float | None = None) -> bool:
+        if self._live(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str):
+        if key in self._entries:
+            self._remove(key)
+
+    async def keys(self, prefix: str = "") -> list[str]:
+        return [
+            key
+            for key in list(self._entries)
+            if key.startswith(prefix) and self._live(key) is not None
+        ]
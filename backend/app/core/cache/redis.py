@@ -0,0 +1,295 @@
+from typing import Any, Awaitable, Callable
+from urllib.parse import unquote, urlparse
+import asyncio
+import ssl
+import time
+
+from app.core.cache.base import CacheBackend
+
+
+# Attempts at a WATCH/MULTI transaction before giving up on concurrent writers
+_TRANSACTION_ATTEMPTS = 10
+
+
+class RedisError(Exception):
+    """Error reply returned by the Redis server."""
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache backend speaking the Redis protocol (RESP2) over asyncio streams.
+
+    Works against Redis and protocol-compatible servers (Valkey, KeyDB,
+    Dragonfly, ...) without a client library dependency: Redis is an
+    optional deployment choice (SQLite is the default), the backend only needs
+    a dozen commands, and keeping it out of the pinned requirements spares
+    every other deployment the extra package. TTLs map to
+    `SET ... PX`; size-based eviction is done by the backend itself by
+    tracking entry sizes and a last-access index, so it does not depend on
+    the server's maxmemory policy. Every change to the size index is a
+    WATCH/MULTI transaction, so the byte total stays exact with several
+    workers writing at once.
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        max_bytes: int = 512 * 1024 * 1024,
+        namespace: str = "gitdiagram:",
+    ):
+        super().__init__(max_bytes)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.use_ssl = parsed.scheme == "rediss"
+        self.namespace = namespace
+
+        self._index_key = f"{namespace}__index__"
+        self._sizes_key = f"{namespace}__sizes__"
+        self._bytes_key = f"{namespace}__bytes__"
+
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+
+    # -- protocol -----------------------------------------------------------
+
+    @staticmethod
+    def _encode(args: tuple) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            elif not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(out)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()  # type: ignore
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = await self._reader.readexactly(length + 2)  # type: ignore
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply type: {line!r}")
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host,
+            self.port,
+            ssl=ssl.create_default_context() if self.use_ssl else None,
+        )
+        if self.password:
+            credentials = (self.password,)
+            if self.username:
+                credentials = (self.username, self.password)
+            await self._send([("AUTH", *credentials)])
+        if self.db:
+            await self._send([("SELECT", self.db)])
+
+    async def _send(self, commands: list[tuple]) -> list:
+        self._writer.write(b"".join(self._encode(c) for c in commands))  # type: ignore
+        await self._writer.drain()  # type: ignore
+        return [await self._read_reply() for _ in commands]
+
+    def _disconnect(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _with_connection(self, run: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs `run` on the connection, holding it for the whole call."""
+        async with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._writer is None:
+                        await self._connect()
+                    return await run()
+                except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                    # Reconnect once on a dropped connection
+                    self._disconnect()
+                    if attempt:
+                        raise
+                except BaseException:
+                    # A RedisError or a cancellation (e.g. a client disconnecting)
+                    # can leave unread replies on the socket, which the next
+                    # caller would read as its own: start over on a new connection
+                    self._disconnect()
+                    raise
+        return None
+
+    async def pipeline(self, *commands: tuple) -> list:
+        """Sends several commands in one round trip and returns their replies."""
+        return await self._with_connection(lambda: self._send(list(commands)))
+
+    async def transaction(
+        self, watch: tuple[str, ...], prepare: Callable[[], Awaitable[list[tuple]]]
+    ) -> list:
+        """
+        Runs an optimistic read-modify-write transaction.
+
+        The `watch` keys are WATCHed, then `prepare` reads what it needs (with
+        `_send`) and returns the commands to run in MULTI/EXEC. If another
+        client modified a watched key in between, EXEC is discarded and the
+        whole transaction is retried.
+
+        Returns:
+            list: The replies of the queued commands ([] if `prepare` returned none)
+
+        Raises:
+            RedisError: If every attempt was discarded.
+        """
+
+        async def run():
+            for _ in range(_TRANSACTION_ATTEMPTS):
+                await self._send([("WATCH", *watch)])
+                commands = await prepare()
+                if not commands:
+                    await self._send([("UNWATCH",)])
+                    return []
+                replies = await self._send([("MULTI",), *commands, ("EXEC",)])
+                if replies[-1] is not None:
+                    return replies[-1]
+            raise RedisError("Transaction aborted by concurrent writers")
+
+        return await self._with_connection(run)
+
+    async def execute(self, *args):
+        """Sends one command and returns its reply."""
+        (reply,) = await self.pipeline(args)
+        return reply
+
+    # -- cache interface ----------------------------------------------------
+
+    async def get(self, key: str) -> Any | None:
+        name = self.namespace + key
+        raw, _ = await self.pipeline(
+            ("GET", name), ("ZADD", self._index_key, "XX", time.time(), name)
+        )
+        return self._loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float | None = None):
+        name = self.namespace + key
+        raw = self._dumps(value)
+        set_command = ("SET", name, raw)
+        if ttl is not None:
+            set_command += ("PX", max(1, int(ttl * 1000)))
+
+        async def prepare():
+            (old_size,) = await self._send([("HGET", self._sizes_key, name)])
+            return [
+                set_command,
+                ("HSET", self._sizes_key, name, len(raw)),
+                ("ZADD", self._index_key, time.time(), name),
+                ("INCRBY", self._bytes_key, len(raw) - int(old_size or 0)),
+            ]
+
+        *_, total = await self.transaction((self._sizes_key,), prepare)
+        if total > self.max_bytes:
+            await self._evict()
+
+    async def add(self, key: str, value: Any, ttl: float | None = None) -> bool:
+        # Used for small, short-lived values (locks, tokens); kept out of the
+        # size index, and SET NX makes it atomic across workers
+        command = ("SET", self.namespace + key, self._dumps(value), "NX")
+        if ttl is not None:
+            command += ("PX", max(1, int(ttl * 1000)))
+        return await self.execute(*command) is not None
+
+    async def _evict(self):
+        """
+        Removes least recently used entries until the size budget is met.
+
+        Entries that already expired through their TTL are still in the size
+        index; they are dropped from it on the way, so totals stay accurate.
+        """
+        while True:
+            async def prepare():
+                total, oldest = await self._send([
+                    ("GET", self._bytes_key),
+                    ("ZRANGE", self._index_key, 0, 15),
+                ])
+                total = int(total or 0)
+                if total <= self.max_bytes or not oldest:
+                    return []
+                sizes, *exists = await self._send(
+                    [("HMGET", self._sizes_key, *oldest)] + [("EXISTS", name) for name in oldest]
+                )
+                entries = list(zip(oldest, sizes, exists))
+                # Expired entries go first, so they do not push live ones out
+                expired = [(name, size) for name, size, live in entries if not live]
+                total -= sum(int(size or 0) for _, size in expired)
+                evicted = list(expired)
+                for name, size, live in entries:
+                    if live and total > self.max_bytes:
+                        evicted.append((name, size))
+                        total -= int(size or 0)
+
+                commands = []
+                for name, size in evicted:
+                    commands += [
+                        ("DEL", name),
+                        ("HDEL", self._sizes_key, name),
+                        ("ZREM", self._index_key, name),
+                        ("DECRBY", self._bytes_key, int(size or 0)),
+                    ]
+                return commands
+
+            if not await self.transaction((self._sizes_key,), prepare):
+                return
+
+    async def delete(self, key: str):
+        name = self.namespace + key
+
+        async def prepare():
+            (size,) = await self._send([("HGET", self._sizes_key, name)])
+            return [
+                ("DEL", name),
+                ("HDEL", self._sizes_key, name),
+                ("ZREM", self._index_key, name),
+                ("DECRBY", self._bytes_key, int(size or 0)),
+            ]
+
+        await self.transaction((self._sizes_key,), prepare)
+
+    async def keys(self, prefix: str = "") -> list[str]:
+        # Escape glob characters so the prefix is matched literally
+        pattern = self.namespace + prefix
+        for char in "\\*?[]":
+            pattern = pattern.replace(char, "\\" + char)
+
+        found, cursor = [], "0"
+        while True:
+            cursor, batch = await self.execute(
+                "SCAN", cursor, "MATCH", pattern + "*", "COUNT", 500
+            )
+            found += [name.decode()[len(self.namespace):] for name in batch]
+            cursor = cursor.decode() if isinstance(cursor, bytes) else cursor
+            if cursor == "0":
+                break
+        internal = {self._index_key, self._sizes_key, self._bytes_key}
+        return sorted(k for k in found if self.namespace + k not in internal)
+
+    async def close(self):
+        async with self._lock:
+            self._disconnect()
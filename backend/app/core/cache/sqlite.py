@@ -0,0 +1,162 @@
+from typing import Any
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+from app.core.cache.base import CacheBackend
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Embedded on-disk cache backend.
+
+    All uvicorn workers on a host open the same database file (in WAL mode),
+    so they share one cache, and entries survive restarts and deploys.
+    Blocking SQLite calls run in a worker thread to keep the event loop free.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        super().__init__(max_bytes)
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (accessed_at)"
+        )
+        self._conn.commit()
+
+    async def _run(self, func, *args):
+        def locked():
+            with self._lock:
+                return func(*args)
+
+        return await asyncio.to_thread(locked)
+
+    def _get(self, key: str) -> bytes | None:
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+
+        self._conn.execute(
+            "UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key)
+        )
+        self._conn.commit()
+        return value
+
+    def _set(self, key: str, raw: bytes, ttl: float | None):
+        now = time.time()
+        self._conn.execute(
+            """
+            INSERT INTO cache_entries (key, value, size, expires_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value,
+                size = excluded.size,
+                expires_at = excluded.expires_at,
+                accessed_at = excluded.accessed_at
+            """,
+            (key, raw, len(raw), now + ttl if ttl is not None else None, now),
+        )
+        self._evict(now)
+        self._conn.commit()
+
+    def _evict(self, now: float):
+        """Drops expired entries, then least recently used ones over the size budget."""
+        self._conn.execute(
+            "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (now,),
+        )
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache_entries"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        stale = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM cache_entries ORDER BY accessed_at"
+        ):
+            stale.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM cache_entries WHERE key = ?", stale)
+
+    def _add(self, key: str, raw: bytes, ttl: float | None) -> bool:
+        now = time.time()
+        self._conn.execute(
+            "DELETE FROM cache_entries WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (key, now),
+        )
+        cursor = self._conn.execute(
+            """
+            INSERT INTO cache_entries (key, value, size, expires_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO NOTHING
+            """,
+            (key, raw, len(raw), now + ttl if ttl is not None else None, now),
+        )
+        self._conn.commit()
+        return cursor.rowcount == 1
+
+    def _delete(self, key: str):
+        self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def _keys(self, prefix: str) -> list[str]:
+        rows = self._conn.execute(
+            """
+            SELECT key FROM cache_entries
+            WHERE substr(key, 1, ?) = ? AND (expires_at IS NULL OR expires_at > ?)
+            ORDER BY key
+            """,
+            (len(prefix), prefix, time.time()),
+        )
+        return [key for (key,) in rows]
+
+    async def get(self, key: str) -> Any | None:
+        raw = await self._run(self._get, key)
+        return self._loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float | None = None):
+        await self._run(self._set, key, self._dumps(value), ttl)
+
+    async def add(self, key: str, value: Any, ttl: float | None = None) -> bool:
+        return await self._run(self._add, key, self._dumps(value), ttl)
+
+    async def delete(self, key: str):
+        await self._run(self._delete, key)
+
+    async def keys(self, prefix: str = "") -> list[str]:
+        return await self._run(self._keys, prefix)
+
+    async def close(self):
+        await self._run(self._conn.close)
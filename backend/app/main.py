@@ -2,15 +2,32 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
-from app.routers import generate, modify, cache
+from app.routers import generate, modify, cache, webhook
 from app.core.limiter import limiter
+from app.core.cache import close_cache_backend
+from app.services.cache_warmer import cache_warmer
+from app.services.github_service import close_github_client
+from app.services.llm_clients import llm_clients
+from contextlib import asynccontextmanager
 from typing import cast
 from starlette.exceptions import ExceptionMiddleware
 from api_analytics.fastapi import Analytics
 import os
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the most requested repositories warm in the cache
+    cache_warmer.start()
+    yield
+    # Release pooled GitHub and LLM connections and the cache backend when the worker shuts down
+    await cache_warmer.stop()
+    await close_github_client()
+    await llm_clients.aclose()
+    await close_cache_backend()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 origins = [
@@ -43,6 +60,7 @@ app.add_exception_handler(
 app.include_router(generate.router)
 app.include_router(modify.router)
 app.include_router(cache.router)
+app.include_router(webhook.router)
 
 
 @app.get("/")
@@ -1,10 +1,18 @@
 from fastapi import APIRouter, Query
 from typing import List, Dict
-from functools import lru_cache
-import inspect
 
-# Import the cache function to access its cache
-from .generate import get_cached_github_data
+from app.core.cache import get_cache_backend
+from app.services.cache_warmer import cache_warmer
+from app.services.github_credentials import get_default_credential_pool
+from app.services.github_response_cache import response_cache
+from app.services.llm_clients import llm_clients
+from app.services.repository_source import RepositoryData
+from app.services.repository_cache import (
+    SNAPSHOT_KEY_PREFIX,
+    github_fetches,
+    parse_snapshot_cache_key,
+    repository_cache_stats,
+)
 
 router = APIRouter(prefix="/cache", tags=["Cache"])
 
@@ -14,31 +22,68 @@ async def get_cached_diagrams(
     per_page: int = Query(10, ge=1, le=50),
     search: str | None = None
 ):
-    # Get all cached items from the LRU cache
-    cache = get_cached_github_data.cache_info()
-    cache_dict = inspect.getcache(get_cached_github_data)
+    # Get all cached repositories from the shared cache backend
+    cache = get_cache_backend()
+    keys = await cache.keys(SNAPSHOT_KEY_PREFIX)
     
-    # Extract repository information from cache
-    diagrams = []
-    for key in cache_dict:
-        username, repo, _ = key  # Unpack the cache key (username, repo, github_pat)
+    # Extract repository information from cache keys
+    entries = []
+    for key in keys:
+        username, repo, sha, path, scoped = parse_snapshot_cache_key(key)
+        # Snapshots of non-public repositories are never listed
+        if scoped:
+            continue
         if search and search.lower() not in f"{username}/{repo}".lower():
             continue
-        diagrams.append({
-            "username": username,
-            "repo": repo,
-            "data": cache_dict[key]
-        })
+        entries.append((key, username, repo, sha, path))
     
     # Calculate pagination
-    total = len(diagrams)
+    total = len(entries)
     start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
+
+    # Only load the cached data for the requested page
+    diagrams = []
+    for key, username, repo, sha, path in entries[start_idx:end_idx]:
+        data = await cache.get(key)
+        if data is None:  # evicted since listing
+            continue
+        snapshot = RepositoryData.from_cache(data)
+        diagrams.append({
+            "username": username,
+            "repo": repo,
+            "sha": sha,
+            "path": path,
+            "data": {
+                "default_branch": snapshot.default_branch,
+                "sha": snapshot.sha,
+                "file_tree": snapshot.file_tree,
+                "readme": snapshot.readme,
+                "manifests": snapshot.manifests,
+            }
+        })
     
     return {
-        "diagrams": diagrams[start_idx:end_idx],
+        "diagrams": diagrams,
         "total": total,
         "page": page,
         "per_page": per_page,
         "total_pages": (total + per_page - 1) // per_page
     }
+
+
+@router.get("/stats")
+async def get_cache_stats():
+    # Per-worker counters for the repository cache, GitHub fetches and LLM clients
+    return {
+        "repository_cache": repository_cache_stats,
+        "github_fetches": github_fetches.stats(),
+        "github_response_cache": {
+            "entries": len(response_cache),
+            "hits": response_cache.hits,
+            "misses": response_cache.misses,
+        },
+        "github_rate_limits": get_default_credential_pool().stats(),
+        "cache_warmer": cache_warmer.stats(),
+        "llm_clients": llm_clients.stats(),
+    }
@@ -1,7 +1,13 @@
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
-from app.services.github_service import GitHubService
+from app.services.cache_warmer import cache_warmer
+from app.services.repository_cache import (
+    get_cached_artifact,
+    get_cached_github_data,
+    store_artifact,
+)
+from app.services.llm_provider import LLMProvider
 from app.services.openrouter_service import OpenRouterService
 from app.services.ollama_service import OllamaService
 from app.prompts import (
@@ -11,7 +17,6 @@ from app.prompts import (
     get_system_third_prompt_with_examples,
 )
 from pydantic import BaseModel
-from functools import lru_cache
 import json
 import asyncio
 import re
@@ -23,7 +28,9 @@ DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
 from app.services.claude_service import ClaudeService
 from app.services.groq_service import GroqService
 from app.services.openai_service import OpenAIService
+from app.utils.file_tree import FileTree
 from app.utils.mermaid_validator import validate_and_fix_mermaid, get_validation_report
+from app.utils.prompt_packer import get_prompt_budget, get_token_counter, pack_prompt
 # from app.core.limiter import limiter
 
 load_dotenv()
@@ -32,7 +39,7 @@ router = APIRouter(prefix="/generate", tags=["Claude", "Ollama", "Groq", "OpenAI
 
 # Initialize services
 # Initialize all available services
-SERVICES = {
+SERVICES: dict[str, LLMProvider] = {
     "claude": ClaudeService(),
     "ollama": OllamaService(),
     "groq": GroqService(),
@@ -42,36 +49,20 @@ SERVICES = {
 
 # Default models for each service (read from environment variables with fallbacks)
 DEFAULT_MODELS = {
-    "claude": os.getenv("DEFAULT_MODEL_CLAUDE", "claude-3-opus"),
+    "claude": os.getenv("DEFAULT_MODEL_CLAUDE", "claude-3-5-sonnet-latest"),
     "ollama": os.getenv("DEFAULT_MODEL_OLLAMA", "mistral"),
     "groq": os.getenv("DEFAULT_MODEL_GROQ", "mixtral-8x7b-32768"),
     "openai": os.getenv("DEFAULT_MODEL_OPENAI", "gpt-4"),
     "openrouter": os.getenv("DEFAULT_MODEL_OPENROUTER", "minimax/minimax-m2:free")
 }
 
-def get_service(service_name: str):
+def get_service(service_name: str) -> LLMProvider:
     """Get the service instance by name"""
     if service_name not in SERVICES:
         raise ValueError(f"Service {service_name} not found. Available services: {list(SERVICES.keys())}")
     return SERVICES[service_name]
 
 
-# cache github data to avoid double API calls
-@lru_cache(maxsize=100)
-def get_cached_github_data(username: str, repo: str, github_pat: str | None = None):
-    # Create a new service instance for each call with the appropriate PAT
-    current_github_service = GitHubService(pat=github_pat)
-
-    default_branch = current_github_service.get_default_branch(username, repo)
-    if not default_branch:
-        default_branch = "main"  # fallback value
-
-    file_tree = current_github_service.get_github_file_paths_as_list(username, repo)
-    readme = current_github_service.get_github_readme(username, repo)
-
-    return {"default_branch": default_branch, "file_tree": file_tree, "readme": readme}
-
-
 class ApiRequest(BaseModel):
     username: str
     repo: str
@@ -80,20 +71,41 @@ class ApiRequest(BaseModel):
     github_pat: str | None = None
     service: str = "openrouter"  # Default to OpenRouter
     model: str | None = None  # If None, will use service's default model
-
-
-def process_click_events(diagram: str, username: str, repo: str, branch: str) -> str:
+    path: str | None = None  # Subdirectory to diagram instead of the whole repository
+    ref: str | None = None  # Branch, tag or commit; the default branch if None
+    regenerate: bool = False  # Skip the cached diagram and generate anew (the result is still cached)
+
+
+def process_click_events(
+    diagram: str,
+    username: str,
+    repo: str,
+    branch: str,
+    file_tree: FileTree | None = None,
+    scope: str = "",
+) -> str:
     """
     Process click events in Mermaid diagram to include full GitHub URLs.
     Detects if path is file or directory and uses appropriate URL format.
+    For diagrams scoped to a subdirectory, paths given relative to it are
+    resolved against it.
     """
 
     def replace_path(match):
         # Extract the path from the click event
         path = match.group(2).strip("\"'")
-
-        # Determine if path is likely a file (has extension) or directory
-        is_file = "." in path.split("/")[-1]
+        if scope and file_tree is not None and not path.startswith(scope + "/"):
+            scoped_path = f"{scope}/{path.strip('/')}"
+            if file_tree.is_dir(scoped_path) is not None:
+                path = scoped_path
+
+        # Look the path up in the repository tree; if it is not there, guess
+        # from the name (files usually have an extension)
+        is_dir = file_tree.is_dir(path) if file_tree is not None else None
+        if is_dir is None:
+            is_file = "." in path.split("/")[-1]
+        else:
+            is_file = not is_dir
 
         # Construct GitHub URL
         base_url = f"https://github.com/{username}/{repo}"
@@ -120,20 +132,28 @@ async def generate_stream(request: Request, body: ApiRequest):
                 if DEBUG:
                     print("\n[DEBUG] Phase 1: Fetching GitHub data...")
 
-                github_data = get_cached_github_data(
-                    body.username, body.repo, body.github_pat
+                github_data = await get_cached_github_data(
+                    body.username, body.repo, body.github_pat, ref=body.ref, path=body.path
                 )
-                default_branch = github_data["default_branch"]
-                file_tree = github_data["file_tree"]
-                readme = github_data["readme"]
+                # Repositories read with the server's credentials can be kept warm
+                if not body.github_pat:
+                    cache_warmer.record(body.username, body.repo)
+                default_branch = github_data.default_branch
+                # Links point at the requested ref, so they match the diagrammed tree
+                link_ref = (body.ref or "").strip() or default_branch
+                readme = github_data.readme
 
                 if DEBUG:
-                    print(f"[DEBUG] Default branch: {default_branch}")
-                    print(f"[DEBUG] Number of files: {len(file_tree)}")
+                    print(f"[DEBUG] Default branch: {default_branch} @ {github_data.sha}")
+                    if github_data.path:
+                        print(f"[DEBUG] Scoped to: {github_data.path}")
+                    print(f"[DEBUG] Number of files: {len(github_data.tree)}")
                     print(f"[DEBUG] README length: {len(readme) if readme else 0} chars")
 
                 # Send initial status
                 yield f"data: {json.dumps({'status': 'started', 'message': 'Starting generation process...'})}\n\n"
+                if github_data.preflight:
+                    yield f"data: {json.dumps({'status': 'preflight', 'message': github_data.preflight['reason'], **github_data.preflight})}\n\n"
                 await asyncio.sleep(0.1)
 
                 # Get the requested service and model
@@ -144,19 +164,36 @@ async def generate_stream(request: Request, body: ApiRequest):
                         model = DEFAULT_MODELS[body.service]
                     else:
                         model = body.model if body.model and body.model.strip() else DEFAULT_MODELS[body.service]
-                    if hasattr(service, '__init__') and 'model' in str(service.__init__.__code__.co_varnames):
-                        service = type(service)(model=model)
                 except ValueError as e:
                     yield f"data: {json.dumps({'error': str(e)})}\n\n"
                     return
 
-                # # Token count check for services that support it
-                # combined_content = f"{file_tree}\n{readme}"
-                # if hasattr(service, 'count_tokens'):
-                #     token_count = service.count_tokens(combined_content)
-                #     if token_count > 200000:  # Context limit
-                #         yield f"data: {json.dumps({'error': f'Repository content exceeds maximum token limit of 200k tokens (got {token_count} tokens). Please try a smaller repository.'})}\n\n"
-                #         return
+                # The same commit, provider, model and instructions always map to the
+                # same artifacts, so a previous generation can be replayed as-is,
+                # unless the user asked to regenerate
+                cached_artifact = None if body.regenerate else await get_cached_artifact(
+                    body.username, body.repo, github_data.sha, body.service, model, body.instructions,
+                    github_data.path, github_data.scope,
+                )
+                if cached_artifact is not None:
+                    if DEBUG:
+                        print(f"[DEBUG] Serving cached diagram for commit {github_data.sha}")
+                    yield f"data: {json.dumps({'status': 'complete', **cached_artifact, 'model_used': model, 'service_used': body.service, 'cached': True})}\n\n"
+                    return
+
+                # Fit the file tree and README into the model's context window,
+                # condensing them if the repository is too large
+                count_tokens = get_token_counter(body.service)
+                budget = get_prompt_budget(model, count_tokens, SYSTEM_FIRST_PROMPT, body.instructions)
+                packed = await asyncio.to_thread(
+                    pack_prompt, github_data.tree.entries(), readme or "", budget, count_tokens
+                )
+                file_tree = packed.file_tree
+                readme = packed.readme
+                if DEBUG:
+                    print(f"[DEBUG] Prompt tokens: {packed.tokens} of {budget} ({packed.original_tokens} before condensing)")
+                if packed.condensed:
+                    yield f"data: {json.dumps({'status': 'condensed', 'message': 'Repository is too large for the model; condensed the file tree and README to fit.', **packed.report()})}\n\n"
 
                 # Phase 2: Generate initial explanation
                 if DEBUG:
@@ -168,28 +205,17 @@ async def generate_stream(request: Request, body: ApiRequest):
 
                 try:
                     explanation = ""
-                    if hasattr(service, 'call_api_stream'):
-                        async for chunk in service.call_api_stream(
-                            system_prompt=first_system_prompt,
-                            data={
-                                "file_tree": file_tree,
-                                "readme": readme or "No README found",
-                            },
-                            api_key=body.api_key,
-                        ):
-                            explanation += chunk
-                            yield f"data: {json.dumps({'status': 'explanation_chunk', 'chunk': chunk})}\n\n"
-                    else:
-                        # Fallback to non-streaming API
-                        explanation = await service.call_api(
-                            system_prompt=first_system_prompt,
-                            data={
-                                "file_tree": file_tree,
-                                "readme": readme or "No README found",
-                            },
-                            api_key=body.api_key,
-                        )
-                        yield f"data: {json.dumps({'status': 'explanation_chunk', 'chunk': explanation})}\n\n"
+                    async for chunk in service.stream(
+                        system_prompt=first_system_prompt,
+                        data={
+                            "file_tree": file_tree,
+                            "readme": readme or "No README found",
+                        },
+                        api_key=body.api_key,
+                        model=model,
+                    ):
+                        explanation += chunk
+                        yield f"data: {json.dumps({'status': 'explanation_chunk', 'chunk': chunk})}\n\n"
                 except Exception as e:
                     yield f"data: {json.dumps({'error': f'Error calling {body.service} service: {str(e)}'})}\n\n"
                     return
@@ -204,25 +230,14 @@ async def generate_stream(request: Request, body: ApiRequest):
 
                 try:
                     mapping = ""
-                    if hasattr(service, 'call_api_stream'):
-                        async for chunk in service.call_api_stream(
-                            system_prompt=SYSTEM_SECOND_PROMPT,
-                            data={"explanation": explanation, "file_tree": file_tree},
-                            api_key=body.api_key,
-                        ):
-                            mapping += chunk
-                            yield f"data: {json.dumps({'status': 'mapping_chunk', 'chunk': chunk})}\n\n"
-                    else:
-                        # Fallback to non-streaming API
-                        mapping = await service.call_api(
-                            system_prompt=SYSTEM_SECOND_PROMPT,
-                            data={"explanation": explanation, "file_tree": file_tree},
-                            api_key=body.api_key,
-                        )
-                        if DEBUG:
-                            print("\n[DEBUG] Phase 2 Response:")
-                            print(mapping[:200] + "..." if len(mapping) > 200 else mapping)
-                        yield f"data: {json.dumps({'status': 'mapping_chunk', 'chunk': mapping})}\n\n"
+                    async for chunk in service.stream(
+                        system_prompt=SYSTEM_SECOND_PROMPT,
+                        data={"explanation": explanation, "file_tree": file_tree},
+                        api_key=body.api_key,
+                        model=model,
+                    ):
+                        mapping += chunk
+                        yield f"data: {json.dumps({'status': 'mapping_chunk', 'chunk': chunk})}\n\n"
                 except Exception as e:
                     yield f"data: {json.dumps({'error': f'Error calling {body.service} service: {str(e)}'})}\n\n"
                     return
@@ -249,31 +264,18 @@ async def generate_stream(request: Request, body: ApiRequest):
                     system_prompt_with_examples = get_system_third_prompt_with_examples()
                     
                     diagram_chunks = []
-                    if hasattr(service, 'call_api_stream'):
-                        async for chunk in service.call_api_stream(
-                            system_prompt=system_prompt_with_examples,
-                            data={
-                                "explanation": explanation,
-                                "component_mapping": component_mapping_text,
-                                "instructions": body.instructions,
-                            },
-                            api_key=body.api_key,
-                        ):
-                            diagram_chunks.append(chunk)
-                            yield f"data: {json.dumps({'status': 'diagram_chunk', 'chunk': chunk})}\n\n"
-                    else:
-                        # Fallback to non-streaming API
-                        diagram = await service.call_api(
-                            system_prompt=system_prompt_with_examples,
-                            data={
-                                "explanation": explanation,
-                                "component_mapping": component_mapping_text,
-                                "instructions": body.instructions,
-                            },
-                            api_key=body.api_key,
-                        )
-                        diagram_chunks.append(diagram)
-                        yield f"data: {json.dumps({'status': 'diagram_chunk', 'chunk': diagram})}\n\n"
+                    async for chunk in service.stream(
+                        system_prompt=system_prompt_with_examples,
+                        data={
+                            "explanation": explanation,
+                            "component_mapping": component_mapping_text,
+                            "instructions": body.instructions,
+                        },
+                        api_key=body.api_key,
+                        model=model,
+                    ):
+                        diagram_chunks.append(chunk)
+                        yield f"data: {json.dumps({'status': 'diagram_chunk', 'chunk': chunk})}\n\n"
                 except Exception as e:
                     yield f"data: {json.dumps({'error': f'Error calling {body.service} service: {str(e)}'})}\n\n"
                     return
@@ -353,7 +355,7 @@ async def generate_stream(request: Request, body: ApiRequest):
                 
                 # Process click events to add GitHub URLs (after validation)
                 full_diagram = process_click_events(
-                    full_diagram, body.username, body.repo, default_branch
+                    full_diagram, body.username, body.repo, link_ref, github_data.tree, github_data.path
                 )
                 
                 # Final validation check
@@ -361,6 +363,12 @@ async def generate_stream(request: Request, body: ApiRequest):
                     yield f"data: {json.dumps({'error': 'Invalid Mermaid diagram syntax - must start with a valid diagram type'})}\n\n"
                     return
 
+                await store_artifact(
+                    body.username, body.repo, github_data.sha, body.service, model, body.instructions,
+                    {"diagram": full_diagram, "explanation": explanation, "mapping": component_mapping_text},
+                    github_data.path, github_data.scope,
+                )
+
                 # Send final result with model info
                 yield f"data: {json.dumps({
                     'status': 'complete',
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Request, HTTPException
 from dotenv import load_dotenv
 from anthropic._exceptions import RateLimitError
+from openai import RateLimitError as OpenAIRateLimitError
 from app.prompts import SYSTEM_MODIFY_PROMPT
 from pydantic import BaseModel
+from typing import Awaitable, TypeVar
+import asyncio
 import os
 
 # Import all services
+from app.services.llm_provider import LLMProvider
 from app.services.claude_service import ClaudeService
 from app.services.groq_service import GroqService
 from app.services.ollama_service import OllamaService
@@ -17,7 +21,7 @@ load_dotenv()
 router = APIRouter(prefix="/modify", tags=["LLM"])
 
 # Initialize all available services
-SERVICES = {
+SERVICES: dict[str, LLMProvider] = {
     "claude": ClaudeService(),
     "ollama": OllamaService(),
     "groq": GroqService(),
@@ -27,14 +31,55 @@ SERVICES = {
 
 # Default models for each service (read from environment variables with fallbacks)
 DEFAULT_MODELS = {
-    "claude": os.getenv("DEFAULT_MODEL_CLAUDE", "claude-3-opus"),
+    "claude": os.getenv("DEFAULT_MODEL_CLAUDE", "claude-3-5-sonnet-latest"),
     "ollama": os.getenv("DEFAULT_MODEL_OLLAMA", "mistral"),
     "groq": os.getenv("DEFAULT_MODEL_GROQ", "mixtral-8x7b-32768"),
     "openai": os.getenv("DEFAULT_MODEL_OPENAI", "gpt-4"),
     "openrouter": os.getenv("DEFAULT_MODEL_OPENROUTER", "minimax/minimax-m2:free")
 }
 
-def get_service(service_name: str):
+# Longest a modification may take before the model call is abandoned
+MODIFY_TIMEOUT = float(os.getenv("MODIFY_TIMEOUT_SECONDS", "120"))
+# How often the client connection is checked while the model is working
+DISCONNECT_POLL_INTERVAL = 1.0
+
+T = TypeVar("T")
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready."""
+
+
+async def run_until_disconnected(request: Request, awaitable: Awaitable[T], timeout: float) -> T:
+    """
+    Awaits a model call, cancelling it on timeout or when the client disconnects.
+
+    The call runs as a task on the event loop, so a pending modification
+    costs one coroutine, and a cancelled one stops consuming provider tokens.
+
+    Raises:
+        asyncio.TimeoutError: If the call takes longer than `timeout` seconds.
+        ClientDisconnected: If the client disconnects first.
+    """
+    task = asyncio.ensure_future(awaitable)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            done, _ = await asyncio.wait({task}, timeout=min(DISCONNECT_POLL_INTERVAL, remaining))
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def get_service(service_name: str) -> LLMProvider:
     """Get the service instance by name"""
     if service_name not in SERVICES:
         raise ValueError(f"Service {service_name} not found. Available services: {list(SERVICES.keys())}")
@@ -94,14 +139,19 @@ async def modify(request: Request, body: ModifyRequest):
         else:
             model = body.model if body.model and body.model.strip() else DEFAULT_MODELS[body.service]
 
-        modified_mermaid_code = service.call_api(
-            system_prompt=SYSTEM_MODIFY_PROMPT,
-            data={
-                "instructions": body.instructions,
-                "explanation": body.explanation,
-                "diagram": body.current_diagram,
-            },
-            model=model
+        modified_mermaid_code = await run_until_disconnected(
+            request,
+            service.complete(
+                system_prompt=SYSTEM_MODIFY_PROMPT,
+                data={
+                    "instructions": body.instructions,
+                    "explanation": body.explanation,
+                    "diagram": body.current_diagram,
+                },
+                api_key=body.api_key,
+                model=model,
+            ),
+            MODIFY_TIMEOUT,
         )
 
         # Check for BAD_INSTRUCTIONS response
@@ -113,10 +163,18 @@ async def modify(request: Request, body: ModifyRequest):
             "model_used": model,
             "service_used": body.service
         }
-    except RateLimitError as e:
+    except (RateLimitError, OpenAIRateLimitError):
         raise HTTPException(
             status_code=429,
             detail="Service is currently experiencing high demand. Please try again in a few minutes.",
         )
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"{body.service} did not respond within {MODIFY_TIMEOUT:.0f} seconds. Please try again.",
+        )
+    except ClientDisconnected:
+        # Nobody is left to read the response
+        return {"error": "Request cancelled"}
     except Exception as e:
         return {"error": str(e)}
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from dotenv import load_dotenv
+from app.services.repository_cache import invalidate_repository, refresh_repository
+import hashlib
+import hmac
+import json
+import os
+
+load_dotenv()
+
+router = APIRouter(prefix="/github", tags=["GitHub"])
+
+# Shared secret configured on the GitHub webhook; the endpoint is disabled without it
+GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
+
+# Fetch the new commit right away on pushes to the default branch, so the
+# next request is served from the cache
+GITHUB_WEBHOOK_REFRESH = os.getenv("GITHUB_WEBHOOK_REFRESH", "true").lower() == "true"
+
+
+def verify_signature(body: bytes, signature: str | None, secret: str) -> bool:
+    """Checks GitHub's X-Hub-Signature-256 header (HMAC-SHA256 of the raw body)."""
+    if not signature:
+        return False
+    expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+async def refresh_in_background(username: str, repo: str, sha: str | None):
+    try:
+        await refresh_repository(username, repo, sha)
+    except Exception as e:
+        print(f"\033[93mWarning: refreshing {username}/{repo} after a push failed: {e}\033[0m")
+
+
+@router.post("/webhook")
+async def github_webhook(request: Request, background_tasks: BackgroundTasks):
+    """
+    Receives GitHub push webhooks and invalidates the pushed repository.
+
+    Resolved refs of the repository are dropped from the cache (snapshots
+    are keyed by commit and stay valid), and pushes to the default branch
+    fetch the new commit in the background.
+    """
+    if not GITHUB_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook secret is not configured.")
+
+    body = await request.body()
+    if not verify_signature(body, request.headers.get("X-Hub-Signature-256"), GITHUB_WEBHOOK_SECRET):
+        raise HTTPException(status_code=401, detail="Invalid signature.")
+
+    event = request.headers.get("X-GitHub-Event")
+    if event == "ping":
+        return {"status": "ok", "message": "pong"}
+    if event != "push":
+        return {"status": "ignored", "event": event}
+
+    try:
+        payload = json.loads(body)
+        full_name = payload["repository"]["full_name"]
+        default_branch = payload["repository"].get("default_branch")
+        ref = payload.get("ref", "")
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Malformed push payload.")
+
+    username, _, repo = full_name.partition("/")
+    invalidated = await invalidate_repository(username, repo)
+
+    refreshing = False
+    if GITHUB_WEBHOOK_REFRESH and default_branch and ref == f"refs/heads/{default_branch}":
+        # A deleted branch has no commit to fetch
+        if not payload.get("deleted"):
+            background_tasks.add_task(refresh_in_background, username, repo, payload.get("after"))
+            refreshing = True
+
+    return {
+        "status": "ok",
+        "repository": full_name,
+        "invalidated": invalidated,
+        "refreshing": refreshing,
+    }
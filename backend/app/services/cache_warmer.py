@@ -0,0 +1,158 @@
+import asyncio
+import time
+from collections import Counter
+from dotenv import load_dotenv
+from app.core.cache import get_cache_backend
+from app.services.github_credentials import get_default_credential_pool
+from app.services.repository_cache import (
+    REPOSITORY_HEAD_TTL,
+    get_cached_github_data,
+    get_repository_source,
+    resolve_head_sha,
+    subscription_cache_key,
+)
+import os
+
+load_dotenv()
+
+# How many of the most requested repositories are kept warm (0 disables the warmer)
+CACHE_WARMER_TOP_N = int(os.getenv("CACHE_WARMER_TOP_N", "20"))
+# Seconds between rounds; below REPOSITORY_HEAD_TTL so popular HEADs never expire
+CACHE_WARMER_INTERVAL = float(
+    os.getenv("CACHE_WARMER_INTERVAL_SECONDS", str(REPOSITORY_HEAD_TTL * 0.8))
+)
+CACHE_WARMER_CONCURRENCY = int(os.getenv("CACHE_WARMER_CONCURRENCY", "4"))
+# Share of the server's GitHub rate limit that must be left for the warmer to
+# spend any of it; user requests always come first
+CACHE_WARMER_MIN_HEADROOM = float(os.getenv("CACHE_WARMER_MIN_HEADROOM", "0.5"))
+
+# Request counts are halved every round, so interest fades over a few rounds
+_DECAY = 0.5
+_MAX_TRACKED = 10_000
+
+WARM_LEASE_PREFIX = "warm-lease:"
+
+
+class CacheWarmer:
+    """
+    Keeps the repository data of the most requested repositories warm.
+
+    Requests are counted per repository (with decay, so the ranking follows
+    current demand). Every round, the top repositories have their default
+    branch HEAD re-resolved before the cached one expires, and a new commit
+    is fetched into the cache, so their next request never waits on GitHub.
+
+    Rounds stop early when the server's GitHub credentials run low, and a
+    per-repository lease in the shared cache backend keeps several workers
+    from warming the same repository in the same round. Repositories that
+    send push webhooks are skipped: pushes already refresh them.
+    """
+
+    def __init__(
+        self,
+        top_n: int = CACHE_WARMER_TOP_N,
+        interval: float = CACHE_WARMER_INTERVAL,
+        concurrency: int = CACHE_WARMER_CONCURRENCY,
+        min_headroom: float = CACHE_WARMER_MIN_HEADROOM,
+    ):
+        self.top_n = top_n
+        self.interval = interval
+        self.concurrency = concurrency
+        self.min_headroom = min_headroom
+        self.requests: Counter = Counter()
+        self._task: asyncio.Task | None = None
+        self.rounds = 0
+        self.warmed = 0
+        self.failed = 0
+        self.skipped_for_quota = 0
+        self.last_round_at: float | None = None
+
+    def record(self, username: str, repo: str):
+        """Counts a request for a repository."""
+        self.requests[(username.lower(), repo.lower())] += 1
+        if len(self.requests) > _MAX_TRACKED:
+            # Forget the long tail
+            self.requests = Counter(dict(self.requests.most_common(_MAX_TRACKED // 2)))
+
+    def popular(self) -> list[tuple[str, str]]:
+        """Returns the top_n most requested repositories, most requested first."""
+        return [key for key, _ in self.requests.most_common(self.top_n)]
+
+    async def warm(self, username: str, repo: str):
+        """Re-resolves a repository's HEAD and fetches the commit if it is new."""
+        source = get_repository_source(username, repo)
+        await resolve_head_sha(username, repo, source, refresh=True)
+        await get_cached_github_data(username, repo, source=source)
+
+    async def run_once(self):
+        """Warms the current top repositories, within the quota budget."""
+        cache = get_cache_backend()
+        pool = get_default_credential_pool()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        lease_ttl = max(self.interval * 0.9, 1)
+
+        async def warm_one(username: str, repo: str):
+            async with semaphore:
+                if pool.headroom_fraction() < self.min_headroom:
+                    self.skipped_for_quota += 1
+                    return
+                if await cache.get(subscription_cache_key(username, repo)):
+                    return
+                if not await cache.add(f"{WARM_LEASE_PREFIX}{username}/{repo}", 1, ttl=lease_ttl):
+                    return  # another worker has it this round
+                try:
+                    await self.warm(username, repo)
+                    self.warmed += 1
+                except Exception as e:
+                    # e.g. deleted, or only visible to the PAT of the user who asked
+                    self.failed += 1
+                    self.requests.pop((username, repo), None)
+                    print(f"\033[93mWarning: cache warmer skipped {username}/{repo}: {e}\033[0m")
+
+        await asyncio.gather(*(warm_one(*key) for key in self.popular()))
+
+        self.rounds += 1
+        self.last_round_at = time.time()
+        for key in list(self.requests):
+            self.requests[key] *= _DECAY
+            if self.requests[key] < 0.1:
+                del self.requests[key]
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"\033[93mWarning: cache warmer round failed: {e}\033[0m")
+
+    def start(self):
+        """Starts warming in the background (called on app startup)."""
+        if self.top_n > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stops the background task (called on app shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "tracked": len(self.requests),
+            "popular": [f"{username}/{repo}" for username, repo in self.popular()],
+            "rounds": self.rounds,
+            "warmed": self.warmed,
+            "failed": self.failed,
+            "skipped_for_quota": self.skipped_for_quota,
+            "last_round_at": int(self.last_round_at) if self.last_round_at else None,
+        }
+
+
+# One warmer per worker process
+cache_warmer = CacheWarmer()
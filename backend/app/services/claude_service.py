@@ -1,16 +1,70 @@
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
 from dotenv import load_dotenv
+from app.services.llm_clients import ProviderClientRegistry, llm_clients, llm_http_client
+from app.services.llm_provider import LLMProvider, ReasoningEffort
 from app.utils.format_message import format_user_message
+from typing import AsyncIterator
+import os
 
 load_dotenv()
 
+# Output token limit per response
+CLAUDE_MAX_TOKENS = int(os.getenv("CLAUDE_MAX_TOKENS", "4096"))
 
-class ClaudeService:
-    def __init__(self):
-        self.default_client = Anthropic()
 
-    def call_claude_api(
-        self, system_prompt: str, data: dict, api_key: str | None = None
+class ClaudeService(LLMProvider):
+    name = "claude"
+
+    def __init__(self, clients: ProviderClientRegistry | None = None):
+        self.clients = clients if clients is not None else llm_clients
+        self.default_model = os.getenv("DEFAULT_MODEL_CLAUDE", "claude-3-5-sonnet-latest")
+        # Token counting is a synchronous helper, kept off the async clients
+        self._sync_client: Anthropic | None = None
+        # Token usage reported by the API, totalled over this worker's lifetime
+        self.usage = {"requests": 0, "input_tokens": 0, "output_tokens": 0}
+
+    def _create_client(self, api_key: str | None) -> AsyncAnthropic:
+        # Without a key, the client reads ANTHROPIC_API_KEY
+        return AsyncAnthropic(api_key=api_key, http_client=llm_http_client())
+
+    def _client(self, api_key: str | None) -> AsyncAnthropic:
+        """Returns the long-lived client for an API key (the server's if None)."""
+        return self.clients.get(self.name, api_key, self._create_client)
+
+    def _lease(self, api_key: str | None):
+        """Holds the client for an API key for the duration of a call (see ProviderClientRegistry.lease)."""
+        return self.clients.lease(self.name, api_key, self._create_client)
+
+    def _record_usage(self, model: str, usage) -> None:
+        """Adds the usage of one response to the totals."""
+        self.usage["requests"] += 1
+        self.usage["input_tokens"] += usage.input_tokens
+        self.usage["output_tokens"] += usage.output_tokens
+        print(
+            f"Claude {model} usage: {usage.input_tokens} input tokens, {usage.output_tokens} output tokens"
+        )
+
+    def _request(self, system_prompt: str, data: dict, model: str | None) -> dict:
+        """Builds the Messages API parameters shared by `stream` and `complete`."""
+        # Create the user message with the data
+        user_message = format_user_message(data)
+        return {
+            "model": model or self.default_model,
+            "max_tokens": CLAUDE_MAX_TOKENS,
+            "temperature": 0,
+            "system": system_prompt,
+            "messages": [
+                {"role": "user", "content": [{"type": "text", "text": user_message}]}
+            ],
+        }
+
+    async def complete(
+        self,
+        system_prompt: str,
+        data: dict,
+        api_key: str | None = None,
+        model: str | None = None,
+        reasoning_effort: ReasoningEffort = "low",
     ) -> str:
         """
         Makes an API call to Claude and returns the response.
@@ -19,26 +73,47 @@ class ClaudeService:
             system_prompt (str): The instruction/system prompt
             data (dict): Dictionary of variables to format into the user message
             api_key (str | None): Optional custom API key
+            model (str | None): Optional model name (defaults to self.default_model)
+            reasoning_effort (str): Effort level for reasoning (only used for compatibility)
 
         Returns:
             str: Claude's response text
         """
-        # Create the user message with the data
-        user_message = format_user_message(data)
+        request = self._request(system_prompt, data, model)
+        async with self._lease(api_key) as client:
+            message = await client.messages.create(**request)
+        self._record_usage(request["model"], message.usage)
+        return message.content[0].text  # type: ignore
 
-        # Use custom client if API key provided, otherwise use default
-        client = Anthropic(api_key=api_key) if api_key else self.default_client
+    async def stream(
+        self,
+        system_prompt: str,
+        data: dict,
+        api_key: str | None = None,
+        model: str | None = None,
+        reasoning_effort: ReasoningEffort = "low",
+    ) -> AsyncIterator[str]:
+        """
+        Makes a streaming API call to Claude and yields the text deltas as they
+        are generated.
 
-        message = client.messages.create(
-            model="claude-3-5-sonnet-latest",
-            max_tokens=4096,
-            temperature=0,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": [{"type": "text", "text": user_message}]}
-            ],
-        )
-        return message.content[0].text  # type: ignore
+        Args:
+            system_prompt (str): The instruction/system prompt
+            data (dict): Dictionary of variables to format into the user message
+            api_key (str | None): Optional custom API key
+            model (str | None): Optional model name (defaults to self.default_model)
+            reasoning_effort (str): Effort level for reasoning (only used for compatibility)
+
+        Yields:
+            str: Chunks of Claude's response text
+        """
+        request = self._request(system_prompt, data, model)
+        async with self._lease(api_key) as client, client.messages.stream(**request) as stream:
+            async for text in stream.text_stream:
+                yield text
+            # The final message event carries the output token count
+            message = await stream.get_final_message()
+        self._record_usage(request["model"], message.usage)
 
     def count_tokens(self, prompt: str) -> int:
         """
@@ -50,8 +125,10 @@ class ClaudeService:
         Returns:
             int: Number of input tokens
         """
-        response = self.default_client.messages.count_tokens(
-            model="claude-3-5-sonnet-latest",
+        if self._sync_client is None:
+            self._sync_client = Anthropic()
+        response = self._sync_client.messages.count_tokens(
+            model=self.default_model,
             messages=[{"role": "user", "content": prompt}],
         )
         return response.input_tokens
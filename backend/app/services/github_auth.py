@@ -0,0 +1,175 @@
+import asyncio
+import jwt
+import os
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+import httpx
+from app.core.cache import get_cache_backend
+
+load_dotenv()
+
+# Refresh installation tokens this long before GitHub expires them
+GITHUB_TOKEN_REFRESH_MARGIN = int(os.getenv("GITHUB_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+
+# Tokens closer than this to expiry are never handed out (clock skew, slow requests)
+_MIN_TOKEN_LIFETIME = 60
+
+# How long one worker may hold the refresh lease before another takes over
+_REFRESH_LEASE_TTL = 30
+
+TOKEN_CACHE_PREFIX = "installation-token:"
+
+
+class InstallationTokenManager:
+    """
+    Process-wide cache for one GitHub App installation's access token.
+
+    The token is shared by every GitHubService in the worker and, through the
+    shared cache backend, by every worker: only one of them signs a JWT and
+    calls GitHub when the token needs refreshing, the others pick up the
+    result. Tokens are refreshed in the background once they are within
+    GITHUB_TOKEN_REFRESH_MARGIN seconds of the `expires_at` GitHub reports,
+    so requests only wait on GitHub when there is no usable token at all.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        private_key: str,
+        installation_id: str,
+        refresh_margin: float = GITHUB_TOKEN_REFRESH_MARGIN,
+    ):
+        self.client_id = client_id
+        self.private_key = private_key
+        self.installation_id = installation_id
+        self.refresh_margin = refresh_margin
+
+        self.token: str | None = None
+        self.expires_at = 0.0
+        self.refreshes = 0
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    @property
+    def cache_key(self) -> str:
+        return f"{TOKEN_CACHE_PREFIX}{self.client_id}:{self.installation_id}"
+
+    def _remaining(self) -> float:
+        return self.expires_at - time.time()
+
+    def _generate_jwt(self) -> str:
+        now = int(time.time())
+        payload = {
+            "iat": now - 60,  # allow for clock drift, as GitHub recommends
+            "exp": now + (10 * 60),  # 10 minutes
+            "iss": self.client_id,
+        }
+        return jwt.encode(payload, self.private_key, algorithm="RS256")
+
+    async def get_token(self, client: httpx.AsyncClient) -> str:
+        """
+        Returns a valid installation token, refreshing it if needed.
+
+        Args:
+            client (httpx.AsyncClient): Client used to call the GitHub API
+
+        Returns:
+            str: The installation access token
+        """
+        remaining = self._remaining()
+        if self.token and remaining > self.refresh_margin:
+            return self.token
+
+        if self.token and remaining > _MIN_TOKEN_LIFETIME:
+            # Still usable: refresh ahead of expiry without blocking the caller
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._background_refresh(client))
+            return self.token
+
+        await self.refresh(client)
+        return self.token  # type: ignore
+
+    async def _background_refresh(self, client: httpx.AsyncClient):
+        try:
+            await self.refresh(client)
+        except Exception as e:
+            print(f"\033[93mWarning: Failed to refresh GitHub installation token: {e}\033[0m")
+
+    async def refresh(self, client: httpx.AsyncClient):
+        """Replaces the token unless another task or worker already has."""
+        async with self._lock:
+            if self.token and self._remaining() > self.refresh_margin:
+                return
+            if await self._load_shared():
+                return
+
+            backend = get_cache_backend()
+            lease_key = self.cache_key + ":lease"
+            held = await backend.add(lease_key, os.getpid(), ttl=_REFRESH_LEASE_TTL)
+            if not held:
+                # Another worker is refreshing; wait briefly for its result
+                for _ in range(20):
+                    await asyncio.sleep(0.25)
+                    if await self._load_shared():
+                        return
+                if self.token and self._remaining() > _MIN_TOKEN_LIFETIME:
+                    return
+
+            try:
+                await self._request_token(client)
+            finally:
+                # Only release our own lease; if we gave up waiting, it is another worker's
+                if held:
+                    await backend.delete(lease_key)
+
+    async def _load_shared(self) -> bool:
+        """Adopts a fresh token another worker stored in the shared cache."""
+        shared = await get_cache_backend().get(self.cache_key)
+        if not shared or shared["expires_at"] - time.time() <= self.refresh_margin:
+            return False
+        self.token = shared["token"]
+        self.expires_at = shared["expires_at"]
+        return True
+
+    async def _request_token(self, client: httpx.AsyncClient):
+        response = await client.post(
+            f"/app/installations/{self.installation_id}/access_tokens",
+            headers={
+                "Authorization": f"Bearer {self._generate_jwt()}",
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+            },
+        )
+        if response.status_code != 201:
+            raise Exception(
+                f"Failed to create GitHub installation token: {response.status_code}, {response.text}"
+            )
+
+        data = response.json()
+        self.token = data["token"]
+        self.expires_at = datetime.fromisoformat(data["expires_at"]).timestamp()
+        self.refreshes += 1
+
+        ttl = self._remaining() - _MIN_TOKEN_LIFETIME
+        if ttl > 0:
+            await get_cache_backend().set(
+                self.cache_key,
+                {"token": self.token, "expires_at": self.expires_at},
+                ttl=ttl,
+            )
+
+
+_managers: dict[tuple[str, str], InstallationTokenManager] = {}
+
+
+def get_installation_token_manager(
+    client_id: str, private_key: str, installation_id: str
+) -> InstallationTokenManager:
+    """Returns the worker-wide token manager for a GitHub App installation."""
+    key = (client_id, installation_id)
+    manager = _managers.get(key)
+    if manager is None:
+        manager = InstallationTokenManager(client_id, private_key, installation_id)
+        _managers[key] = manager
+    return manager
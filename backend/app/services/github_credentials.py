@@ -0,0 +1,318 @@
+import asyncio
+import hashlib
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+import httpx
+from app.services.github_auth import get_installation_token_manager
+
+load_dotenv()
+
+# Longest a request may queue for a rate limit reset before failing
+GITHUB_RATE_LIMIT_MAX_WAIT = float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT_SECONDS", "60"))
+
+# Hourly core API budgets, used until GitHub reports the real numbers
+_AUTHENTICATED_LIMIT = 5000
+_ANONYMOUS_LIMIT = 60
+# Hourly GraphQL points; anonymous requests cannot use GraphQL
+_GRAPHQL_LIMIT = 5000
+
+# Rate limit resources (X-RateLimit-Resource) requests are scheduled against
+CORE = "core"
+GRAPHQL = "graphql"
+
+# How long a credential is skipped after a GraphQL RATE_LIMITED error
+# that came without rate limit headers
+_GRAPHQL_BACKOFF = 60
+
+# Pools for user-supplied PATs are kept so their budgets survive between requests
+_MAX_PAT_POOLS = 1024
+
+
+@dataclass
+class RateLimit:
+    """A credential's budget for one rate limit resource ("core", "graphql"...)."""
+
+    limit: int
+    remaining: int | None = None  # None until GitHub reports it
+    reset_at: float = 0.0
+
+    def headroom(self, now: float) -> int:
+        """Requests left in the current window (the full limit once it has reset)."""
+        if self.remaining is None or now >= self.reset_at:
+            return self.limit
+        return self.remaining
+
+    def reserve(self, now: float):
+        """Counts a request against the budget before GitHub reports it."""
+        if self.remaining is None or now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + 3600
+        self.remaining -= 1
+
+
+@dataclass
+class GitHubCredential:
+    """One GitHub identity (PAT, App installation or anonymous) and its rate limits."""
+
+    kind: str  # "pat", "app" or "anonymous"
+    token: str | None = None
+    client_id: str | None = None
+    private_key: str | None = None
+    installation_id: str | None = None
+    limit: int = _AUTHENTICATED_LIMIT  # core budget until GitHub reports it
+    # Budgets by rate limit resource, created on first use
+    budgets: dict[str, RateLimit] = field(default_factory=dict)
+
+    @property
+    def scope(self) -> str:
+        """Identifies the credential without exposing the secret itself."""
+        if self.kind == "pat":
+            return "pat:" + hashlib.sha256(self.token.encode()).hexdigest()[:16]  # type: ignore
+        if self.kind == "app":
+            return f"app:{self.installation_id}"
+        return "anonymous"
+
+    async def headers(self, client: httpx.AsyncClient) -> dict:
+        if self.kind == "pat":
+            return {
+                "Authorization": f"token {self.token}",
+                "Accept": "application/vnd.github+json",
+            }
+        if self.kind == "app":
+            manager = get_installation_token_manager(
+                self.client_id, self.private_key, self.installation_id  # type: ignore
+            )
+            return {
+                "Authorization": f"Bearer {await manager.get_token(client)}",
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+            }
+        return {"Accept": "application/vnd.github+json"}
+
+    def budget(self, resource: str = CORE) -> RateLimit:
+        """Returns the budget of a rate limit resource."""
+        budget = self.budgets.get(resource)
+        if budget is None:
+            limit = self.limit
+            if resource == GRAPHQL:
+                limit = 0 if self.kind == "anonymous" else _GRAPHQL_LIMIT
+            budget = self.budgets[resource] = RateLimit(limit)
+        return budget
+
+    def headroom(self, now: float, resource: str = CORE) -> int:
+        return self.budget(resource).headroom(now)
+
+    def reserve(self, now: float, resource: str = CORE):
+        self.budget(resource).reserve(now)
+
+    def update(self, response: httpx.Response, resource: str = CORE) -> bool:
+        """
+        Records the rate limit GitHub reported for this credential.
+
+        Args:
+            resource (str): The resource the request was charged to, unless
+                GitHub names another in X-RateLimit-Resource
+
+        Returns:
+            bool: True if the response was rejected by a rate limit.
+        """
+        headers = response.headers
+        budget = self.budget(headers.get("X-RateLimit-Resource", resource))
+
+        if "X-RateLimit-Remaining" in headers:
+            budget.remaining = int(headers["X-RateLimit-Remaining"])
+            budget.reset_at = float(headers.get("X-RateLimit-Reset", budget.reset_at))
+            budget.limit = int(headers.get("X-RateLimit-Limit", budget.limit))
+
+        if response.status_code not in (403, 429):
+            return False
+        if "Retry-After" in headers:
+            # Secondary rate limit: back off for the time GitHub asks
+            budget.remaining = 0
+            budget.reset_at = time.time() + float(headers["Retry-After"])
+            return True
+        return budget.remaining == 0
+
+    def exhaust(self, resource: str, reset_at: float):
+        """Marks a budget as used up until `reset_at`."""
+        budget = self.budget(resource)
+        budget.remaining = 0
+        budget.reset_at = max(budget.reset_at, reset_at)
+
+
+def is_graphql_rate_limited(response: httpx.Response) -> bool:
+    """Whether a GraphQL response carries a RATE_LIMITED error (GitHub answers those with 200)."""
+    if response.status_code != 200 or b"RATE_LIMITED" not in response.content:
+        return False
+    try:
+        errors = response.json().get("errors") or []
+    except ValueError:
+        return False
+    return any(error.get("type") == "RATE_LIMITED" for error in errors)
+
+
+class CredentialPool:
+    """
+    Schedules GitHub requests across several credentials by rate limit headroom.
+
+    Each request goes out on the credential with the most requests left in
+    its window for the resource it is charged to (the REST "core" budget, or
+    "graphql"), as tracked from X-RateLimit-* response headers. When every
+    credential is exhausted, requests wait for the earliest reset, for up to
+    GITHUB_RATE_LIMIT_MAX_WAIT seconds, and fail with a ValueError beyond that.
+    """
+
+    def __init__(
+        self,
+        credentials: list[GitHubCredential],
+        max_wait: float = GITHUB_RATE_LIMIT_MAX_WAIT,
+    ):
+        if not credentials:
+            raise ValueError("A credential pool needs at least one credential.")
+        self.credentials = credentials
+        self.max_wait = max_wait
+        self.waits = 0
+        self.rate_limited = 0
+
+    @property
+    def scope(self) -> str:
+        """Identifies the pool, so caches keyed by it are not shared between pools."""
+        if len(self.credentials) == 1:
+            return self.credentials[0].scope
+        scopes = ",".join(sorted(c.scope for c in self.credentials))
+        return "pool:" + hashlib.sha256(scopes.encode()).hexdigest()[:16]
+
+    async def acquire(self, resource: str = CORE) -> GitHubCredential:
+        """
+        Returns the credential to use for the next request, waiting if needed.
+
+        Args:
+            resource (str): The rate limit resource the request is charged to
+
+        Raises:
+            ValueError: If no credential has quota left within the maximum wait.
+        """
+        if all(c.budget(resource).limit == 0 for c in self.credentials):
+            # e.g. GraphQL with only anonymous credentials
+            raise ValueError(f"No GitHub credential can send {resource} API requests.")
+        while True:
+            now = time.time()
+            best = max(self.credentials, key=lambda c: c.headroom(now, resource))
+            if best.headroom(now, resource) > 0:
+                best.reserve(now, resource)
+                return best
+
+            wait = min(c.budget(resource).reset_at for c in self.credentials) - now
+            if wait > self.max_wait:
+                minutes = math.ceil(wait / 60)
+                raise ValueError(
+                    f"GitHub API rate limit exceeded. Please try again in {minutes} minute{'s' if minutes != 1 else ''}, or provide a GitHub personal access token."
+                )
+            self.waits += 1
+            await asyncio.sleep(max(wait, 0.05))
+
+    def record(
+        self, credential: GitHubCredential, response: httpx.Response, resource: str = CORE
+    ) -> bool:
+        """Updates the credential's budget; True if the request was rate limited."""
+        limited = credential.update(response, resource)
+        if not limited and resource == GRAPHQL and is_graphql_rate_limited(response):
+            reset_at = float(response.headers.get("X-RateLimit-Reset", 0))
+            credential.exhaust(GRAPHQL, reset_at or time.time() + _GRAPHQL_BACKOFF)
+            limited = True
+        if limited:
+            self.rate_limited += 1
+        return limited
+
+    def headroom_fraction(self) -> float:
+        """Share of the pool's core requests still available in the current rate limit windows."""
+        now = time.time()
+        return sum(c.headroom(now) for c in self.credentials) / sum(
+            c.budget().limit for c in self.credentials
+        )
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "waits": self.waits,
+            "rate_limited": self.rate_limited,
+            "credentials": [
+                {
+                    "scope": c.scope,
+                    **{
+                        resource: {
+                            "remaining": budget.headroom(now),
+                            "limit": budget.limit,
+                            "reset_at": int(budget.reset_at) if budget.remaining is not None else None,
+                        }
+                        for resource, budget in {CORE: c.budget(), **c.budgets}.items()
+                    },
+                }
+                for c in self.credentials
+            ],
+        }
+
+
+_default_pools: dict[tuple, CredentialPool] = {}
+_pat_pools: OrderedDict[str, CredentialPool] = OrderedDict()
+
+
+def get_default_credential_pool() -> CredentialPool:
+    """
+    Returns the worker-wide pool of server credentials.
+
+    The pool holds every PAT in GITHUB_PATS (comma-separated) and GITHUB_PAT,
+    plus the GitHub App installation if GITHUB_CLIENT_ID, GITHUB_PRIVATE_KEY
+    and GITHUB_INSTALLATION_ID are set. Without any, requests are anonymous.
+    """
+    pats = [p.strip() for p in os.getenv("GITHUB_PATS", "").split(",") if p.strip()]
+    if os.getenv("GITHUB_PAT") and os.getenv("GITHUB_PAT") not in pats:
+        pats.append(os.getenv("GITHUB_PAT"))  # type: ignore
+    app = (
+        os.getenv("GITHUB_CLIENT_ID"),
+        os.getenv("GITHUB_PRIVATE_KEY"),
+        os.getenv("GITHUB_INSTALLATION_ID"),
+    )
+
+    config = (tuple(pats), app)
+    pool = _default_pools.get(config)
+    if pool is not None:
+        return pool
+
+    credentials = [GitHubCredential("pat", token=pat) for pat in pats]
+    if all(app):
+        client_id, private_key, installation_id = app
+        credentials.append(
+            GitHubCredential(
+                "app",
+                client_id=client_id,
+                private_key=private_key,
+                installation_id=installation_id,
+            )
+        )
+    if not credentials:
+        print(
+            "\033[93mWarning: No GitHub credentials provided. Using unauthenticated requests with rate limit of 60 requests/hour.\033[0m"
+        )
+        credentials = [GitHubCredential("anonymous", limit=_ANONYMOUS_LIMIT)]
+
+    pool = CredentialPool(credentials)
+    _default_pools[config] = pool
+    return pool
+
+
+def get_pat_credential_pool(pat: str) -> CredentialPool:
+    """Returns the pool for a user-supplied PAT, which is only used for that user."""
+    pool = _pat_pools.get(pat)
+    if pool is None:
+        pool = CredentialPool([GitHubCredential("pat", token=pat)])
+        _pat_pools[pat] = pool
+        if len(_pat_pools) > _MAX_PAT_POOLS:
+            _pat_pools.popitem(last=False)
+    else:
+        _pat_pools.move_to_end(pat)
+    return pool
@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+
+# README names tried in one query, in order of preference; anything else
+# (README.txt, docs/README.md...) falls back to the REST README endpoint
+GRAPHQL_README_NAMES = ["README.md", "readme.md", "README.rst"]
+
+_REPOSITORY_FIELDS = """
+    defaultBranchRef { name target { oid } }
+    visibility
+    diskUsage
+    isArchived
+    isFork
+    parent { nameWithOwner }
+"""
+
+
+@dataclass
+class RepositoryQuery:
+    """A GraphQL query for a repository's metadata and README, and its variables."""
+
+    query: str
+    variables: dict
+    # Variable name of each README candidate, in order of preference
+    readme_aliases: list[str]
+
+
+def readme_candidates(path: str = "") -> list[str]:
+    """README paths to try: the subdirectory's first, then the repository's."""
+    candidates = [f"{path}/{name}" for name in GRAPHQL_README_NAMES] if path else []
+    return candidates + GRAPHQL_README_NAMES
+
+
+def build_repository_query(
+    username: str, repo: str, sha: str | None = None, path: str = ""
+) -> RepositoryQuery:
+    """
+    Builds one query for the default branch HEAD, metadata and README.
+
+    Each README candidate is an aliased `object(expression: "<rev>:<path>")`
+    lookup, so every candidate is tried in the same round trip.
+
+    Args:
+        sha (str | None): Commit to read the README at; the default branch HEAD if None
+        path (str): Subdirectory whose README is preferred
+    """
+    revision = sha or "HEAD"
+    variables = {"owner": username, "name": repo}
+    declarations = ["$owner: String!", "$name: String!"]
+    lookups, aliases = [], []
+    for i, candidate in enumerate(readme_candidates(path)):
+        alias = f"readme{i}"
+        variables[alias] = f"{revision}:{candidate}"
+        declarations.append(f"${alias}: String!")
+        lookups.append(f"{alias}: object(expression: ${alias}) {{ ... on Blob {{ text isBinary }} }}")
+        aliases.append(alias)
+
+    query = (
+        f"query({', '.join(declarations)}) {{\n"
+        f"  repository(owner: $owner, name: $name) {{{_REPOSITORY_FIELDS}"
+        + "".join(f"    {lookup}\n" for lookup in lookups)
+        + "  }\n}"
+    )
+    return RepositoryQuery(query=query, variables=variables, readme_aliases=aliases)
+
+
+def parse_repository_response(
+    payload: dict, query: RepositoryQuery
+) -> tuple[dict, str, str | None]:
+    """
+    Reads a repository query response.
+
+    Returns:
+        tuple[dict, str, str | None]: The metadata in the shape of the REST
+            /repos/{owner}/{repo} response (default_branch, size, visibility,
+            archived, fork, parent), the default branch HEAD SHA, and the
+            first README found (None if no candidate exists)
+
+    Raises:
+        ValueError: If the repository does not exist or is empty.
+        Exception: For other GraphQL errors.
+    """
+    errors = payload.get("errors") or []
+    error_types = {error.get("type") for error in errors}
+    if "RATE_LIMITED" in error_types:
+        raise ValueError("GitHub API rate limit exceeded. Please try again later.")
+    if "NOT_FOUND" in error_types:
+        raise ValueError("Repository not found.")
+    repository = (payload.get("data") or {}).get("repository")
+    if repository is None:
+        if errors:
+            raise Exception(f"GitHub GraphQL query failed: {errors[0].get('message')}")
+        raise ValueError("Repository not found.")
+
+    branch = repository.get("defaultBranchRef")
+    if branch is None:
+        raise ValueError("Repository is empty.")
+
+    parent = repository.get("parent")
+    visibility = (repository.get("visibility") or "").lower()
+    metadata = {
+        "default_branch": branch["name"],
+        "size": repository.get("diskUsage"),
+        "visibility": visibility,
+        "private": visibility != "public",
+        "archived": repository.get("isArchived", False),
+        "fork": repository.get("isFork", False),
+        "parent": {"full_name": parent["nameWithOwner"]} if parent else None,
+    }
+
+    readme = None
+    for alias in query.readme_aliases:
+        blob = repository.get(alias)
+        if blob and not blob.get("isBinary") and blob.get("text") is not None:
+            readme = blob["text"]
+            break
+    return metadata, branch["target"]["oid"], readme
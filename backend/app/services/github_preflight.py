@@ -0,0 +1,110 @@
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+# Repository size thresholds in KB, as reported by GitHub's `size` field
+# (the size of the git repository, history included). 0 disables a threshold.
+# Above this, the recursive listing would likely be truncated: walk subtrees directly
+GITHUB_PREFLIGHT_WALK_SIZE_KB = int(os.getenv("GITHUB_PREFLIGHT_WALK_SIZE_KB", "1048576"))
+# Above this, only the top levels of the tree are listed
+GITHUB_PREFLIGHT_CONDENSED_SIZE_KB = int(os.getenv("GITHUB_PREFLIGHT_CONDENSED_SIZE_KB", "4194304"))
+# Above this, the repository is rejected
+GITHUB_PREFLIGHT_MAX_SIZE_KB = int(os.getenv("GITHUB_PREFLIGHT_MAX_SIZE_KB", "0"))
+# In "auto" ingestion mode, repositories up to this size are read from one archive
+GITHUB_PREFLIGHT_TARBALL_MAX_SIZE_KB = int(os.getenv("GITHUB_PREFLIGHT_TARBALL_MAX_SIZE_KB", "10240"))
+
+# Directory levels listed by the condensed strategy
+CONDENSED_TREE_DEPTH = 2
+
+
+@dataclass
+class FetchPlan:
+    """How a repository's contents will be fetched, chosen from its metadata."""
+
+    # "tree": one recursive tree listing; "walk": subtree listings in parallel;
+    # "tarball": one streamed archive; "condensed": the top levels of the tree only
+    strategy: str
+    reason: str
+    size_kb: int | None = None
+    notes: list[str] = field(default_factory=list)
+
+    def report(self) -> dict:
+        return {
+            "strategy": self.strategy,
+            "reason": self.reason,
+            "size_kb": self.size_kb,
+            "notes": self.notes,
+        }
+
+
+def _format_size(size_kb: int) -> str:
+    if size_kb >= 1024 * 1024:
+        return f"{size_kb / 1024 / 1024:.1f} GB"
+    if size_kb >= 1024:
+        return f"{size_kb / 1024:.1f} MB"
+    return f"{size_kb} KB"
+
+
+def plan_fetch(metadata: dict, ingestion_mode: str = "api", path: str = "") -> FetchPlan:
+    """
+    Picks a fetch strategy from the /repos/{owner}/{repo} response.
+
+    The metadata is fetched anyway (for the default branch), so deciding
+    from it costs nothing, and oversized repositories are turned away before
+    any tree is downloaded. Empty repositories never get here: resolving
+    their HEAD already fails.
+
+    Args:
+        metadata (dict): The repository metadata
+        ingestion_mode (str): "api", "tarball" or "auto" (GITHUB_INGESTION_MODE)
+        path (str): Subdirectory the request is scoped to, if any
+
+    Returns:
+        FetchPlan: The strategy and why it was chosen
+
+    Raises:
+        ValueError: If the repository is larger than GITHUB_PREFLIGHT_MAX_SIZE_KB.
+    """
+    size_kb = metadata.get("size")
+    notes = []
+    if metadata.get("archived"):
+        notes.append("Repository is archived.")
+    if metadata.get("fork"):
+        parent = (metadata.get("parent") or {}).get("full_name")
+        notes.append(f"Repository is a fork of {parent}." if parent else "Repository is a fork.")
+
+    def plan(strategy: str, reason: str) -> FetchPlan:
+        return FetchPlan(strategy=strategy, reason=reason, size_kb=size_kb, notes=notes)
+
+    # Metadata without a size (e.g. from a GitHub Enterprise proxy) gives no hint
+    if size_kb is None:
+        if ingestion_mode == "tarball" and not path:
+            return plan("tarball", "Tarball ingestion is configured.")
+        return plan("tree", "Repository size unknown.")
+
+    if GITHUB_PREFLIGHT_MAX_SIZE_KB and size_kb > GITHUB_PREFLIGHT_MAX_SIZE_KB:
+        raise ValueError(
+            f"Repository is too large to diagram ({_format_size(size_kb)}). "
+            "Try a subdirectory with the path option."
+        )
+
+    size = _format_size(size_kb)
+    # The size covers the whole repository, so a subdirectory is only walked
+    if GITHUB_PREFLIGHT_CONDENSED_SIZE_KB and size_kb > GITHUB_PREFLIGHT_CONDENSED_SIZE_KB and not path:
+        return plan(
+            "condensed",
+            f"Very large repository ({size}); only the top {CONDENSED_TREE_DEPTH} levels are listed.",
+        )
+    if GITHUB_PREFLIGHT_WALK_SIZE_KB and size_kb > GITHUB_PREFLIGHT_WALK_SIZE_KB:
+        return plan("walk", f"Large repository ({size}); listing subtrees in parallel.")
+
+    # An archive always holds the whole repository, so it never suits a
+    # request scoped to a subdirectory
+    if not path:
+        if ingestion_mode == "tarball":
+            return plan("tarball", "Tarball ingestion is configured.")
+        if ingestion_mode == "auto" and size_kb <= GITHUB_PREFLIGHT_TARBALL_MAX_SIZE_KB:
+            return plan("tarball", f"Small repository ({size}); reading one archive.")
+    return plan("tree", f"Repository size {size}; one recursive tree listing.")
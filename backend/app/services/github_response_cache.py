@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+import httpx
+import os
+
+
+@dataclass
+class CachedResponse:
+    """A GitHub response body stored with its validators."""
+
+    etag: str | None
+    last_modified: str | None
+    content: bytes
+    content_type: str | None
+
+
+class GitHubResponseCache:
+    """
+    Conditional-request cache for GitHub API responses.
+
+    Bodies are stored with their ETag / Last-Modified validators. Requests
+    for a cached URL are sent with If-None-Match / If-Modified-Since, and a
+    304 Not Modified answer is served from the stored body. GitHub does not
+    count 304s against the primary rate limit, and the body is not
+    re-transferred.
+
+    Entries are keyed by credential scope so private responses fetched with
+    one credential are never revalidated with another. The cache is bounded
+    by total body size and evicts least recently used entries.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def conditional_headers(self, key: tuple) -> dict:
+        """Returns the validator headers to send for a cached key (if any)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return {}
+
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def resolve(self, key: tuple, response: httpx.Response) -> httpx.Response:
+        """
+        Stores fresh responses and expands 304s into the cached response.
+
+        Args:
+            key (tuple): Cache key the request was sent with
+            response (httpx.Response): Response received from GitHub
+
+        Returns:
+            httpx.Response: The response to hand back to the caller
+        """
+        if response.status_code == 304 and key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            entry = self._entries[key]
+            headers = {"Content-Type": entry.content_type} if entry.content_type else {}
+            return httpx.Response(
+                200, content=entry.content, headers=headers, request=response.request
+            )
+
+        if response.status_code == 200:
+            self.misses += 1
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self._store(
+                    key,
+                    CachedResponse(
+                        etag=etag,
+                        last_modified=last_modified,
+                        content=response.content,
+                        content_type=response.headers.get("Content-Type"),
+                    ),
+                )
+        return response
+
+    def _store(self, key: tuple, entry: CachedResponse):
+        if len(entry.content) > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key).content)
+        self._entries[key] = entry
+        self._size += len(entry.content)
+
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.content)
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+        self.hits = self.misses = 0
+
+
+# Shared by every GitHubService instance in this worker
+response_cache = GitHubResponseCache(
+    max_bytes=int(os.getenv("GITHUB_RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+)
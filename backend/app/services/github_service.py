@@ -1,95 +1,288 @@
-import requests
-import jwt
-import time
-from datetime import datetime, timedelta
+import asyncio
+import httpx
+import re
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+from urllib.parse import quote
 from dotenv import load_dotenv
+from app.services.github_credentials import (
+    GRAPHQL,
+    CredentialPool,
+    GitHubCredential,
+    get_default_credential_pool,
+    get_pat_credential_pool,
+)
+from app.services.github_graphql import build_repository_query, parse_repository_response
+from app.services.github_preflight import CONDENSED_TREE_DEPTH, plan_fetch
+from app.services.github_response_cache import GitHubResponseCache, response_cache
+from app.services.repository_source import (
+    MANIFEST_FILES,
+    MANIFEST_MAX_BYTES,
+    MANIFEST_MAX_FILES,
+    RepositoryData,
+    RepositorySource,
+    is_readme_candidate,
+    normalize_ref,
+    select_readme,
+)
+from app.utils.file_tree import FileTree
+from app.utils.path_filter import PathFilter, default_path_filter
+from app.utils.tar_stream import TarStreamParser
+from app.utils.tree_decoder import TreeStreamDecoder
 import os
 
 load_dotenv()
 
+GITHUB_API_URL = "https://api.github.com"
+
+# Bounds for walking trees GitHub truncated (over 100k entries or 7 MB)
+GITHUB_TREE_CONCURRENCY = int(os.getenv("GITHUB_TREE_CONCURRENCY", "8"))
+GITHUB_TREE_MAX_REQUESTS = int(os.getenv("GITHUB_TREE_MAX_REQUESTS", "200"))
+
+# How repository contents are fetched: "api" (tree and README endpoints),
+# "tarball" (one streamed archive download, which also yields manifests) or
+# "auto" (an archive for small repositories, the API otherwise)
+GITHUB_INGESTION_MODE = os.getenv("GITHUB_INGESTION_MODE", "api").lower()
+
+# How repository metadata, the HEAD SHA and the README are fetched: "rest"
+# (separate requests) or "graphql" (one query). GraphQL needs a token, so
+# anonymous requests always use REST.
+GITHUB_METADATA_API = os.getenv("GITHUB_METADATA_API", "rest").lower()
+
+_COMMIT_SHA = re.compile(r"[0-9a-fA-F]{40}")
+
+# One pooled client per worker process, shared by every GitHubService instance
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_github_client() -> httpx.AsyncClient:
+    """
+    Returns the worker-wide GitHub HTTP client, creating it on first use.
+
+    The client keeps connections alive between requests, so repeated GitHub
+    calls skip the TCP and TLS handshakes.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=GITHUB_API_URL,
+            timeout=httpx.Timeout(
+                float(os.getenv("GITHUB_HTTP_TIMEOUT", "30")), connect=10.0
+            ),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("GITHUB_HTTP_MAX_CONNECTIONS", "50")),
+                max_keepalive_connections=20,
+            ),
+            headers={"User-Agent": "gitdiagram"},
+            follow_redirects=True,
+        )
+    return _http_client
+
+
+async def close_github_client():
+    """Closes the worker-wide GitHub HTTP client (called on app shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def repository_visibility(metadata: dict) -> str:
+    """
+    Reads "public", "private" or "internal" from repository metadata.
+
+    Metadata without a visibility counts as private, so nothing is shared
+    across credentials unless GitHub says the repository is public.
+    """
+    if metadata.get("visibility"):
+        return metadata["visibility"].lower()
+    return "private" if metadata.get("private", True) else "public"
+
+
+class GitHubService(RepositorySource):
+    def __init__(
+        self,
+        pat: str | None = None,
+        client: httpx.AsyncClient | None = None,
+        cache: GitHubResponseCache | None = None,
+        path_filter: PathFilter | None = None,
+        pool: CredentialPool | None = None,
+        ingestion_mode: str | None = None,
+        metadata_api: str | None = None,
+    ):
+        # A user-supplied PAT is only used for that user; otherwise share the
+        # server's credentials (PATs and/or the GitHub App installation)
+        if pool is None:
+            pool = get_pat_credential_pool(pat) if pat else get_default_credential_pool()
+        self.pool = pool
+
+        # Allow injecting a client (e.g. for tests), otherwise share the pooled one
+        self._client = client
+        self.cache = cache if cache is not None else response_cache
+        self.path_filter = path_filter or default_path_filter
+        self.ingestion_mode = ingestion_mode or GITHUB_INGESTION_MODE
+        if self.ingestion_mode not in ("api", "tarball", "auto"):
+            raise ValueError(
+                f"Unknown GITHUB_INGESTION_MODE: {self.ingestion_mode}. Use api, tarball or auto."
+            )
+        self.metadata_api = metadata_api or GITHUB_METADATA_API
+        if self.metadata_api not in ("rest", "graphql"):
+            raise ValueError(
+                f"Unknown GITHUB_METADATA_API: {self.metadata_api}. Use rest or graphql."
+            )
 
-class GitHubService:
-    def __init__(self, pat: str | None = None):
-        # Try app authentication first
-        self.client_id = os.getenv("GITHUB_CLIENT_ID")
-        self.private_key = os.getenv("GITHUB_PRIVATE_KEY")
-        self.installation_id = os.getenv("GITHUB_INSTALLATION_ID")
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_github_client()
+
+    def credential_scope(self) -> str:
+        """Identifies the credentials in use without exposing the secrets themselves."""
+        return self.pool.scope
+
+    async def _get(
+        self,
+        url: str,
+        accept: str | None = None,
+        params: dict | None = None,
+        conditional: bool = True,
+    ) -> httpx.Response:
+        """
+        Sends an authenticated GET request through the pooled client.
 
-        # Use provided PAT if available, otherwise fallback to env PAT
-        self.github_token = pat or os.getenv("GITHUB_PAT")
+        Requests are revalidated against the response cache, so unchanged
+        resources come back as a cheap 304 and are served from the cache.
+        Pass conditional=False for immutable resources (addressed by SHA),
+        which are cached downstream and would only waste response-cache space.
+        """
+        # Requests rejected by a rate limit are retried on another credential,
+        # or queued until the limit resets
+        for _ in range(len(self.pool.credentials) + 1):
+            credential = await self.pool.acquire()
+            response = await self._send(credential, url, accept, params, conditional)
+            if not self.pool.record(credential, response):
+                return response
+        raise ValueError("GitHub API rate limit exceeded. Please try again later.")
+
+    async def _send(
+        self,
+        credential: GitHubCredential,
+        url: str,
+        accept: str | None,
+        params: dict | None,
+        conditional: bool,
+    ) -> httpx.Response:
+        headers = await credential.headers(self.client)
+        if accept:
+            headers["Accept"] = accept
+        if not conditional:
+            return await self.client.get(url, headers=headers, params=params)
+
+        # Keyed by the pool: any of its credentials may revalidate the entry
+        key = (
+            self.credential_scope(),
+            url,
+            tuple(sorted((params or {}).items())),
+            headers["Accept"],
+        )
+        response = await self.client.get(
+            url, headers={**headers, **self.cache.conditional_headers(key)}, params=params
+        )
+        response = self.cache.resolve(key, response)
+
+        if response.status_code == 304:
+            # The cached body was evicted while the request was in flight
+            response = await self.client.get(url, headers=headers, params=params)
+            response = self.cache.resolve(key, response)
+        return response
+
+    @asynccontextmanager
+    async def _stream(
+        self, url: str, accept: str | None = None, params: dict | None = None
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Sends an authenticated GET request whose body is read as a stream.
 
-        # If no credentials are provided, warn about rate limits
-        if (
-            not all([self.client_id, self.private_key, self.installation_id])
-            and not self.github_token
-        ):
-            print(
-                "\033[93mWarning: No GitHub credentials provided. Using unauthenticated requests with rate limit of 60 requests/hour.\033[0m"
-            )
+        Like `_get`, requests rejected by a rate limit are retried on another
+        credential. Streamed bodies bypass the response cache.
 
-        self.access_token = None
-        self.token_expires_at = None
-
-    # autopep8: off
-    def _generate_jwt(self):
-        now = int(time.time())
-        payload = {
-            "iat": now,
-            "exp": now + (10 * 60),  # 10 minutes
-            "iss": self.client_id,
-        }
-        # Convert PEM string format to proper newlines
-        return jwt.encode(payload, self.private_key, algorithm="RS256")  # type: ignore
-
-    # autopep8: on
-
-    def _get_installation_token(self):
-        if self.access_token and self.token_expires_at > datetime.now():  # type: ignore
-            return self.access_token
-
-        jwt_token = self._generate_jwt()
-        response = requests.post(
-            f"https://api.github.com/app/installations/{
-                self.installation_id}/access_tokens",
-            headers={
-                "Authorization": f"Bearer {jwt_token}",
-                "Accept": "application/vnd.github+json",
-            },
+        Raises:
+            ValueError: If every attempt was rejected by a rate limit.
+        """
+        for _ in range(len(self.pool.credentials) + 1):
+            credential = await self.pool.acquire()
+            headers = await credential.headers(self.client)
+            if accept:
+                headers["Accept"] = accept
+            async with self.client.stream(
+                "GET", url, headers=headers, params=params
+            ) as response:
+                if not self.pool.record(credential, response):
+                    yield response
+                    return
+        raise ValueError("GitHub API rate limit exceeded. Please try again later.")
+
+    @property
+    def uses_graphql(self) -> bool:
+        """Whether metadata is fetched with GraphQL, which rejects anonymous requests."""
+        return self.metadata_api == "graphql" and any(
+            credential.kind != "anonymous" for credential in self.pool.credentials
         )
-        data = response.json()
-        self.access_token = data["token"]
-        self.token_expires_at = datetime.now() + timedelta(hours=1)
-        return self.access_token
-
-    def _get_headers(self):
-        # If no credentials are available, return basic headers
-        if (
-            not all([self.client_id, self.private_key, self.installation_id])
-            and not self.github_token
-        ):
-            return {"Accept": "application/vnd.github+json"}
-
-        # Use PAT if available
-        if self.github_token:
-            return {
-                "Authorization": f"token {self.github_token}",
-                "Accept": "application/vnd.github+json",
-            }
-
-        # Otherwise use app authentication
-        token = self._get_installation_token()
-        return {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/vnd.github+json",
-            "X-GitHub-Api-Version": "2022-11-28",
-        }
-
-    def _check_repository_exists(self, username, repo):
+
+    async def _post_graphql(self, query: str, variables: dict) -> dict:
         """
-        Check if the repository exists using the GitHub API.
+        Sends an authenticated GraphQL query through the pooled client.
+
+        Queries are charged to each credential's GraphQL budget, and a query
+        rejected by a rate limit (a 403, or a RATE_LIMITED error in a 200
+        response) is retried on another credential.
+
+        Raises:
+            ValueError: If every attempt was rejected by a rate limit.
+            Exception: If the query could not be sent.
         """
-        api_url = f"https://api.github.com/repos/{username}/{repo}"
-        response = requests.get(api_url, headers=self._get_headers())
+        for _ in range(len(self.pool.credentials) + 1):
+            credential = await self.pool.acquire(GRAPHQL)
+            headers = await credential.headers(self.client)
+            response = await self.client.post(
+                "/graphql", headers=headers, json={"query": query, "variables": variables}
+            )
+            if self.pool.record(credential, response, GRAPHQL):
+                continue
+            if response.status_code != 200:
+                raise Exception(
+                    f"Failed to query GitHub GraphQL API: {response.status_code}, {response.text}"
+                )
+            return response.json()
+        raise ValueError("GitHub API rate limit exceeded. Please try again later.")
+
+    async def _query_repository(
+        self, username, repo, sha: str | None = None, path: str = ""
+    ) -> tuple[dict, str, str | None]:
+        """
+        Fetches the metadata, default branch HEAD SHA and README in one GraphQL query.
+
+        Returns:
+            tuple[dict, str, str | None]: The metadata (shaped like the REST
+                response), the HEAD SHA and the README, or None if it is not
+                one of the names the query tries
+
+        Raises:
+            ValueError: If the repository does not exist or is empty.
+            Exception: For other unexpected API errors.
+        """
+        query = build_repository_query(username, repo, sha, path)
+        payload = await self._post_graphql(query.query, query.variables)
+        return parse_repository_response(payload, query)
+
+    async def _get_repository(self, username, repo) -> dict:
+        """
+        Fetches the repository metadata (default branch, size, visibility...).
+
+        Raises:
+            ValueError: If the repository does not exist.
+            Exception: For other unexpected API errors.
+        """
+        response = await self._get(f"/repos/{username}/{repo}")
 
         if response.status_code == 404:
             raise ValueError("Repository not found.")
@@ -97,109 +290,377 @@ class GitHubService:
             raise Exception(
                 f"Failed to check repository: {response.status_code}, {response.json()}"
             )
+        return response.json()
+
+    async def _check_repository_exists(self, username, repo):
+        """
+        Check if the repository exists using the GitHub API.
+        """
+        await self._get_repository(username, repo)
 
-    def get_default_branch(self, username, repo):
+    async def get_default_branch(self, username, repo):
         """Get the default branch of the repository."""
-        api_url = f"https://api.github.com/repos/{username}/{repo}"
-        response = requests.get(api_url, headers=self._get_headers())
+        response = await self._get(f"/repos/{username}/{repo}")
 
         if response.status_code == 200:
             return response.json().get("default_branch")
         return None
 
-    def get_github_file_paths_as_list(self, username, repo):
+    async def get_head_sha(self, username, repo, ref: str = "HEAD") -> str:
         """
-        Fetches the file tree of an open-source GitHub repository,
-        excluding static files and generated code.
+        Resolves a ref (the default branch HEAD by default) to its commit SHA.
 
-        Args:
-            username (str): The GitHub username or organization name
-            repo (str): The repository name
+        Uses the application/vnd.github.sha media type, so the response body
+        is just the 40-character SHA and revalidations are cheap 304s.
+
+        Raises:
+            ValueError: If the ref is invalid, or the repository does not exist or is empty.
+            Exception: For other unexpected API errors.
+        """
+        ref = normalize_ref(ref)
+        response = await self._get(
+            f"/repos/{username}/{repo}/commits/{quote(ref, safe='/')}",
+            accept="application/vnd.github.sha",
+        )
+
+        if response.status_code in (404, 422):
+            if ref != "HEAD":
+                raise ValueError(f"Ref not found: {ref}")
+            raise ValueError("Repository not found.")
+        elif response.status_code == 409:
+            raise ValueError("Repository is empty.")
+        elif response.status_code != 200:
+            raise Exception(
+                f"Failed to resolve {ref}: {response.status_code}, {response.text}"
+            )
+        sha = response.text.strip()
+        if not _COMMIT_SHA.fullmatch(sha):
+            raise Exception(f"Failed to resolve {ref}: unexpected response {sha[:80]!r}")
+        return sha
+
+    async def _list_tree(
+        self,
+        username,
+        repo,
+        tree_ish,
+        recursive: bool,
+        prefix: str = "",
+        skip: Callable[[str, bool], bool] | None = None,
+    ) -> TreeStreamDecoder | None:
+        """
+        Fetches and decodes one git tree listing, or None if it is unavailable.
+
+        Listings are decoded incrementally, keeping only paths, entry types
+        and directory SHAs, and entries matching `skip` are dropped as they
+        are read. Listings by SHA are immutable, so they are streamed straight
+        from the socket; listings by branch name go through the response
+        cache to be revalidated.
+        """
+        url = f"/repos/{username}/{repo}/git/trees/{quote(tree_ish, safe='/')}"
+        params = {"recursive": "1"} if recursive else None
+        decoder = TreeStreamDecoder(prefix, skip)
+
+        is_sha = len(tree_ish) == 40 and all(c in "0123456789abcdef" for c in tree_ish)
+        if is_sha:
+            async with self._stream(url, params=params) as response:
+                if response.status_code != 200:
+                    return None
+                async for chunk in response.aiter_bytes():
+                    decoder.feed(chunk)
+        else:
+            response = await self._get(url, params=params)
+            if response.status_code != 200:
+                return None
+            decoder.feed(response.content)
+
+        decoder.close()
+        return decoder
+
+    async def _walk_truncated_tree(
+        self,
+        username,
+        repo,
+        root_sha,
+        skip: Callable[[str, bool], bool] | None = None,
+        prefix: str = "",
+        max_depth: int | None = None,
+    ) -> list[tuple[str, bool]]:
+        """
+        Rebuilds a tree GitHub truncated, breadth first, one subtree per request.
+
+        Starting from the root listing, every directory `skip` keeps is
+        fetched recursively by SHA (subtrees that are themselves truncated
+        are listed one level at a time). Requests run with bounded concurrency
+        and excluded directories such as node_modules/ are never fetched. Past
+        GITHUB_TREE_MAX_REQUESTS, remaining directories are listed without
+        their contents so latency stays predictable.
+
+        With `max_depth`, directories are listed one level at a time and
+        nothing deeper than `max_depth` levels below `prefix` is fetched.
 
         Returns:
-            str: A filtered and formatted string of file paths in the repository, one per line.
+            list[tuple[str, bool]]: (path, is_dir) entries in git tree order.
         """
+        semaphore = asyncio.Semaphore(GITHUB_TREE_CONCURRENCY)
+        if skip is None:
+            skip = self.path_filter.exclusion_checker()
+
+        async def fetch(prefix, sha, recursive):
+            async with semaphore:
+                listing = await self._list_tree(username, repo, sha, recursive, prefix, skip)
+            if listing is None:
+                raise Exception(f"Failed to fetch subtree {prefix or '/'} of {username}/{repo}")
+            return prefix, recursive, listing
+
+        entries: list[tuple[str, bool]] = []
+        root_prefix = prefix
+        pending = [(prefix, root_sha, False)]
+        budget = GITHUB_TREE_MAX_REQUESTS
+
+        while pending and budget > 0:
+            # Directories past the budget stay pending, so they are counted below
+            batch, pending = pending[:budget], pending[budget:]
+            budget -= len(batch)
+
+            for prefix, recursive, listing in await asyncio.gather(
+                *(fetch(*job) for job in batch)
+            ):
+                if recursive and listing.truncated:
+                    # Still too big: list this subtree one level at a time instead
+                    pending.append((prefix, listing.sha, False))
+                    continue
+
+                for path, is_dir, sha in listing.entries:
+                    if max_depth is not None:
+                        if is_dir and path[len(root_prefix):].count("/") + 1 < max_depth:
+                            pending.append((path + "/", sha, False))
+                    elif not recursive and is_dir:
+                        pending.append((path + "/", sha, True))
+                    entries.append((path, is_dir))
+
+        if pending:
+            print(
+                f"\033[93mWarning: {username}/{repo} tree walk stopped after "
+                f"{GITHUB_TREE_MAX_REQUESTS} requests; {len(pending)} subtrees left unexpanded.\033[0m"
+            )
 
-        def should_include_file(path):
-            # Patterns to exclude
-            excluded_patterns = [
-                # Dependencies
-                "node_modules/",
-                "vendor/",
-                "venv/",
-                # Compiled files
-                ".min.",
-                ".pyc",
-                ".pyo",
-                ".pyd",
-                ".so",
-                ".dll",
-                ".class",
-                # Asset files
-                ".jpg",
-                ".jpeg",
-                ".png",
-                ".gif",
-                ".ico",
-                ".svg",
-                ".ttf",
-                ".woff",
-                ".webp",
-                # Cache and temporary files
-                "__pycache__/",
-                ".cache/",
-                ".tmp/",
-                # Lock files and logs
-                "yarn.lock",
-                "poetry.lock",
-                "*.log",
-                # Configuration files
-                ".vscode/",
-                ".idea/",
-            ]
-
-            return not any(pattern in path.lower() for pattern in excluded_patterns)
-
-        # Try to get the default branch first
-        branch = self.get_default_branch(username, repo)
-        if branch:
-            api_url = f"https://api.github.com/repos/{
-                username}/{repo}/git/trees/{branch}?recursive=1"
-            response = requests.get(api_url, headers=self._get_headers())
+        # Git tree order: compare directories as if their name ended with "/"
+        entries.sort(key=lambda entry: entry[0] + "/" if entry[1] else entry[0])
+        return entries
 
-            if response.status_code == 200:
-                data = response.json()
-                if "tree" in data:
-                    # Filter the paths and join them with newlines
-                    paths = [
-                        item["path"]
-                        for item in data["tree"]
-                        if should_include_file(item["path"])
-                    ]
-                    return "\n".join(paths)
-
-        # If default branch didn't work or wasn't found, try common branch names
-        for branch in ["main", "master"]:
-            api_url = f"https://api.github.com/repos/{
-                username}/{repo}/git/trees/{branch}?recursive=1"
-            response = requests.get(api_url, headers=self._get_headers())
+    async def _get_subtree_sha(self, username, repo, sha, path) -> str:
+        """
+        Finds the SHA of the directory `path` at commit `sha`.
 
-            if response.status_code == 200:
-                data = response.json()
-                if "tree" in data:
-                    # Filter the paths and join them with newlines
-                    paths = [
-                        item["path"]
-                        for item in data["tree"]
-                        if should_include_file(item["path"])
-                    ]
-                    return "\n".join(paths)
+        Walks down one non-recursive listing per path segment, so only the
+        directories leading to `path` are listed.
+
+        Raises:
+            ValueError: If the path is not a directory of the repository.
+        """
+        tree_sha = sha
+        walked = ""
+        for name in path.split("/"):
+            listing = await self._list_tree(username, repo, tree_sha, recursive=False)
+            if listing is None:
+                raise Exception(f"Failed to fetch subtree {walked or '/'} of {username}/{repo}")
+            walked = f"{walked}/{name}" if walked else name
+            tree_sha = next(
+                (entry_sha for entry_path, is_dir, entry_sha in listing.entries
+                 if is_dir and entry_path == name),
+                None,
+            )
+            if tree_sha is None:
+                raise ValueError(f"Path not found in repository: {walked}")
+        return tree_sha
+
+    async def _get_file_tree(
+        self, username, repo, tree_ish, path: str = "", strategy: str = "tree"
+    ) -> FileTree | None:
+        """
+        Fetches the filtered recursive tree of a branch or SHA, or None if unavailable.
+
+        With a subdirectory `path`, only that directory's subtree is fetched
+        (by its SHA); paths stay relative to the repository root, under the
+        directories leading to `path`. The "walk" strategy skips the
+        recursive listing (which would come back truncated) and lists
+        subtrees straight away; "condensed" only lists the top levels.
+        """
+        prefix = ""
+        if path:
+            tree_ish = await self._get_subtree_sha(username, repo, tree_ish, path)
+            prefix = path + "/"
+
+        # Excluded entries are dropped while the listing is decoded
+        is_excluded = self.path_filter.exclusion_checker()
+        if strategy in ("walk", "condensed"):
+            entries = await self._walk_truncated_tree(
+                username,
+                repo,
+                tree_ish,
+                is_excluded,
+                prefix,
+                max_depth=CONDENSED_TREE_DEPTH if strategy == "condensed" else None,
+            )
+            return FileTree.from_entries(self.path_filter.apply_include_rules(entries))
+
+        listing = await self._list_tree(
+            username, repo, tree_ish, recursive=True, prefix=prefix, skip=is_excluded
+        )
+        if listing is None:
+            return None
+
+        if listing.truncated:
+            entries = await self._walk_truncated_tree(
+                username, repo, listing.sha, is_excluded, prefix
+            )
+        else:
+            entries = [(path, is_dir) for path, is_dir, _ in listing.entries]
+
+        return FileTree.from_entries(self.path_filter.apply_include_rules(entries))
+
+    async def _get_tree_with_fallback(self, username, repo, default_branch) -> str:
+        """Fetches the tree of the default branch, falling back to common branch names."""
+        branches = [default_branch] if default_branch else []
+        branches += [b for b in ["main", "master"] if b != default_branch]
+
+        for branch in branches:
+            file_tree = await self._get_file_tree(username, repo, branch)
+            if file_tree is not None:
+                return file_tree.render()
 
         raise ValueError(
             "Could not fetch repository file tree. Repository might not exist, be empty or private."
         )
 
-    def get_github_readme(self, username, repo):
+    async def _get_raw_readme(
+        self, username, repo, ref: str | None = None, path: str = ""
+    ) -> str:
+        """
+        Fetches the README body directly via the raw media type (one request).
+
+        With a subdirectory `path`, that directory's README is preferred and
+        the repository's README is the fallback.
+        """
+        params = {"ref": ref} if ref else None
+        if path:
+            response = await self._get(
+                f"/repos/{username}/{repo}/readme/{quote(path, safe='/')}",
+                accept="application/vnd.github.raw",
+                params=params,
+            )
+            if response.status_code == 200:
+                return response.text
+
+        response = await self._get(
+            f"/repos/{username}/{repo}/readme",
+            accept="application/vnd.github.raw",
+            params=params,
+        )
+
+        if response.status_code == 404:
+            raise ValueError("No README found for the specified repository.")
+        elif response.status_code != 200:
+            raise Exception(
+                f"Failed to fetch README: {response.status_code}, {response.text}"
+            )
+        return response.text
+
+    async def _fetch_tarball(
+        self, username, repo, ref
+    ) -> tuple[FileTree, str, dict[str, str]]:
+        """
+        Downloads the repository archive at `ref` and reads it as a stream.
+
+        A single pass over the archive yields the filtered file tree, the
+        README and the manifests in MANIFEST_FILES. File contents are only
+        buffered for those few files, and the archive itself never is.
+
+        Returns:
+            tuple[FileTree, str, dict[str, str]]: The file tree, README and manifests.
+
+        Raises:
+            ValueError: If the repository or its README cannot be found.
+            Exception: For other unexpected API errors.
+        """
+
+        def capture(path):
+            relative = path.partition("/")[2]
+            if relative.rpartition("/")[2] in MANIFEST_FILES:
+                return self.path_filter.includes(relative)
+            return is_readme_candidate(relative)
+
+        parser = TarStreamParser(capture=capture)
+        entries: list[tuple[str, bool]] = []
+        dirs: set[str] = set()
+        readmes: dict[str, str] = {}
+        manifests: dict[str, str] = {}
+
+        def collect(entry):
+            # Drop the "{owner}-{repo}-{sha}/" directory GitHub wraps the archive in
+            path = entry.path.partition("/")[2]
+            if not path:
+                return
+            parent = path.rpartition("/")[0]
+            while parent and parent not in dirs:
+                dirs.add(parent)
+                entries.append((parent, True))
+                parent = parent.rpartition("/")[0]
+            if entry.is_dir:
+                if path not in dirs:
+                    dirs.add(path)
+                    entries.append((path, True))
+                return
+            entries.append((path, False))
+
+            if entry.content is not None:
+                text = entry.content.decode("utf-8", "replace")
+                if path.rpartition("/")[2] in MANIFEST_FILES:
+                    if len(manifests) < MANIFEST_MAX_FILES:
+                        manifests[path] = text[:MANIFEST_MAX_BYTES]
+                else:
+                    readmes[path] = text
+
+        async with self._stream(f"/repos/{username}/{repo}/tarball/{quote(ref, safe='/')}") as response:
+            if response.status_code == 404:
+                raise ValueError("Repository not found.")
+            elif response.status_code != 200:
+                await response.aread()
+                raise Exception(
+                    f"Failed to download archive: {response.status_code}, {response.text}"
+                )
+
+            async for chunk in response.aiter_bytes():
+                for entry in parser.feed(chunk):
+                    collect(entry)
+            for entry in parser.close():
+                collect(entry)
+
+        readme_path = select_readme(readmes)
+        if readme_path is None:
+            raise ValueError("No README found for the specified repository.")
+
+        # Git tree order: compare directories as if their name ended with "/"
+        entries.sort(key=lambda entry: entry[0] + "/" if entry[1] else entry[0])
+        file_tree = FileTree.from_entries(self.path_filter.filter_entries(entries))
+        return file_tree, readmes[readme_path], dict(sorted(manifests.items()))
+
+    async def get_github_file_paths_as_list(self, username, repo):
+        """
+        Fetches the file tree of an open-source GitHub repository,
+        excluding static files and generated code.
+
+        Args:
+            username (str): The GitHub username or organization name
+            repo (str): The repository name
+
+        Returns:
+            str: A filtered and formatted string of file paths in the repository, one per line.
+        """
+        default_branch = await self.get_default_branch(username, repo)
+        return await self._get_tree_with_fallback(username, repo, default_branch)
+
+    async def get_github_readme(self, username, repo):
         """
         Fetches the README contents of an open-source GitHub repository.
 
@@ -215,20 +676,83 @@ class GitHubService:
             Exception: For other unexpected API errors.
         """
         # First check if the repository exists
-        self._check_repository_exists(username, repo)
+        await self._check_repository_exists(username, repo)
 
-        # Then attempt to fetch the README
-        api_url = f"https://api.github.com/repos/{username}/{repo}/readme"
-        response = requests.get(api_url, headers=self._get_headers())
+        # Then fetch the README body
+        return await self._get_raw_readme(username, repo)
 
-        if response.status_code == 404:
-            raise ValueError("No README found for the specified repository.")
-        elif response.status_code != 200:
-            raise Exception(
-                f"Failed to fetch README: {
-                            response.status_code}, {response.json()}"
+    async def fetch_repository(
+        self, username, repo, sha: str | None = None, path: str = ""
+    ) -> RepositoryData:
+        """
+        Fetches everything the diagram pipeline needs from GitHub in one plan:
+        the default branch HEAD SHA (one cheap call, skipped if `sha` is given)
+        and the repository metadata, then the file tree and the raw README at
+        that SHA concurrently, fetched the way the metadata suggests (see
+        plan_fetch). With GITHUB_METADATA_API=graphql, the SHA, metadata and
+        README come from one GraphQL query, and only the tree is fetched after.
+
+        Args:
+            username (str): The GitHub username or organization name
+            repo (str): The repository name
+            sha (str | None): Commit SHA to fetch, if already resolved
+            path (str): Subdirectory to scope the file tree and README to
+
+        Returns:
+            RepositoryData: The default branch, commit SHA, filtered file tree and README.
+
+        Raises:
+            ValueError: If the repository, its file tree or its README cannot be
+                found, or the repository is too large.
+            Exception: For other unexpected API errors.
+        """
+        # Preflight: the metadata decides how the contents are fetched, and
+        # oversized repositories are rejected before any tree is downloaded
+        readme = None
+        if self.uses_graphql:
+            # One query covers the metadata, the HEAD SHA and the README
+            metadata, head_sha, readme = await self._query_repository(username, repo, sha, path)
+            sha = sha or head_sha
+        elif sha is None:
+            sha, metadata = await asyncio.gather(
+                self.get_head_sha(username, repo),
+                self._get_repository(username, repo),
+            )
+        else:
+            metadata = await self._get_repository(username, repo)
+        plan = plan_fetch(metadata, self.ingestion_mode, path)
+        default_branch = metadata.get("default_branch") or "main"
+
+        if plan.strategy == "tarball":
+            file_tree, readme, manifests = await self._fetch_tarball(username, repo, sha)
+            return RepositoryData(
+                default_branch=default_branch,
+                sha=sha,
+                tree=file_tree,
+                readme=readme,
+                manifests=manifests,
+                preflight=plan.report(),
+                visibility=repository_visibility(metadata),
             )
 
-        data = response.json()
-        readme_content = requests.get(data["download_url"]).text
-        return readme_content
+        if readme is None:
+            file_tree, readme = await asyncio.gather(
+                self._get_file_tree(username, repo, sha, path, plan.strategy),
+                self._get_raw_readme(username, repo, ref=sha, path=path),
+            )
+        else:
+            file_tree = await self._get_file_tree(username, repo, sha, path, plan.strategy)
+        if file_tree is None:
+            raise ValueError(
+                "Could not fetch repository file tree. Repository might not exist, be empty or private."
+            )
+
+        return RepositoryData(
+            default_branch=default_branch,
+            sha=sha,
+            tree=file_tree,
+            readme=readme,
+            path=path,
+            preflight=plan.report(),
+            visibility=repository_visibility(metadata),
+        )
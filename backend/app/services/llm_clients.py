@@ -0,0 +1,159 @@
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from typing import Any, AsyncIterator, Callable
+import asyncio
+import hashlib
+import httpx
+import inspect
+import os
+
+load_dotenv()
+
+# Clients kept per worker; the least recently used one is dropped beyond this
+# (each user-supplied API key gets its own client)
+LLM_MAX_CLIENTS = int(os.getenv("LLM_MAX_CLIENTS", "256"))
+
+# Connection pool of each provider client
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "180"))
+
+
+def llm_http_client(**kwargs) -> httpx.AsyncClient:
+    """Builds a pooled HTTP client for a provider SDK or API; kwargs override the defaults."""
+    options = {
+        "timeout": httpx.Timeout(LLM_HTTP_TIMEOUT, connect=10.0),
+        "limits": httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS, max_keepalive_connections=20
+        ),
+    }
+    return httpx.AsyncClient(**{**options, **kwargs})
+
+
+def _key_scope(api_key: str | None) -> str:
+    """Identifies an API key without keeping the secret itself as a key."""
+    if not api_key:
+        return "default"
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+async def _close_client(client: Any):
+    """Closes an SDK or httpx client, whichever close method it has."""
+    close = getattr(client, "aclose", None) or getattr(client, "close", None)
+    if close is not None:
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+
+
+class ProviderClientRegistry:
+    """
+    Long-lived LLM clients, one per (provider, API key).
+
+    Services ask the registry for a client on every call instead of building
+    one, so connections (and their TCP and TLS handshakes) are reused across
+    the phases of a generation and across requests. Clients are created on
+    first use, which also lets the services be constructed without API keys.
+
+    Calls hold a client through `lease`, so a client dropped from the registry
+    is closed as soon as its last in-flight request is done, rather than
+    keeping its connection pool open until garbage collection.
+    """
+
+    def __init__(self, max_clients: int = LLM_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._clients: OrderedDict[tuple[str, str], Any] = OrderedDict()
+        # In-flight leases by client id, and evicted clients waiting for theirs to end
+        self._in_flight: Counter[int] = Counter()
+        self._retired: dict[int, Any] = {}
+        self._closing: set[asyncio.Task] = set()
+        self.created = 0
+        self.reused = 0
+        self.closed = 0
+
+    def get(self, provider: str, api_key: str | None, factory: Callable[[str | None], Any]) -> Any:
+        """
+        Returns the client for a provider and API key, creating it with `factory` if needed.
+
+        Args:
+            provider (str): The provider name, e.g. "openai"
+            api_key (str | None): The user-supplied API key, or None for the server's
+            factory (Callable[[str | None], Any]): Builds a client for an API key
+        """
+        key = (provider, _key_scope(api_key))
+        client = self._clients.get(key)
+        if client is not None:
+            self._clients.move_to_end(key)
+            self.reused += 1
+            return client
+
+        client = factory(api_key)
+        self._clients[key] = client
+        self.created += 1
+        if len(self._clients) > self.max_clients:
+            _, evicted = self._clients.popitem(last=False)
+            self._retire(evicted)
+        return client
+
+    @asynccontextmanager
+    async def lease(
+        self, provider: str, api_key: str | None, factory: Callable[[str | None], Any]
+    ) -> AsyncIterator[Any]:
+        """Holds the client for a provider and API key (see `get`) for the duration of a call."""
+        client = self.get(provider, api_key, factory)
+        self._in_flight[id(client)] += 1
+        try:
+            yield client
+        finally:
+            self._in_flight[id(client)] -= 1
+            if not self._in_flight[id(client)]:
+                del self._in_flight[id(client)]
+                if self._retired.pop(id(client), None) is not None:
+                    await self._close(client)
+
+    def _retire(self, client: Any):
+        """Closes an evicted client now, or after its in-flight requests if it has any."""
+        if self._in_flight[id(client)]:
+            self._retired[id(client)] = client
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._close(client))
+        except RuntimeError:
+            # No event loop to close it on: left for aclose()
+            self._retired[id(client)] = client
+            return
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, client: Any):
+        try:
+            await _close_client(client)
+            self.closed += 1
+        except Exception as e:
+            print(f"\033[93mWarning: Failed to close an LLM client: {e}\033[0m")
+
+    async def aclose(self):
+        """Closes every client, including evicted ones (called on app shutdown)."""
+        clients = list(self._clients.values()) + list(self._retired.values())
+        self._clients.clear()
+        self._retired.clear()
+        for client in clients:
+            await self._close(client)
+        if self._closing:
+            await asyncio.gather(*self._closing)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._clients),
+            "created": self.created,
+            "reused": self.reused,
+            "closed": self.closed,
+            "in_flight": sum(self._in_flight.values()),
+        }
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+# One registry per worker process, shared by every LLM service
+llm_clients = ProviderClientRegistry()
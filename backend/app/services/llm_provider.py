@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Literal
+
+ReasoningEffort = Literal["low", "medium", "high"]
+
+
+class LLMProvider(ABC):
+    """
+    Common interface of the LLM backends (Claude, Ollama, Groq, OpenAI, OpenRouter).
+
+    Every backend streams natively, so the first tokens reach the client as
+    soon as the model produces them, and completes natively for callers
+    that only need the final text. Both are async and never block the event
+    loop.
+    """
+
+    @abstractmethod
+    def stream(
+        self,
+        system_prompt: str,
+        data: dict,
+        api_key: str | None = None,
+        model: str | None = None,
+        reasoning_effort: ReasoningEffort = "low",
+    ) -> AsyncIterator[str]:
+        """
+        Streams the model's response text as it is generated.
+
+        Args:
+            system_prompt (str): The instruction/system prompt
+            data (dict): Dictionary of variables to format into the user message
+            api_key (str | None): Optional custom API key
+            model (str | None): Model to use (defaults to the provider's default model)
+            reasoning_effort (str): Effort level for reasoning, for models that support it
+
+        Yields:
+            str: Chunks of the model's response text
+        """
+
+    @abstractmethod
+    async def complete(
+        self,
+        system_prompt: str,
+        data: dict,
+        api_key: str | None = None,
+        model: str | None = None,
+        reasoning_effort: ReasoningEffort = "low",
+    ) -> str:
+        """
+        Returns the model's full response text. Takes the same arguments as `stream`.
+        """
+
+    @abstractmethod
+    def count_tokens(self, prompt: str) -> int:
+        """
+        Counts (or estimates) the number of tokens in a prompt.
+
+        Args:
+            prompt (str): The prompt to count tokens for
+
+        Returns:
+            int: Number of input tokens
+        """
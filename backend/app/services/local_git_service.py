@@ -0,0 +1,204 @@
+import asyncio
+import os
+import re
+from dotenv import load_dotenv
+from app.services.repository_source import (
+    MANIFEST_FILES,
+    MANIFEST_MAX_BYTES,
+    MANIFEST_MAX_FILES,
+    RepositoryData,
+    RepositorySource,
+    select_readme,
+)
+from app.utils.file_tree import FileTree
+from app.utils.path_filter import PathFilter, default_path_filter
+
+load_dotenv()
+
+# Directory of local mirrors, laid out as {username}/{repo}.git (bare) or {username}/{repo}
+LOCAL_GIT_MIRRORS_DIR = os.getenv("LOCAL_GIT_MIRRORS_DIR")
+
+# GitHub owner and repository names; anything else could escape the mirrors directory
+_NAME_PATTERN = re.compile(r"[A-Za-z0-9_.-]+")
+
+
+class LocalGitService(RepositorySource):
+    """
+    Reads repositories from local git mirrors or checkouts with git plumbing.
+
+    Serving a repository from a warm mirror costs no GitHub requests or
+    rate limit, and lets the pipeline run (and be benchmarked) offline.
+    Keeping mirrors up to date (e.g. `git remote update` on a schedule) is
+    left to the deployment.
+    """
+
+    def __init__(
+        self,
+        mirrors_dir: str | None = None,
+        path_filter: PathFilter | None = None,
+    ):
+        self.mirrors_dir = mirrors_dir or LOCAL_GIT_MIRRORS_DIR
+        self.path_filter = path_filter or default_path_filter
+
+    def credential_scope(self) -> str:
+        return "local"
+
+    def repository_path(self, username: str, repo: str) -> str | None:
+        """
+        Returns the mirror or checkout of username/repo, or None if there is none.
+
+        Names that are not valid GitHub names (absolute paths, `..`, path
+        separators) never resolve, and neither does anything a symlink points
+        outside the mirrors directory.
+        """
+        if not self.mirrors_dir:
+            return None
+        for name in (username, repo):
+            if not _NAME_PATTERN.fullmatch(name) or name in (".", ".."):
+                return None
+
+        root = os.path.realpath(self.mirrors_dir) + os.sep
+        for owner in dict.fromkeys([username, username.lower()]):
+            for name in dict.fromkeys([repo, repo.lower()]):
+                for candidate in (f"{name}.git", name):
+                    path = os.path.join(self.mirrors_dir, owner, candidate)
+                    if os.path.isdir(path) and os.path.realpath(path).startswith(root):
+                        return path
+        return None
+
+    def has_repository(self, username: str, repo: str) -> bool:
+        return self.repository_path(username, repo) is not None
+
+    async def _git(self, username: str, repo: str, *args: str) -> bytes:
+        """
+        Runs a git command against the repository and returns its output.
+
+        Raises:
+            ValueError: If there is no local copy of the repository.
+            Exception: If git fails.
+        """
+        path = self.repository_path(username, repo)
+        if path is None:
+            raise ValueError("Repository not found.")
+
+        process = await asyncio.create_subprocess_exec(
+            "git",
+            "-C",
+            path,
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise Exception(
+                f"git {args[0]} failed for {username}/{repo}: {stderr.decode(errors='replace').strip()}"
+            )
+        return stdout
+
+    async def get_head_sha(self, username: str, repo: str, ref: str = "HEAD") -> str:
+        try:
+            output = await self._git(
+                username, repo, "rev-parse", "--verify", "--end-of-options", f"{ref}^{{commit}}"
+            )
+        except ValueError:
+            raise
+        except Exception:
+            if ref != "HEAD":
+                raise ValueError(f"Ref not found: {ref}")
+            # HEAD points at an unborn branch
+            raise ValueError("Repository is empty.")
+        return output.decode().strip()
+
+    async def get_default_branch(self, username: str, repo: str) -> str:
+        try:
+            output = await self._git(username, repo, "symbolic-ref", "--short", "HEAD")
+        except Exception:
+            return "main"
+        return output.decode().strip() or "main"
+
+    async def _list_tree(self, username: str, repo: str, sha: str) -> dict[str, tuple[str, bool]]:
+        """Returns {path: (object sha, is_dir)} for every entry of the commit, in git order."""
+        output = await self._git(username, repo, "ls-tree", "-r", "-t", "-z", "--full-tree", sha)
+
+        entries = {}
+        for record in output.split(b"\0"):
+            if not record:
+                continue
+            # "<mode> <type> <object>\t<path>"
+            info, _, path = record.partition(b"\t")
+            _, object_type, object_sha = info.split(b" ")
+            entries[path.decode("utf-8", "replace")] = (object_sha.decode(), object_type == b"tree")
+        return entries
+
+    async def _read_blob(self, username: str, repo: str, object_sha: str) -> str:
+        output = await self._git(username, repo, "cat-file", "blob", object_sha)
+        return output.decode("utf-8", "replace")
+
+    async def fetch_repository(
+        self, username: str, repo: str, sha: str | None = None, path: str = ""
+    ) -> RepositoryData:
+        """
+        Reads the file tree, README and manifests at `sha` from the local copy.
+
+        With a subdirectory `path`, the file tree and manifests are limited to
+        it and a README in that directory is preferred.
+
+        Raises:
+            ValueError: If there is no local copy, the path does not exist, or
+                the repository is empty or has no README.
+            Exception: If git fails.
+        """
+        if sha is None:
+            sha = await self.get_head_sha(username, repo)
+
+        default_branch, entries = await asyncio.gather(
+            self.get_default_branch(username, repo),
+            self._list_tree(username, repo, sha),
+        )
+        # The whole listing is one local command; only the scoped part is kept
+        if path and not entries.get(path, (None, False))[1]:
+            raise ValueError(f"Path not found in repository: {path}")
+        scoped = {
+            entry: value
+            for entry, value in entries.items()
+            if not path or entry.startswith(path + "/")
+        }
+        file_tree = FileTree.from_entries(
+            self.path_filter.filter_entries(
+                (entry, is_dir) for entry, (_, is_dir) in scoped.items()
+            )
+        )
+
+        readme_path = select_readme(
+            (entry for entry, (_, is_dir) in entries.items() if not is_dir), path
+        )
+        if readme_path is None:
+            raise ValueError("No README found for the specified repository.")
+
+        manifest_paths = [
+            entry
+            for entry, (_, is_dir) in scoped.items()
+            if not is_dir
+            and entry.rpartition("/")[2] in MANIFEST_FILES
+            and self.path_filter.includes(entry)
+        ][:MANIFEST_MAX_FILES]
+
+        readme, *manifests = await asyncio.gather(
+            *(
+                self._read_blob(username, repo, entries[path][0])
+                for path in [readme_path, *manifest_paths]
+            )
+        )
+
+        return RepositoryData(
+            default_branch=default_branch,
+            sha=sha,
+            tree=file_tree,
+            readme=readme,
+            manifests={
+                manifest_path: text[:MANIFEST_MAX_BYTES]
+                for manifest_path, text in sorted(zip(manifest_paths, manifests))
+            },
+            path=path,
+        )
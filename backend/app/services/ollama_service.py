@@ -1,17 +1,107 @@
-import requests
+from contextlib import nullcontext
+import httpx
+import json
 from dotenv import load_dotenv
+from app.services.llm_clients import ProviderClientRegistry, llm_clients, llm_http_client
+from app.services.llm_provider import LLMProvider, ReasoningEffort
 from app.utils.format_message import format_user_message
+from typing import AsyncIterator
+import os
 
 load_dotenv()
 
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://host.docker.internal:11434")
+# Read timeout between streamed chunks; generous for large models on slow hardware
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "300"))
+# How long the model stays loaded after a request, so the three generation
+# phases (and the next diagram) don't wait for it to load again
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Bounds of the context window (num_ctx) sized from each prompt
+OLLAMA_MIN_CTX = int(os.getenv("OLLAMA_MIN_CTX", "4096"))
+OLLAMA_MAX_CTX = int(os.getenv("OLLAMA_MAX_CTX", "32768"))
+# Tokens generated per response (num_predict), reserved in the context window
+OLLAMA_OUTPUT_TOKENS = int(os.getenv("OLLAMA_OUTPUT_TOKENS", "4096"))
 
-class OllamaService:
-    def __init__(self):
-        self.base_url = "http://host.docker.internal:11434"  # Default Ollama API URL
-        self.default_model = "mistral"  # Default model, can be changed
 
-    def call_ollama_api(
-        self, system_prompt: str, data: dict, model: str | None = None
+class OllamaService(LLMProvider):
+    name = "ollama"
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        client: httpx.AsyncClient | None = None,
+        clients: ProviderClientRegistry | None = None,
+    ):
+        self.base_url = (base_url or OLLAMA_BASE_URL).rstrip("/")
+        self.default_model = os.getenv("DEFAULT_MODEL_OLLAMA", "mistral")
+        # Allow injecting a client (e.g. for tests), otherwise share the registry's
+        self._client = client
+        self.clients = clients if clients is not None else llm_clients
+        # Largest context window requested per model (see _context_size)
+        self._context_sizes: dict[str, int] = {}
+
+    def _create_client(self, api_key: str | None) -> httpx.AsyncClient:
+        return llm_http_client(
+            base_url=self.base_url, timeout=httpx.Timeout(OLLAMA_TIMEOUT, connect=10.0)
+        )
+
+    def _lease(self):
+        """Holds the client for the duration of a call (see ProviderClientRegistry.lease)."""
+        if self._client is not None:
+            return nullcontext(self._client)
+        # Ollama has no API keys: one client per worker
+        return self.clients.lease(self.name, None, self._create_client)
+
+    def _context_size(self, model: str, prompt_tokens: int) -> int:
+        """
+        Sizes num_ctx to fit the prompt and the response.
+
+        Ollama's default context (2048 tokens) silently truncates our prompts,
+        and every change of num_ctx reloads the model. Sizes are rounded up to
+        a power of two and never shrink for a model, so the later, shorter
+        phases reuse the loaded model.
+        """
+        needed = prompt_tokens + OLLAMA_OUTPUT_TOKENS
+        size = OLLAMA_MIN_CTX
+        while size < needed and size < OLLAMA_MAX_CTX:
+            size *= 2
+        size = max(min(size, OLLAMA_MAX_CTX), self._context_sizes.get(model, 0))
+        self._context_sizes[model] = size
+        if needed > size:
+            print(
+                f"\033[93mWarning: prompt of ~{prompt_tokens} tokens exceeds OLLAMA_MAX_CTX ({OLLAMA_MAX_CTX}); "
+                "Ollama will truncate it.\033[0m"
+            )
+        return size
+
+    def _payload(self, system_prompt: str, data: dict, model: str | None, stream: bool) -> dict:
+        """Builds the /api/chat request body shared by `stream` and `complete`."""
+        # Create the user message with the data
+        user_message = format_user_message(data)
+        model = model or self.default_model
+        prompt_tokens = self.count_tokens(system_prompt) + self.count_tokens(user_message)
+        return {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message},
+            ],
+            "stream": stream,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {
+                "temperature": 0,
+                "num_ctx": self._context_size(model, prompt_tokens),
+                "num_predict": OLLAMA_OUTPUT_TOKENS,
+            },
+        }
+
+    async def complete(
+        self,
+        system_prompt: str,
+        data: dict,
+        api_key: str | None = None,
+        model: str | None = None,
+        reasoning_effort: ReasoningEffort = "low",
     ) -> str:
         """
         Makes an API call to Ollama and returns the response.
@@ -19,47 +109,77 @@ class OllamaService:
         Args:
             system_prompt (str): The instruction/system prompt
             data (dict): Dictionary of variables to format into the user message
+            api_key (str | None): Unused, Ollama has no API keys (only used for compatibility)
             model (str | None): Optional model name to use (defaults to self.default_model)
+            reasoning_effort (str): Effort level for reasoning (only used for compatibility)
 
         Returns:
             str: Ollama's response text
+
+        Raises:
+            RuntimeError: If Ollama cannot be reached or its response is invalid.
         """
-        # Create the user message with the data
-        user_message = format_user_message(data)
+        payload = self._payload(system_prompt, data, model, stream=False)
+        try:
+            async with self._lease() as client:
+                response = await client.post("/api/chat", json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Failed to connect to Ollama service: {str(e)}")
 
-        # Prepare the request payload
-        payload = {
-            "model": model or self.default_model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            "stream": False,
-            "options": {
-                "temperature": 0
-            }
-        }
+        # Extract and return the response text
+        result = response.json()
+        if not result.get("message") or not result["message"].get("content"):
+            raise RuntimeError("Invalid response from Ollama service: missing message content")
+        return result["message"]["content"]
+
+    async def stream(
+        self,
+        system_prompt: str,
+        data: dict,
+        api_key: str | None = None,
+        model: str | None = None,
+        reasoning_effort: ReasoningEffort = "low",
+    ) -> AsyncIterator[str]:
+        """
+        Makes a streaming API call to Ollama and yields the text as it is generated.
 
+        Ollama streams newline-delimited JSON objects, each holding the next
+        piece of the message, until one with "done": true.
+
+        Args:
+            system_prompt (str): The instruction/system prompt
+            data (dict): Dictionary of variables to format into the user message
+            api_key (str | None): Unused, Ollama has no API keys (only used for compatibility)
+            model (str | None): Optional model name to use (defaults to self.default_model)
+            reasoning_effort (str): Effort level for reasoning (only used for compatibility)
+
+        Yields:
+            str: Chunks of Ollama's response text
+
+        Raises:
+            RuntimeError: If Ollama cannot be reached or reports an error.
+        """
+        payload = self._payload(system_prompt, data, model, stream=True)
         try:
-            # Make the API call
-            response = requests.post(
-                f"{self.base_url}/api/chat",
-                json=payload,
-                timeout=300  # Increased timeout for large models
-            )
-            response.raise_for_status()
-            
-            # Extract and return the response text
-            result = response.json()
-            if not result.get("message") or not result["message"].get("content"):
-                raise ValueError("Invalid response format from Ollama")
-            return result["message"]["content"]
-        except requests.exceptions.RequestException as e:
+            async with self._lease() as client, client.stream("POST", "/api/chat", json=payload) as response:
+                if response.status_code != 200:
+                    error = await response.aread()
+                    raise RuntimeError(
+                        f"Ollama service error: {response.status_code}, {error.decode(errors='replace')}"
+                    )
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(f"Ollama service error: {chunk['error']}")
+                    if content := chunk.get("message", {}).get("content"):
+                        yield content
+                    if chunk.get("done"):
+                        break
+        except httpx.HTTPError as e:
             raise RuntimeError(f"Failed to connect to Ollama service: {str(e)}")
-        except (KeyError, ValueError) as e:
-            raise RuntimeError(f"Invalid response from Ollama service: {str(e)}")
-        except Exception as e:
-            raise RuntimeError(f"Unexpected error calling Ollama service: {str(e)}")
 
     def count_tokens(self, prompt: str) -> int:
         """
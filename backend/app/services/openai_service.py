@@ -1,28 +1,42 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
+from app.services.llm_clients import ProviderClientRegistry, llm_clients, llm_http_client
+from app.services.llm_provider import LLMProvider, ReasoningEffort
 from app.utils.format_message import format_user_message
-import tiktoken
+from app.utils.prompt_packer import get_token_counter
 import os
-from typing import Literal, AsyncGenerator
+from typing import AsyncIterator
 
 load_dotenv()
 
 
-class OpenAIService:
-    def __init__(self, model: str | None = None):
-        self.default_client = OpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"),
+class OpenAIService(LLMProvider):
+    name = "openai"
+
+    def __init__(self, clients: ProviderClientRegistry | None = None):
+        self.clients = clients if clients is not None else llm_clients
+        self.default_model = os.getenv("OPENAI_MODEL") or os.getenv("DEFAULT_MODEL_OPENAI", "gpt-4")
+
+    def _create_client(self, api_key: str | None) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"), http_client=llm_http_client()
         )
-        self.encoding = tiktoken.get_encoding("o200k_base")  # Encoder for OpenAI models
-        self.base_url = "https://api.openai.com/v1/chat/completions"
-        self.model = model or os.getenv("OPENAI_MODEL")
 
-    def call_api(
+    def _client(self, api_key: str | None) -> AsyncOpenAI:
+        """Returns the long-lived client for an API key (the server's if None)."""
+        return self.clients.get(self.name, api_key, self._create_client)
+
+    def _lease(self, api_key: str | None):
+        """Holds the client for an API key for the duration of a call (see ProviderClientRegistry.lease)."""
+        return self.clients.lease(self.name, api_key, self._create_client)
+
+    async def complete(
         self,
         system_prompt: str,
         data: dict,
         api_key: str | None = None,
-        reasoning_effort: Literal["low", "medium", "high"] = "low",
+        model: str | None = None,
+        reasoning_effort: ReasoningEffort = "low",
     ) -> str:
         """
         Makes an API call to OpenAI and returns the response.
@@ -31,6 +45,7 @@ class OpenAIService:
             system_prompt (str): The instruction/system prompt
             data (dict): Dictionary of variables to format into the user message
             api_key (str | None): Optional custom API key
+            model (str | None): Optional model name (defaults to self.default_model)
             reasoning_effort (str): Effort level for reasoning (only used for compatibility)
 
         Returns:
@@ -39,40 +54,41 @@ class OpenAIService:
         # Create the user message with the data
         user_message = format_user_message(data)
 
-        # Use custom client if API key provided, otherwise use default
-        client = OpenAI(api_key=api_key) if api_key else self.default_client
+        async with self._lease(api_key) as client:
+            model = model or self.default_model
 
-        try:
-            print(
-                f"Making non-streaming API call to {self.model} with API key: {'custom key' if api_key else 'default key'}"
-            )
+            try:
+                print(
+                    f"Making non-streaming API call to {model} with API key: {'custom key' if api_key else 'default key'}"
+                )
 
-            completion = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message},
-                ],
-                max_tokens=12000,
-                temperature=0.2,
-            )
+                completion = await client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_message},
+                    ],
+                    max_tokens=12000,
+                    temperature=0.2,
+                )
 
-            if completion.choices[0].message.content is None:
-                raise ValueError(f"No content returned from {self.model}")
+                if completion.choices[0].message.content is None:
+                    raise ValueError(f"No content returned from {model}")
 
-            return completion.choices[0].message.content
+                return completion.choices[0].message.content
 
-        except Exception as e:
-            print(f"Error in OpenAI API call: {str(e)}")
-            raise
+            except Exception as e:
+                print(f"Error in OpenAI API call: {str(e)}")
+                raise
 
-    async def call_api_stream(
+    async def stream(
         self,
         system_prompt: str,
         data: dict,
         api_key: str | None = None,
-        reasoning_effort: Literal["low", "medium", "high"] = "low",
-    ) -> AsyncGenerator[str, None]:
+        model: str | None = None,
+        reasoning_effort: ReasoningEffort = "low",
+    ) -> AsyncIterator[str]:
         """
         Makes a streaming API call to OpenAI and yields the responses.
 
@@ -80,6 +96,7 @@ class OpenAIService:
             system_prompt (str): The instruction/system prompt
             data (dict): Dictionary of variables to format into the user message
             api_key (str | None): Optional custom API key
+            model (str | None): Optional model name (defaults to self.default_model)
             reasoning_effort (str): Effort level for reasoning (only used for compatibility)
 
         Yields:
@@ -88,28 +105,27 @@ class OpenAIService:
         # Create the user message with the data
         user_message = format_user_message(data)
 
-        # Use custom client if API key provided, otherwise use default
-        client = OpenAI(api_key=api_key) if api_key else self.default_client
-
-        try:
-            stream = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message},
-                ],
-                max_tokens=12000,
-                temperature=0.2,
-                stream=True,
-            )
-
-            async for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
-
-        except Exception as e:
-            print(f"Error in OpenAI streaming API call: {str(e)}")
-            raise
+        async with self._lease(api_key) as client:
+
+            try:
+                stream = await client.chat.completions.create(
+                    model=model or self.default_model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_message},
+                    ],
+                    max_tokens=12000,
+                    temperature=0.2,
+                    stream=True,
+                )
+
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        yield chunk.choices[0].delta.content
+
+            except Exception as e:
+                print(f"Error in OpenAI streaming API call: {str(e)}")
+                raise
 
     def count_tokens(self, prompt: str) -> int:
         """
@@ -121,5 +137,5 @@ class OpenAIService:
         Returns:
             int: Number of input tokens
         """
-        num_tokens = len(self.encoding.encode(prompt))
-        return num_tokens
+        # One o200k_base encoding is loaded per worker and shared
+        return get_token_counter(self.name)(prompt)
@@ -1,41 +1,57 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
+from app.services.llm_clients import ProviderClientRegistry, llm_clients, llm_http_client
+from app.services.llm_provider import LLMProvider, ReasoningEffort
 from app.utils.format_message import format_user_message
-import tiktoken
+from app.utils.prompt_packer import get_token_counter
 import os
-import json
-import certifi
-import ssl
-import httpx
-from typing import Literal, AsyncGenerator
-from openai import OpenAI
-import tiktoken
-from dotenv import load_dotenv
+from typing import AsyncIterator
 
 load_dotenv()
 
+# Attribution headers sent with every request (used for OpenRouter rankings)
+OPENROUTER_HEADERS = {
+    "HTTP-Referer": "https://util-kit.com",  # Site URL for rankings
+    "X-Title": "util-kit",  # Site title for rankings
+}
+
 
-class OpenRouterService:
-    def __init__(self, model: str | None = None):
+class OpenRouterService(LLMProvider):
+    name = "openrouter"
+
+    def __init__(self, clients: ProviderClientRegistry | None = None):
+        self.clients = clients if clients is not None else llm_clients
+        self.base_url = "https://openrouter.ai/api/v1"
+        self.default_model = os.getenv("OPENROUTER_MODEL") or os.getenv(
+            "DEFAULT_MODEL_OPENROUTER", "minimax/minimax-m2:free"
+        )
 
-        self.default_client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=os.getenv("OPENROUTER_API_KEY"),
-            http_client=httpx.Client(
+    def _create_client(self, api_key: str | None) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            base_url=self.base_url,
+            api_key=api_key or os.getenv("OPENROUTER_API_KEY"),
+            default_headers=OPENROUTER_HEADERS,
+            http_client=llm_http_client(
                 verify=False  # Disable SSL verification for development
                 # verify=certifi.where()  # Use this in production
-            )
+            ),
         )
-        self.encoding = tiktoken.get_encoding("o200k_base")
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.model = model or os.getenv("OPENROUTER_MODEL")
 
-    def call_api(
+    def _client(self, api_key: str | None) -> AsyncOpenAI:
+        """Returns the long-lived client for an API key (the server's if None)."""
+        return self.clients.get(self.name, api_key, self._create_client)
+
+    def _lease(self, api_key: str | None):
+        """Holds the client for an API key for the duration of a call (see ProviderClientRegistry.lease)."""
+        return self.clients.lease(self.name, api_key, self._create_client)
+
+    async def complete(
         self,
         system_prompt: str,
         data: dict,
         api_key: str | None = None,
-        reasoning_effort: Literal["low", "medium", "high"] = "low",
+        model: str | None = None,
+        reasoning_effort: ReasoningEffort = "low",
     ) -> str:
         """
         Makes an API call to OpenRouter and returns the response.
@@ -44,6 +60,7 @@ class OpenRouterService:
             system_prompt (str): The instruction/system prompt
             data (dict): Dictionary of variables to format into the user message
             api_key (str | None): Optional custom API key
+            model (str | None): Optional model name (defaults to self.default_model)
             reasoning_effort (str): Effort level for reasoning, one of "low", "medium", "high"
 
         Returns:
@@ -52,40 +69,31 @@ class OpenRouterService:
         # Create the user message with the data
         user_message = format_user_message(data)
 
-        # Use custom client if API key provided, otherwise use default
-        client = (
-            OpenAI(base_url="https://openrouter.ai/api/v1", api_key=api_key)
-            if api_key
-            else self.default_client
-        )
-
-        completion = client.chat.completions.create(
-            extra_headers={
-                "HTTP-Referer": "https://util-kit.com",  # Site URL for rankings
-                "X-Title": "util-kit",  # Site title for rankings
-            },
-            model=self.model,
-            reasoning_effort=reasoning_effort,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message},
-            ],
-            max_completion_tokens=12000,
-            temperature=0.2,
-        )
+        async with self._lease(api_key) as client:
+            completion = await client.chat.completions.create(
+                model=model or self.default_model,
+                reasoning_effort=reasoning_effort,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_message},
+                ],
+                max_completion_tokens=12000,
+                temperature=0.2,
+            )
 
-        if completion.choices[0].message.content is None:
-            raise ValueError("No content returned from OpenRouter")
+            if completion.choices[0].message.content is None:
+                raise ValueError("No content returned from OpenRouter")
 
-        return completion.choices[0].message.content
+            return completion.choices[0].message.content
 
-    async def call_api_stream(
+    async def stream(
         self,
         system_prompt: str,
         data: dict,
         api_key: str | None = None,
-        reasoning_effort: Literal["low", "medium", "high"] = "low",
-    ) -> AsyncGenerator[str, None]:
+        model: str | None = None,
+        reasoning_effort: ReasoningEffort = "low",
+    ) -> AsyncIterator[str]:
         """
         Makes a streaming API call to OpenRouter and yields the responses.
 
@@ -93,6 +101,7 @@ class OpenRouterService:
             system_prompt (str): The instruction/system prompt
             data (dict): Dictionary of variables to format into the user message
             api_key (str | None): Optional custom API key
+            model (str | None): Optional model name (defaults to self.default_model)
             reasoning_effort (str): Effort level for reasoning
 
         Yields:
@@ -101,51 +110,22 @@ class OpenRouterService:
         # Create the user message with the data
         user_message = format_user_message(data)
 
-        headers = {
-            "HTTP-Referer": "https://util-kit.com",
-            "X-Title": "util-kit",
-            "Authorization": f"Bearer {api_key or self.default_client.api_key}",
-            "Content-Type": "application/json",
-        }
-
-        payload = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message},
-            ],
-            "max_tokens": 12000,
-            "temperature": 0.2,
-            "stream": True,
-            "reasoning_effort": reasoning_effort,
-        }
-
-        async with httpx.AsyncClient(
-            verify=False,  # Disable SSL verification for development
-            # verify=certifi.where()  # Use this in production
-        ) as client:
-            async with client.stream(
-                'POST',
-                self.base_url,
-                headers=headers,
-                json=payload,
-                timeout=180.0
-            ) as response:
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        if line == "data: [DONE]":
-                            break
-                        try:
-                            data = json.loads(line[6:])
-                            if (
-                                content := data.get("choices", [{}])[0]
-                                .get("delta", {})
-                                .get("content")
-                            ):
-                                yield content
-                        except json.JSONDecodeError:
-                            # Skip any non-JSON lines
-                            continue
+        async with self._lease(api_key) as client:
+            stream = await client.chat.completions.create(
+                model=model or self.default_model,
+                reasoning_effort=reasoning_effort,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_message},
+                ],
+                max_tokens=12000,
+                temperature=0.2,
+                stream=True,
+            )
+
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
 
     def count_tokens(self, prompt: str) -> int:
         """
@@ -158,5 +138,5 @@ class OpenRouterService:
         Returns:
             int: Estimated number of input tokens
         """
-        num_tokens = len(self.encoding.encode(prompt))
-        return num_tokens
+        # One o200k_base encoding is loaded per worker and shared
+        return get_token_counter(self.name)(prompt)
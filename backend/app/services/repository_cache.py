@@ -0,0 +1,314 @@
+from dotenv import load_dotenv
+from app.core.cache import get_cache_backend
+from app.services.github_service import GitHubService
+from app.services.local_git_service import LocalGitService
+from app.services.repository_source import (
+    RepositoryData,
+    RepositorySource,
+    normalize_path,
+    normalize_ref,
+)
+from app.utils.singleflight import SingleFlight
+import asyncio
+import hashlib
+import os
+import re
+
+load_dotenv()
+
+# How long a resolved default-branch HEAD SHA is trusted before re-checking
+# GitHub. Everything keyed by SHA is immutable and cached without a TTL.
+REPOSITORY_HEAD_TTL = float(os.getenv("REPOSITORY_HEAD_TTL_SECONDS", "300"))
+
+# Repositories that send push webhooks have their HEAD invalidated on every
+# push, so it can be trusted for much longer
+REPOSITORY_SUBSCRIBED_HEAD_TTL = float(
+    os.getenv("REPOSITORY_SUBSCRIBED_HEAD_TTL_SECONDS", "86400")
+)
+# A repository counts as subscribed for this long after its last webhook
+REPOSITORY_SUBSCRIPTION_TTL = 30 * 24 * 3600
+
+# Where repositories are read from: "github" (default), "local" (only the
+# mirrors in LOCAL_GIT_MIRRORS_DIR) or "auto" (a mirror if there is one)
+REPOSITORY_SOURCE = os.getenv("REPOSITORY_SOURCE", "github").lower()
+
+HEAD_KEY_PREFIX = "head:"
+SNAPSHOT_KEY_PREFIX = "snapshot:"
+ARTIFACT_KEY_PREFIX = "artifact:"
+SUBSCRIPTION_KEY_PREFIX = "webhook:"
+
+# Concurrent cache misses for the same repository share one GitHub fetch
+github_fetches = SingleFlight()
+
+# Per-worker hit/miss counters for the shared repository cache
+repository_cache_stats = {"hits": 0, "misses": 0}
+
+
+_COMMIT_SHA = re.compile(r"[0-9a-fA-F]{40}")
+
+
+def head_cache_key(username: str, repo: str, scope: str, ref: str = "HEAD") -> str:
+    """Key of a resolved ref, e.g. "head:octo/demo:anonymous" or "head:octo/demo:anonymous:v1.0"."""
+    key = f"{HEAD_KEY_PREFIX}{username.lower()}/{repo.lower()}:{scope}"
+    return key if ref == "HEAD" else f"{key}:{ref}"
+
+
+def _scope_tag(scope: str) -> str:
+    """Key suffix restricting an entry to a credential scope ("" for public data)."""
+    return "~" + hashlib.sha256(scope.encode()).hexdigest()[:16] if scope else ""
+
+
+def snapshot_cache_key(
+    username: str, repo: str, sha: str, path: str = "", scope: str = ""
+) -> str:
+    """
+    Key of the repository data at a commit, e.g. "snapshot:octo/demo@<sha>",
+    or "snapshot:octo/demo@<sha>:services/payments" for a subdirectory.
+
+    Snapshots of non-public repositories carry the credential scope that
+    fetched them ("snapshot:octo/demo@<sha>~<scope digest>"), so they are only
+    served to callers with the same credentials.
+    """
+    key = f"{SNAPSHOT_KEY_PREFIX}{username.lower()}/{repo.lower()}@{sha}{_scope_tag(scope)}"
+    return f"{key}:{path}" if path else key
+
+
+def artifact_cache_key(
+    username: str,
+    repo: str,
+    sha: str,
+    service: str,
+    model: str,
+    instructions: str,
+    path: str = "",
+    scope: str = "",
+) -> str:
+    """
+    Key of the generated diagram for a commit, subdirectory, provider, model and
+    instructions; scoped like snapshot_cache_key for non-public repositories.
+    """
+    parts = [service, model, instructions] + ([path] if path else [])
+    digest = hashlib.sha256("\0".join(parts).encode()).hexdigest()
+    return (
+        f"{ARTIFACT_KEY_PREFIX}{username.lower()}/{repo.lower()}@{sha}{_scope_tag(scope)}"
+        f":{digest[:16]}"
+    )
+
+
+def subscription_cache_key(username: str, repo: str) -> str:
+    """Key marking a repository as subscribed to push webhooks."""
+    return f"{SUBSCRIPTION_KEY_PREFIX}{username.lower()}/{repo.lower()}"
+
+
+def parse_snapshot_cache_key(key: str) -> tuple[str, str, str, str, bool]:
+    """Returns the (username, repo, sha, path, scoped) encoded in a snapshot cache key."""
+    full_name, target = key[len(SNAPSHOT_KEY_PREFIX):].split("@", 1)
+    commit, _, path = target.partition(":")
+    sha, scoped, _ = commit.partition("~")
+    username, repo = full_name.split("/", 1)
+    return username, repo, sha, path, bool(scoped)
+
+
+def get_repository_source(
+    username: str, repo: str, github_pat: str | None = None
+) -> RepositorySource:
+    """
+    Picks the source for a repository according to REPOSITORY_SOURCE.
+
+    Raises:
+        ValueError: If REPOSITORY_SOURCE is unknown.
+    """
+    if REPOSITORY_SOURCE == "github":
+        return GitHubService(pat=github_pat)
+    if REPOSITORY_SOURCE == "local":
+        return LocalGitService()
+    if REPOSITORY_SOURCE == "auto":
+        local = LocalGitService()
+        if local.has_repository(username, repo):
+            return local
+        return GitHubService(pat=github_pat)
+    raise ValueError(
+        f"Unknown REPOSITORY_SOURCE: {REPOSITORY_SOURCE}. Use github, local or auto."
+    )
+
+
+async def resolve_head_sha(
+    username: str,
+    repo: str,
+    service: RepositorySource,
+    refresh: bool = False,
+    ref: str | None = None,
+) -> str:
+    """
+    Returns the commit SHA of a ref, cached for REPOSITORY_HEAD_TTL seconds.
+
+    Args:
+        refresh (bool): Ignore the cached SHA and ask GitHub again
+        ref (str | None): Branch, tag or commit; the default branch HEAD if None
+
+    Raises:
+        ValueError: If the ref is invalid or cannot be found.
+    """
+    ref = normalize_ref(ref)
+    # A commit SHA needs no lookup. This does not check access to the
+    # repository: snapshots of non-public repositories are keyed by credential
+    # scope, so a caller without access misses the cache and the fetch fails.
+    if _COMMIT_SHA.fullmatch(ref):
+        return ref.lower()
+
+    cache = get_cache_backend()
+    key = head_cache_key(username, repo, service.credential_scope(), ref)
+
+    if not refresh:
+        sha = await cache.get(key)
+        if sha is not None:
+            return sha
+
+    async def resolve():
+        sha, subscribed = await asyncio.gather(
+            service.get_head_sha(username, repo, ref),
+            cache.get(subscription_cache_key(username, repo)),
+        )
+        ttl = REPOSITORY_SUBSCRIBED_HEAD_TTL if subscribed else REPOSITORY_HEAD_TTL
+        await cache.set(key, sha, ttl=ttl)
+        return sha
+
+    return await github_fetches.do(key, resolve)
+
+
+# cache github data to avoid double API calls
+async def get_cached_github_data(
+    username: str,
+    repo: str,
+    github_pat: str | None = None,
+    source: RepositorySource | None = None,
+    ref: str | None = None,
+    path: str | None = None,
+) -> RepositoryData:
+    """
+    Returns the repository data, served from the shared cache when possible.
+
+    The default branch HEAD SHA (or the SHA of `ref`) is resolved with one
+    cheap (and usually cached) call; the tree and README are then keyed by
+    that SHA and `path`. Content at a commit never changes, so snapshots are
+    cached without a TTL and a new push simply makes the old snapshot
+    unreachable. Snapshots of public repositories are shared by every caller;
+    others are only served to the credential scope that fetched them.
+
+    Args:
+        source (RepositorySource | None): Where to read the repository from;
+            chosen by REPOSITORY_SOURCE if not given
+        ref (str | None): Branch, tag or commit to read instead of the default branch
+        path (str | None): Subdirectory to scope the file tree and README to
+
+    Raises:
+        ValueError: If the ref or path is invalid, or the repository, ref or path cannot be found.
+    """
+    path = normalize_path(path)
+    # Sources are cheap to create: GitHub services all share the worker's
+    # pooled HTTP client
+    if source is None:
+        source = get_repository_source(username, repo, github_pat)
+    cache = get_cache_backend()
+
+    sha = await resolve_head_sha(username, repo, source, ref=ref)
+    scope = source.credential_scope()
+    scoped_key = snapshot_cache_key(username, repo, sha, path, scope)
+
+    shared, scoped = await asyncio.gather(
+        cache.get(snapshot_cache_key(username, repo, sha, path)), cache.get(scoped_key)
+    )
+    # Entries cached before visibility was recorded are not trusted as public
+    if shared is not None and shared.get("visibility") != "public":
+        shared = None
+    cached = shared if shared is not None else scoped
+    if cached is not None:
+        repository_cache_stats["hits"] += 1
+        return RepositoryData.from_cache(cached)
+    repository_cache_stats["misses"] += 1
+
+    async def fetch():
+        data = await source.fetch_repository(username, repo, sha=sha, path=path)
+        if not data.public:
+            data.scope = scope
+        await cache.set(snapshot_cache_key(username, repo, sha, path, data.scope), data.to_cache())
+        return data
+
+    # Keyed by scope: a caller must not share a fetch made with other credentials
+    return await github_fetches.do(scoped_key, fetch)
+
+
+async def invalidate_repository(username: str, repo: str) -> int:
+    """
+    Forgets every resolved ref of a repository after a push.
+
+    Snapshots and artifacts are keyed by commit SHA and stay valid; the next
+    request resolves the new HEAD and fetches the new commit. The repository
+    is marked as subscribed, so its refs are then cached for
+    REPOSITORY_SUBSCRIBED_HEAD_TTL.
+
+    Returns:
+        int: How many resolved refs were dropped
+    """
+    cache = get_cache_backend()
+    await cache.set(
+        subscription_cache_key(username, repo), True, ttl=REPOSITORY_SUBSCRIPTION_TTL
+    )
+    # All credential scopes and refs: "head:octo/demo:<scope>[:<ref>]"
+    keys = await cache.keys(f"{HEAD_KEY_PREFIX}{username.lower()}/{repo.lower()}:")
+    for key in keys:
+        await cache.delete(key)
+    return len(keys)
+
+
+async def refresh_repository(
+    username: str, repo: str, sha: str | None = None
+) -> RepositoryData:
+    """
+    Fetches a repository into the cache ahead of the next request.
+
+    Args:
+        sha (str | None): The new default branch HEAD, if already known (e.g.
+            from a push webhook); saves resolving it again
+    """
+    source = get_repository_source(username, repo)
+    if sha is not None:
+        key = head_cache_key(username, repo, source.credential_scope())
+        await get_cache_backend().set(key, sha, ttl=REPOSITORY_SUBSCRIBED_HEAD_TTL)
+    return await get_cached_github_data(username, repo, source=source)
+
+
+async def get_cached_artifact(
+    username: str,
+    repo: str,
+    sha: str,
+    service: str,
+    model: str,
+    instructions: str,
+    path: str = "",
+    scope: str = "",
+) -> dict | None:
+    """
+    Returns the diagram previously generated for this exact input, if any.
+
+    Args:
+        scope (str): The snapshot's scope (RepositoryData.scope), "" if public
+    """
+    key = artifact_cache_key(username, repo, sha, service, model, instructions, path, scope)
+    return await get_cache_backend().get(key)
+
+
+async def store_artifact(
+    username: str,
+    repo: str,
+    sha: str,
+    service: str,
+    model: str,
+    instructions: str,
+    artifact: dict,
+    path: str = "",
+    scope: str = "",
+):
+    """Stores a generated explanation, mapping and diagram, keyed by commit SHA."""
+    key = artifact_cache_key(username, repo, sha, service, model, instructions, path, scope)
+    await get_cache_backend().set(key, artifact)
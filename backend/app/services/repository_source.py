@@ -0,0 +1,198 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Iterable
+import re
+from app.utils.file_tree import FileTree
+
+
+@dataclass
+class RepositoryData:
+    """Repository data consumed by the diagram generation pipeline."""
+
+    default_branch: str
+    sha: str
+    tree: FileTree
+    readme: str
+    # Manifest path -> contents; filled in by sources that read file contents
+    manifests: dict[str, str] = field(default_factory=dict)
+    # Subdirectory the data is scoped to ("" for the whole repository)
+    path: str = ""
+    # How the source chose to fetch the repository (strategy, reason...), if it did
+    preflight: dict = field(default_factory=dict)
+    # "public", "private" or "internal" as reported by the source ("" if unknown)
+    visibility: str = ""
+    # Credential scope the cached snapshot and artifacts are restricted to ("" if public)
+    scope: str = ""
+
+    @property
+    def public(self) -> bool:
+        """Whether anyone may read the repository; only then are cache entries shared."""
+        return self.visibility == "public"
+
+    @property
+    def file_tree(self) -> str:
+        """The filtered file tree as newline-separated paths (the prompt format)."""
+        return self.tree.render()
+
+    def to_cache(self) -> dict:
+        return {
+            "default_branch": self.default_branch,
+            "sha": self.sha,
+            "tree": self.tree.to_json(),
+            "readme": self.readme,
+            "manifests": self.manifests,
+            "path": self.path,
+            "preflight": self.preflight,
+            "visibility": self.visibility,
+            "scope": self.scope,
+        }
+
+    @classmethod
+    def from_cache(cls, data: dict) -> "RepositoryData":
+        # Snapshots cached before the compact tree hold the rendered text
+        if "file_tree" in data:
+            tree = FileTree.from_text(data["file_tree"])
+        else:
+            tree = FileTree.from_json(data["tree"])
+        return cls(
+            default_branch=data["default_branch"],
+            sha=data["sha"],
+            tree=tree,
+            readme=data["readme"],
+            manifests=data.get("manifests", {}),
+            path=data.get("path", ""),
+            preflight=data.get("preflight", {}),
+            visibility=data.get("visibility", ""),
+            scope=data.get("scope", ""),
+        )
+
+
+# Build and dependency manifests kept alongside the README
+MANIFEST_FILES = {
+    "package.json",
+    "pyproject.toml",
+    "go.mod",
+    "Cargo.toml",
+    "requirements.txt",
+    "pom.xml",
+    "build.gradle",
+    "Gemfile",
+    "composer.json",
+}
+MANIFEST_MAX_BYTES = 64 * 1024
+MANIFEST_MAX_FILES = 20
+
+# Where GitHub looks for a README, in order of preference
+README_DIRECTORIES = ["", ".github", "docs"]
+
+
+def is_readme_candidate(path: str) -> bool:
+    directory, _, name = path.rpartition("/")
+    return name.lower().startswith("readme") and directory in README_DIRECTORIES
+
+
+def normalize_path(path: str | None) -> str:
+    """
+    Normalizes a subdirectory to scope a request to ("" for the whole repository).
+
+    Raises:
+        ValueError: If the path leaves the repository.
+    """
+    parts = [part for part in (path or "").strip().split("/") if part not in ("", ".")]
+    if ".." in parts:
+        raise ValueError("Invalid path: must be a directory inside the repository.")
+    return "/".join(parts)
+
+
+# Characters git check-ref-format rejects (control characters, space, ~ ^ : ? * [ \),
+# plus "#" and "%", which would change the meaning of the API URL the ref goes into
+_INVALID_REF_CHARS = re.compile(r"[\x00-\x20\x7f~^:?*\[\\#%]")
+
+
+def normalize_ref(ref: str | None) -> str:
+    """
+    Validates a branch, tag or commit to read ("HEAD" for the default branch).
+
+    Follows git check-ref-format, so a ref can be put in an API URL or a git
+    command line without changing what is requested.
+
+    Raises:
+        ValueError: If the ref is not a valid ref name.
+    """
+    ref = (ref or "").strip()
+    if not ref:
+        return "HEAD"
+    parts = ref.split("/")
+    if (
+        _INVALID_REF_CHARS.search(ref)
+        or ".." in ref
+        or "@{" in ref
+        or ref == "@"
+        or ref.startswith("-")
+        or any(not part or part.startswith(".") or part.endswith(".lock") for part in parts)
+        or ref.endswith(".")
+    ):
+        raise ValueError(f"Invalid ref: {ref}")
+    return ref
+
+
+def select_readme(paths: Iterable[str], path: str = "") -> str | None:
+    """
+    Picks the README GitHub would show among `paths`, or None.
+
+    With a subdirectory `path`, a README in that directory is preferred over
+    the repository's own.
+    """
+    paths = list(paths)
+    if path:
+        prefix = path + "/"
+        relative = [p[len(prefix):] for p in paths if p.startswith(prefix)]
+        readme = select_readme(p for p in relative if "/" not in p)
+        if readme is not None:
+            return prefix + readme
+
+    candidates = [p for p in paths if is_readme_candidate(p)]
+    for directory in README_DIRECTORIES:
+        in_directory = sorted(p for p in candidates if p.rpartition("/")[0] == directory)
+        if in_directory:
+            # Prefer README.md over README.rst, README.txt...
+            return min(in_directory, key=lambda p: not p.lower().endswith(".md"))
+    return None
+
+
+class RepositorySource(ABC):
+    """
+    Where the generation pipeline reads repositories from.
+
+    Implementations resolve the default branch HEAD to a commit SHA and
+    return the filtered file tree and README at that commit. Data is cached
+    by SHA, so every source serving the same commit of a public repository
+    shares cache entries; anything else is cached per credential scope.
+    """
+
+    @abstractmethod
+    def credential_scope(self) -> str:
+        """Identifies what the source can see, for caching resolved HEAD SHAs and non-public data."""
+
+    @abstractmethod
+    async def get_head_sha(self, username: str, repo: str, ref: str = "HEAD") -> str:
+        """
+        Resolves a ref (the default branch HEAD by default) to its commit SHA.
+
+        Raises:
+            ValueError: If the repository does not exist or is empty, or the ref does not exist.
+        """
+
+    @abstractmethod
+    async def fetch_repository(
+        self, username: str, repo: str, sha: str | None = None, path: str = ""
+    ) -> RepositoryData:
+        """
+        Returns the repository data at `sha` (the default branch HEAD if None).
+
+        With a subdirectory `path`, only that part of the tree is fetched,
+        and the README in that directory is preferred.
+
+        Raises:
+            ValueError: If the repository, the path, its file tree or its README cannot be found.
+        """
@@ -0,0 +1,153 @@
+from array import array
+from typing import Iterable, Iterator
+import base64
+import sys
+
+
+class FileTree:
+    """
+    Compact, prefix-compressed repository file tree.
+
+    Every entry is stored once as two 32-bit integers: the index of its
+    parent directory and the id of its name in a table of interned path
+    segments. Full paths are never stored, so a directory name shared by
+    thousands of paths costs a few bytes per entry instead of a full copy
+    of the prefix in every path.
+
+    Entries keep the order they were added in (git tree order), which is
+    also the order of the rendered prompt text.
+    """
+
+    __slots__ = ("segments", "_parents", "_names", "_segment_ids", "_index")
+
+    def __init__(self, segments: list[str], parents: array, names: array):
+        self.segments = segments
+        # Parent entry index + 1 (0 for top-level entries)
+        self._parents = parents
+        # Segment id << 1 | is_dir
+        self._names = names
+        self._segment_ids: dict[str, int] | None = None
+        self._index: dict[int, int] | None = None
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[tuple[str, bool]]) -> "FileTree":
+        """Builds a tree from (path, is_dir) entries, parents before their children."""
+        segments: list[str] = []
+        segment_ids: dict[str, int] = {}
+        parents, names = array("I"), array("I")
+        dirs: dict[str, int] = {}  # only needed while building
+
+        def add(path: str, is_dir: bool) -> int:
+            parent_path, _, name = path.rpartition("/")
+            parent = 0
+            if parent_path:
+                parent = dirs.get(parent_path)
+                if parent is None:
+                    # Parent listed after (or without) its children
+                    parent = add(parent_path, True)
+                parent += 1
+            segment = segment_ids.get(name)
+            if segment is None:
+                segment = segment_ids[name] = len(segments)
+                segments.append(name)
+            parents.append(parent)
+            names.append(segment << 1 | is_dir)
+            if is_dir:
+                dirs[path] = len(names) - 1
+            return len(names) - 1
+
+        for path, is_dir in entries:
+            if not (is_dir and path in dirs):
+                add(path, is_dir)
+
+        return cls(segments, parents, names)
+
+    @classmethod
+    def from_text(cls, text: str) -> "FileTree":
+        """
+        Builds a tree from newline-separated paths (the prompt format).
+
+        The text does not mark directories, so entries that are the parent
+        of a later entry are taken to be directories.
+        """
+        paths = text.split("\n") if text else []
+        parents = {path.rpartition("/")[0] for path in paths}
+        return cls.from_entries((path, path in parents) for path in paths)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FileTree) and list(self.entries()) == list(other.entries())
+
+    def _paths(self) -> list[str]:
+        paths: list[str] = []
+        segments = self.segments
+        for parent, name in zip(self._parents, self._names):
+            name = segments[name >> 1]
+            paths.append(paths[parent - 1] + "/" + name if parent else name)
+        return paths
+
+    def entries(self) -> Iterator[tuple[str, bool]]:
+        """Yields (path, is_dir) for every entry, in order."""
+        for path, name in zip(self._paths(), self._names):
+            yield path, bool(name & 1)
+
+    def render(self) -> str:
+        """Renders the tree as newline-separated paths, the format used in prompts."""
+        return "\n".join(self._paths())
+
+    __str__ = render
+
+    def is_dir(self, path: str) -> bool | None:
+        """
+        Looks up a path in the tree.
+
+        Returns:
+            bool | None: Whether the path is a directory, or None if it is not in the tree.
+        """
+        if self._index is None:
+            # Built on first lookup: (parent + 1) << 32 | segment id -> entry index
+            self._index = {
+                parent << 32 | name >> 1: i
+                for i, (parent, name) in enumerate(zip(self._parents, self._names))
+            }
+        if self._segment_ids is None:
+            self._segment_ids = {name: i for i, name in enumerate(self.segments)}
+
+        entry = -1
+        for name in path.strip("/").split("/"):
+            segment = self._segment_ids.get(name)
+            if segment is None:
+                return None
+            entry = self._index.get((entry + 1) << 32 | segment, -1)
+            if entry == -1:
+                return None
+        return bool(self._names[entry] & 1)
+
+    def to_json(self) -> dict:
+        """Serializes the tree for the cache (segments plus base64-packed arrays)."""
+        return {
+            "segments": self.segments,
+            "parents": _pack(self._parents),
+            "names": _pack(self._names),
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "FileTree":
+        return cls(data["segments"], _unpack(data["parents"]), _unpack(data["names"]))
+
+
+def _pack(values: array) -> str:
+    if sys.byteorder == "big":
+        values = array("I", values)
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode()
+
+
+def _unpack(data: str) -> array:
+    values = array("I")
+    values.frombytes(base64.b64decode(data))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
@@ -0,0 +1,332 @@
+from dotenv import load_dotenv
+from typing import Callable, Iterable
+import os
+import re
+
+load_dotenv()
+
+# Paths left out of the file tree sent to the LLM (gitignore syntax)
+DEFAULT_EXCLUDE_RULES = [
+    # Dependencies
+    "node_modules/",
+    "vendor/",
+    "venv/",
+    # Compiled files
+    "*.min.*",
+    "*.pyc",
+    "*.pyo",
+    "*.pyd",
+    "*.so",
+    "*.dll",
+    "*.class",
+    # Asset files
+    "*.jpg",
+    "*.jpeg",
+    "*.png",
+    "*.gif",
+    "*.ico",
+    "*.svg",
+    "*.ttf",
+    "*.woff",
+    "*.woff2",
+    "*.webp",
+    # Cache and temporary files
+    "__pycache__/",
+    ".cache/",
+    ".tmp/",
+    # Lock files and logs
+    "yarn.lock",
+    "poetry.lock",
+    "*.log",
+    # Configuration files
+    ".vscode/",
+    ".idea/",
+]
+
+_SIMPLE_EXTENSION = re.compile(r"\*\.([^*?\[/]+)")
+_SIMPLE_INFIX = re.compile(r"\*([^*?\[/]+)\*")
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translates a gitignore-style glob into a regular expression.
+
+    `*` and `?` do not cross directory separators, `**` does, and a leading
+    `**/` also matches at the root.
+    """
+    out = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif char == "*":
+            out.append("[^/]*")
+            i += 1
+        elif char == "?":
+            out.append("[^/]")
+            i += 1
+        elif char == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+            i = end + 1
+        else:
+            out.append(re.escape(char))
+            i += 1
+    return "".join(out)
+
+
+class _RuleSet:
+    """
+    A list of gitignore-style patterns compiled for fast matching.
+
+    Plain names and `*.ext` patterns become set lookups; only patterns that
+    really need a glob are turned into (one combined) regular expression.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.names: set[str] = set()  # "yarn.lock": any entry with this name
+        self.dir_names: set[str] = set()  # "node_modules/": directories only
+        self.extensions: set[str] = set()  # "*.png": by extension
+        self.infixes: list[str] = []  # "*.min.*": substring of the name
+        name_globs, dir_name_globs, path_globs, dir_path_globs = [], [], [], []
+
+        for pattern in patterns:
+            pattern = pattern.lower()
+            dir_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            anchored = "/" in pattern
+            pattern = pattern.lstrip("/")
+            if not pattern:
+                continue
+
+            if anchored:
+                (dir_path_globs if dir_only else path_globs).append(glob_to_regex(pattern))
+            elif not any(c in pattern for c in "*?["):
+                (self.dir_names if dir_only else self.names).add(pattern)
+            elif not dir_only and _SIMPLE_EXTENSION.fullmatch(pattern):
+                self.extensions.add(pattern[2:])
+            elif not dir_only and _SIMPLE_INFIX.fullmatch(pattern):
+                self.infixes.append(pattern[1:-1])
+            else:
+                (dir_name_globs if dir_only else name_globs).append(glob_to_regex(pattern))
+
+        self.name_regex = self._combine(name_globs)
+        self.dir_name_regex = self._combine(name_globs + dir_name_globs)
+        self.path_regex = self._combine(path_globs)
+        self.dir_path_regex = self._combine(path_globs + dir_path_globs)
+
+    @staticmethod
+    def _combine(regexes: list[str]) -> re.Pattern | None:
+        if not regexes:
+            return None
+        return re.compile("|".join(f"(?:{r})" for r in regexes))
+
+    def __bool__(self):
+        return any(
+            [
+                self.names,
+                self.dir_names,
+                self.extensions,
+                self.infixes,
+                self.dir_name_regex,
+                self.dir_path_regex,
+            ]
+        )
+
+    def matches(self, path: str, name: str, is_dir: bool) -> bool:
+        """Checks one lowercased entry (not its parents) against the rules."""
+        if name in self.names:
+            return True
+        dot = name.rfind(".")
+        if dot != -1 and name[dot + 1:] in self.extensions:
+            return True
+        for infix in self.infixes:
+            if infix in name:
+                return True
+
+        if is_dir:
+            if name in self.dir_names:
+                return True
+            name_regex, path_regex = self.dir_name_regex, self.dir_path_regex
+        else:
+            name_regex, path_regex = self.name_regex, self.path_regex
+
+        if name_regex is not None and name_regex.fullmatch(name):
+            return True
+        return path_regex is not None and path_regex.fullmatch(path) is not None
+
+
+class PathFilter:
+    """
+    Decides which repository paths make it into the file tree.
+
+    Exclude rules use gitignore syntax: a pattern without a slash matches a
+    name at any depth, a pattern with a slash is anchored at the repository
+    root, a trailing slash restricts it to directories, and everything under
+    an excluded directory is excluded too. `!pattern` re-includes entries
+    an exclude rule matched. If include rules are given, only files matching
+    one of them (and the directories leading to them) are kept.
+    """
+
+    def __init__(
+        self,
+        exclude: Iterable[str] = DEFAULT_EXCLUDE_RULES,
+        include: Iterable[str] = (),
+    ):
+        exclude, negate = self._split_negations(exclude)
+        self._exclude = _RuleSet(exclude)
+        self._negate = _RuleSet(negate)
+        self._include = _RuleSet(self._split_negations(include)[0])
+
+    @staticmethod
+    def _split_negations(lines: Iterable[str]) -> tuple[list[str], list[str]]:
+        rules, negations = [], []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("!"):
+                negations.append(line[1:])
+            else:
+                rules.append(line[1:] if line.startswith("\\") else line)
+        return rules, negations
+
+    @classmethod
+    def from_env(cls) -> "PathFilter":
+        """
+        Builds the filter from the default rules plus operator rule files.
+
+        GITHUB_PATH_FILTER_EXCLUDE_FILE: extra exclude rules (appended to the defaults)
+        GITHUB_PATH_FILTER_INCLUDE_FILE: include rules (keep only matching files)
+        """
+        exclude = list(DEFAULT_EXCLUDE_RULES)
+        include: list[str] = []
+
+        exclude_file = os.getenv("GITHUB_PATH_FILTER_EXCLUDE_FILE")
+        if exclude_file:
+            with open(exclude_file) as f:
+                exclude += f.read().splitlines()
+
+        include_file = os.getenv("GITHUB_PATH_FILTER_INCLUDE_FILE")
+        if include_file:
+            with open(include_file) as f:
+                include += f.read().splitlines()
+
+        return cls(exclude=exclude, include=include)
+
+    def _entry_excluded(self, path: str, name: str, is_dir: bool) -> bool:
+        return self._exclude.matches(path, name, is_dir) and not (
+            self._negate and self._negate.matches(path, name, is_dir)
+        )
+
+    def _dir_excluded(self, path: str, cache: dict[str, bool]) -> bool:
+        """Whether a lowercased directory or any of its parents is excluded."""
+        excluded = cache.get(path)
+        if excluded is None:
+            parent, _, name = path.rpartition("/")
+            excluded = (bool(parent) and self._dir_excluded(parent, cache)) or (
+                self._entry_excluded(path, name, True)
+            )
+            cache[path] = excluded
+        return excluded
+
+    def _excluded(self, path: str, is_dir: bool, cache: dict[str, bool]) -> bool:
+        lower = path.lower()
+        parent, _, name = lower.rpartition("/")
+        if parent:
+            # Trees list a directory before its contents, so this is usually a hit
+            parent_excluded = cache.get(parent)
+            if parent_excluded is None:
+                parent_excluded = self._dir_excluded(parent, cache)
+            if parent_excluded:
+                if is_dir:
+                    cache[lower] = True
+                return True
+
+        excluded = self._entry_excluded(lower, name, is_dir)
+        if is_dir:
+            cache[lower] = excluded
+        return excluded
+
+    def _included(self, lower: str) -> bool:
+        """Whether a lowercased file, or one of its directories, matches an include rule."""
+        parent, _, name = lower.rpartition("/")
+        if self._include.matches(lower, name, False):
+            return True
+        while parent:
+            path = parent
+            parent, _, name = path.rpartition("/")
+            if self._include.matches(path, name, True):
+                return True
+        return False
+
+    def excludes_dir(self, path: str) -> bool:
+        """Whether a directory (and so its whole subtree) is excluded."""
+        return self._excluded(path, True, {})
+
+    def includes(self, path: str, is_dir: bool = False) -> bool:
+        """Whether a single path is kept by the exclude and include rules."""
+        if self._excluded(path, is_dir, {}):
+            return False
+        if self._include and not is_dir:
+            return self._included(path.lower())
+        return True
+
+    def exclusion_checker(self) -> Callable[[str, bool], bool]:
+        """
+        Returns a predicate telling whether a (path, is_dir) entry is excluded.
+
+        Directory decisions are memoized across calls, so the predicate can
+        drop entries one by one as a tree is streamed in. Pass the kept
+        entries to `apply_include_rules` once the whole tree has been seen.
+        """
+        cache: dict[str, bool] = {}
+        return lambda path, is_dir: self._excluded(path, is_dir, cache)
+
+    def filter(self, entries: Iterable[tuple[str, bool]]) -> list[str]:
+        """
+        Filters (path, is_dir) entries, keeping their order.
+
+        Decisions for directories are memoized for the duration of the call,
+        so each directory's rules are evaluated once however many files it has.
+        """
+        return [path for path, _ in self.filter_entries(entries)]
+
+    def filter_entries(self, entries: Iterable[tuple[str, bool]]) -> list[tuple[str, bool]]:
+        """Like `filter`, but returns the kept (path, is_dir) entries."""
+        is_excluded = self.exclusion_checker()
+        return self.apply_include_rules(
+            [(path, is_dir) for path, is_dir in entries if not is_excluded(path, is_dir)]
+        )
+
+    def apply_include_rules(self, kept: list[tuple[str, bool]]) -> list[tuple[str, bool]]:
+        """Keeps the entries that passed the exclude rules and match the include rules."""
+        if not self._include:
+            return kept
+
+        # Keep matching files, plus only the directories that lead to them
+        files = []
+        needed_dirs: set[str] = set()
+        for path, is_dir in kept:
+            if is_dir:
+                continue
+            if self._included(path.lower()):
+                files.append(path)
+                parent = path.rpartition("/")[0]
+                while parent and parent not in needed_dirs:
+                    needed_dirs.add(parent)
+                    parent = parent.rpartition("/")[0]
+        keep = set(files) | needed_dirs
+        return [(path, is_dir) for path, is_dir in kept if path in keep]
+
+
+# Filter used for GitHub trees, built once per worker
+default_path_filter = PathFilter.from_env()
@@ -0,0 +1,388 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Callable, Iterable
+import os
+import re
+
+load_dotenv()
+
+# Context windows by model name prefix (the longest matching prefix wins)
+MODEL_CONTEXT_WINDOWS = {
+    "claude": 200_000,
+    "gpt-4": 8_192,
+    "gpt-4-turbo": 128_000,
+    "gpt-4o": 128_000,
+    "gpt-4.1": 1_047_576,
+    "gpt-5": 400_000,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4": 200_000,
+    "mixtral-8x7b-32768": 32_768,
+    "llama-3.1": 131_072,
+    "llama-3.3": 131_072,
+    "llama3": 8_192,
+    "mistral": 32_768,
+}
+DEFAULT_CONTEXT_WINDOW = int(os.getenv("DEFAULT_CONTEXT_WINDOW", "128000"))
+
+# Tokens kept free for a response (the services request up to 12k)
+OUTPUT_TOKEN_RESERVE = 12_000
+
+# Caps the tokens spent on the file tree and README, whatever the model allows
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "0")) or None
+
+# Share of the budget the README may keep once the file tree needs the room
+README_BUDGET_SHARE = 0.25
+
+# Files of one extension in one directory are collapsed into a summary line
+# once there are more than this many; lowered step by step until the tree fits
+_COLLAPSE_THRESHOLDS = [256, 128, 64, 32, 16, 8, 4]
+
+_FENCED_CODE = re.compile(r"(```.*?```|~~~.*?~~~)", re.DOTALL)
+_HTML_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+# [![alt](image)](link) and ![alt](image) / ![alt][ref]
+_BADGE = re.compile(r"\[!\[[^\]]*\]\([^)]*\)\]\([^)]*\)")
+_IMAGE = re.compile(r"!\[[^\]]*\](?:\([^)]*\)|\[[^\]]*\])")
+_HTML_TAG = re.compile(
+    r"</?(?:a|img|p|div|span|br|hr|h[1-6]|picture|source|video|table|thead|tbody|tr|td|th"
+    r"|sup|sub|b|i|em|strong|center|details|summary|kbd|ul|ol|li)\b[^>]*>",
+    re.IGNORECASE,
+)
+_BLANK_LINES = re.compile(r"\n\s*\n(?:\s*\n)+")
+
+
+@lru_cache(maxsize=1)
+def _o200k():
+    """
+    The o200k_base encoding, or None if it cannot be loaded.
+
+    tiktoken downloads encodings on first use (into TIKTOKEN_CACHE_DIR, if
+    set); without network access token counts fall back to an estimate.
+    """
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(
+            f"\033[93mWarning: Could not load the o200k_base encoding ({e}); "
+            f"estimating tokens from text length instead.\033[0m"
+        )
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates tokens at 4 characters per token."""
+    return len(text) // 4
+
+
+def get_token_counter(service: str) -> Callable[[str], int]:
+    """
+    Returns a local token counter for a provider.
+
+    Counting is done in-process so it costs no API call: Ollama uses the
+    same 4-characters-per-token estimate as OllamaService, every other
+    provider the o200k_base encoding the OpenAI-compatible services use
+    (or the estimate too, if the encoding is unavailable offline).
+    """
+    if service == "ollama":
+        return estimate_tokens
+    encoding = _o200k()
+    if encoding is None:
+        return estimate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def get_context_window(model: str) -> int:
+    """Returns the context window of a model, or DEFAULT_CONTEXT_WINDOW if it is unknown."""
+    model = model.lower().rpartition("/")[2]  # "openai/gpt-4o" -> "gpt-4o"
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if model.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+@dataclass
+class PackedPrompt:
+    """The file tree and README to send, and what was condensed to fit the budget."""
+
+    file_tree: str
+    readme: str
+    budget: int
+    original_tokens: int
+    tokens: int
+    # Human-readable notes on what was dropped, in the order it was dropped
+    dropped: list[str] = field(default_factory=list)
+
+    @property
+    def condensed(self) -> bool:
+        return bool(self.dropped)
+
+    def report(self) -> dict:
+        return {
+            "budget": self.budget,
+            "original_tokens": self.original_tokens,
+            "tokens": self.tokens,
+            "dropped": self.dropped,
+        }
+
+
+def strip_readme(readme: str) -> str:
+    """Removes badges, images, HTML tags and comments, and runs of blank lines."""
+    parts = _FENCED_CODE.split(readme)
+    for i in range(0, len(parts), 2):  # leave code blocks alone
+        text = _HTML_COMMENT.sub("", parts[i])
+        text = _BADGE.sub("", text)
+        text = _IMAGE.sub("", text)
+        text = _HTML_TAG.sub("", text)
+        parts[i] = _BLANK_LINES.sub("\n\n", text)
+    return "".join(parts).strip()
+
+
+def _describe(directory: str, count: int, extension: str) -> str:
+    kind = f"{extension} files" if extension else "files"
+    return f"{directory or '.'}/ — {count:,} {kind}"
+
+
+class _TreeCondenser:
+    """
+    Renders condensed versions of a file tree.
+
+    Each entry's directory, extension and depth are worked out once, since
+    several thresholds and depths are usually tried on the same tree.
+    """
+
+    def __init__(self, entries: list[tuple[str, bool]]):
+        self.paths = [path for path, _ in entries]
+        self.directories, self.extensions, self.depths = [], [], []
+        groups: Counter = Counter()
+        for path, is_dir in entries:
+            directory, _, name = path.rpartition("/")
+            dot = name.rfind(".")
+            # Directories get no group, so they are never collapsed
+            extension = None if is_dir else (name[dot:] if dot > 0 else "")
+            self.directories.append(directory)
+            self.extensions.append(extension)
+            self.depths.append(path.count("/") + 1)
+            if extension is not None:
+                groups[directory, extension] += 1
+        self.groups = groups
+        self.max_depth = max(self.depths, default=0)
+
+    def collapse(self, threshold: int) -> tuple[list[str], int]:
+        """
+        Replaces the files of each large homogeneous directory with one summary line.
+
+        Files sharing a directory and extension are collapsed into a line like
+        "src/icons/ — 2,314 .tsx files" once there are more than `threshold` of
+        them. Subdirectories and other files are kept.
+
+        Returns:
+            tuple[list[str], int]: The tree lines, and how many files were collapsed
+        """
+        large = {group for group, count in self.groups.items() if count > threshold}
+        lines, seen, collapsed = [], set(), 0
+        for path, directory, extension in zip(self.paths, self.directories, self.extensions):
+            group = (directory, extension)
+            if group in large:
+                collapsed += 1
+                if group not in seen:
+                    seen.add(group)
+                    lines.append(_describe(directory, self.groups[group], extension))
+                continue
+            lines.append(path)
+        return lines, collapsed
+
+    def limit_depth(self, depth: int) -> tuple[list[str], int]:
+        """
+        Replaces everything below `depth` levels with one summary line per directory.
+
+        Returns:
+            tuple[list[str], int]: The tree lines, and how many entries were dropped
+        """
+        counts: Counter = Counter()
+        for path, extension, entry_depth in zip(self.paths, self.extensions, self.depths):
+            if entry_depth > depth and extension is not None:
+                counts["/".join(path.split("/", depth)[:depth])] += 1
+
+        lines, seen, dropped = [], set(), 0
+        for path, entry_depth in zip(self.paths, self.depths):
+            if entry_depth <= depth:
+                lines.append(path)
+                continue
+            dropped += 1
+            directory = "/".join(path.split("/", depth)[:depth])
+            if directory not in seen:
+                seen.add(directory)
+                lines.append(_describe(directory, counts[directory], ""))
+        return lines, dropped
+
+
+def _first_fitting(
+    steps: list, render: Callable, budget: int, count_tokens: Callable[[str], int]
+) -> tuple | None:
+    """
+    Finds the first (least aggressive) step whose rendering fits the budget.
+
+    Steps are ordered so each one condenses more than the last, so a binary
+    search finds the same step as trying them in order, with fewer renders.
+
+    Returns:
+        tuple | None: (step, text, tokens, render's extra result), or None if no step fits
+    """
+    found, low, high = None, 0, len(steps) - 1
+    while low <= high:
+        middle = (low + high) // 2
+        lines, extra = render(steps[middle])
+        text = "\n".join(lines)
+        tokens = count_tokens(text)
+        if tokens <= budget:
+            found = (steps[middle], text, tokens, extra)
+            high = middle - 1
+        else:
+            low = middle + 1
+    return found
+
+
+def _truncate_lines(
+    lines: list[str], budget: int, count_tokens: Callable[[str], int]
+) -> tuple[str, int]:
+    """Keeps the longest prefix of `lines` that fits, noting how many were cut."""
+
+    def render(kept: int) -> str:
+        text = "\n".join(lines[:kept])
+        if kept < len(lines):
+            text += f"\n… {len(lines) - kept:,} more lines omitted"
+        return text
+
+    low, high = 0, len(lines)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(render(middle)) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return render(low), len(lines) - low
+
+
+def pack_prompt(
+    entries: Iterable[tuple[str, bool]],
+    readme: str,
+    budget: int,
+    count_tokens: Callable[[str], int],
+) -> PackedPrompt:
+    """
+    Fits the file tree and README into a token budget.
+
+    Content that fits is sent unchanged. Otherwise it is condensed in a
+    fixed order, stopping as soon as it fits, so the same repository always
+    produces the same prompt:
+
+    1. Badges, images and HTML are stripped from the README.
+    2. The README is cut to README_BUDGET_SHARE of the budget.
+    3. Large homogeneous directories are collapsed into summary lines,
+       with the highest size threshold that fits.
+    4. The tree is cut off below the deepest level that fits.
+    5. The remaining tree lines are truncated.
+
+    Args:
+        entries (Iterable[tuple[str, bool]]): (path, is_dir) entries of the filtered tree
+        readme (str): The README contents
+        budget (int): Tokens available for the file tree and README together
+        count_tokens (Callable[[str], int]): Counts tokens for the target model
+
+    Returns:
+        PackedPrompt: The content to send and a report of what was dropped
+    """
+    entries = list(entries)
+    file_tree = "\n".join(path for path, _ in entries)
+    tree_tokens, readme_tokens = count_tokens(file_tree), count_tokens(readme)
+    packed = PackedPrompt(
+        file_tree=file_tree,
+        readme=readme,
+        budget=budget,
+        original_tokens=tree_tokens + readme_tokens,
+        tokens=tree_tokens + readme_tokens,
+    )
+    if packed.tokens <= budget:
+        return packed
+
+    stripped = strip_readme(readme)
+    if stripped != readme:
+        packed.readme = stripped
+        stripped_tokens = count_tokens(stripped)
+        packed.dropped.append(
+            f"README badges, images and HTML ({readme_tokens - stripped_tokens:,} tokens)"
+        )
+        readme_tokens = stripped_tokens
+        if tree_tokens + readme_tokens <= budget:
+            packed.tokens = tree_tokens + readme_tokens
+            return packed
+
+    readme_budget = int(budget * README_BUDGET_SHARE)
+    if readme_tokens > readme_budget:
+        lines = packed.readme.split("\n")
+        text, omitted = _truncate_lines(lines, readme_budget, count_tokens)
+        packed.readme = text
+        packed.dropped.append(f"README truncated ({omitted:,} of {len(lines):,} lines)")
+        readme_tokens = count_tokens(packed.readme)
+        if tree_tokens + readme_tokens <= budget:
+            packed.tokens = tree_tokens + readme_tokens
+            return packed
+
+    tree_budget = max(budget - readme_tokens, 0)
+
+    condenser = _TreeCondenser(entries)
+    fitting = _first_fitting(_COLLAPSE_THRESHOLDS, condenser.collapse, tree_budget, count_tokens)
+    if fitting is not None:
+        threshold, packed.file_tree, tokens, collapsed = fitting
+        packed.tokens = tokens + readme_tokens
+        packed.dropped.append(
+            f"{collapsed:,} files in directories with more than {threshold:,} "
+            f"files of one type, summarized"
+        )
+        return packed
+
+    depths = list(range(condenser.max_depth - 1, 0, -1))
+    fitting = _first_fitting(depths, condenser.limit_depth, tree_budget, count_tokens)
+    if fitting is not None:
+        depth, packed.file_tree, tokens, dropped = fitting
+        packed.tokens = tokens + readme_tokens
+        packed.dropped.append(f"{dropped:,} entries below depth {depth}, summarized by directory")
+        return packed
+
+    lines = condenser.limit_depth(1)[0] if depths else condenser.paths
+    text, omitted = _truncate_lines(lines, tree_budget, count_tokens)
+    packed.file_tree = text
+    packed.tokens = count_tokens(text) + readme_tokens
+    summarized = " summarized to the top level and" if depths else ""
+    packed.dropped.append(f"File tree{summarized} truncated ({omitted:,} lines omitted)")
+    return packed
+
+
+def get_prompt_budget(
+    model: str, count_tokens: Callable[[str], int], *fixed_parts: str
+) -> int:
+    """
+    Returns the tokens left for the file tree and README.
+
+    Args:
+        model (str): The target model
+        count_tokens (Callable[[str], int]): Counts tokens for the target model
+        *fixed_parts (str): Prompt parts sent alongside them (system prompt, instructions)
+
+    Returns:
+        int: The budget, capped by PROMPT_TOKEN_BUDGET if it is set
+    """
+    window = get_context_window(model)
+    # Room for the explanation, which is generated by the first call and sent
+    # back with the file tree in the second one, and for that call's response
+    reserve = min(OUTPUT_TOKEN_RESERVE, window // 4)
+    budget = window - 2 * reserve
+    budget -= sum(count_tokens(part) for part in fixed_parts if part)
+    budget -= 100  # tags and separators added by format_user_message
+    if PROMPT_TOKEN_BUDGET is not None:
+        budget = min(budget, PROMPT_TOKEN_BUDGET)
+    return max(budget, 0)
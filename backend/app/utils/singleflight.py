@@ -0,0 +1,51 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight execution.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same result (or exception) instead of repeating
+    it. Once the work finishes the key is released, so later calls run again.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0  # total calls to do()
+        self.executions = 0  # calls that actually ran the work
+        self.coalesced = 0  # calls that joined an in-flight execution
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs `func` for `key`, or joins the execution already running for it.
+
+        Args:
+            key (Hashable): Identifies equivalent work
+            func (Callable): Zero-argument coroutine factory doing the work
+
+        Returns:
+            Any: The result of the shared execution
+        """
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        # Shield the shared task so one cancelled caller (e.g. a closed SSE
+        # stream) does not cancel the work for everyone else
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
@@ -0,0 +1,225 @@
+from dataclasses import dataclass
+from typing import Callable
+import zlib
+
+BLOCK_SIZE = 512
+
+# Members that carry metadata for the next entry (or the whole archive)
+_PAX_HEADER = b"x"
+_PAX_GLOBAL_HEADER = b"g"
+_GNU_LONGNAME = b"L"
+_GNU_LONGLINK = b"K"
+_META_TYPES = (_PAX_HEADER, _PAX_GLOBAL_HEADER, _GNU_LONGNAME, _GNU_LONGLINK)
+
+# Regular files, hard links, symlinks, contiguous files and directories
+_ENTRY_TYPES = (b"0", b"\0", b"1", b"2", b"7", b"5")
+
+# Bytes of gzip input inflated per step, so highly compressed input
+# never expands into one huge buffer
+_INFLATE_STEP = 256 * 1024
+
+
+@dataclass
+class TarEntry:
+    """One file or directory read from a tar stream."""
+
+    path: str
+    is_dir: bool
+    size: int
+    content: bytes | None = None  # only for entries selected for capture
+
+
+class TarStreamParser:
+    """
+    Incremental parser for (optionally gzip-compressed) tar archives.
+
+    Bytes are fed in as they arrive and complete entries are returned as
+    soon as their data has been read. Only the current header and the
+    contents of entries selected by `capture` are kept in memory; all other
+    file data is skipped, so archives of any size parse in constant memory.
+
+    Supports ustar, pax (per-entry and global) and GNU long name headers.
+    Gzip compression is detected from the first bytes of the stream.
+
+    Args:
+        capture (Callable[[str], bool]): Returns True for paths whose contents are needed
+        max_content_bytes (int): Contents of captured entries are truncated past this size
+    """
+
+    def __init__(
+        self,
+        capture: Callable[[str], bool] | None = None,
+        max_content_bytes: int = 1024 * 1024,
+    ):
+        self.capture = capture or (lambda path: False)
+        self.max_content_bytes = max_content_bytes
+        self.global_headers: dict[str, str] = {}
+        self.finished = False
+
+        self._sniff = bytearray()
+        self._decompressor = None
+        self._compressed: bool | None = None
+
+        self._header = bytearray()
+        self._zero_blocks = 0
+        self._remaining = 0
+        self._padding = 0
+        self._entry: TarEntry | None = None
+        self._meta_type: bytes | None = None
+        self._content: bytearray | None = None
+        self._content_limit = 0
+        self._pax: dict[str, str] = {}
+        self._longname: str | None = None
+        self._ready: list[TarEntry] = []
+
+    def feed(self, data: bytes) -> list[TarEntry]:
+        """Parses the next chunk of the stream and returns the entries it completed."""
+        if self._compressed is None:
+            self._sniff += data
+            if len(self._sniff) < 2:
+                return []
+            data, self._sniff = bytes(self._sniff), bytearray()
+            self._compressed = data[:2] == b"\x1f\x8b"
+            if self._compressed:
+                self._decompressor = zlib.decompressobj(wbits=31)
+
+        if self._decompressor is None:
+            self._consume(data)
+        else:
+            while data and not self._decompressor.eof:
+                self._consume(self._decompressor.decompress(data, _INFLATE_STEP))
+                data = self._decompressor.unconsumed_tail
+
+        ready, self._ready = self._ready, []
+        return ready
+
+    def close(self) -> list[TarEntry]:
+        """
+        Ends the stream and returns any remaining entries.
+
+        Raises:
+            ValueError: If the archive stopped in the middle of an entry.
+        """
+        if self._compressed is None and self._sniff:
+            raise ValueError("Truncated tar archive.")
+        if self._decompressor is not None and not self._decompressor.eof:
+            raise ValueError("Truncated gzip stream.")
+        if self._remaining or self._padding or self._header or self._entry or self._meta_type:
+            raise ValueError("Truncated tar archive.")
+        ready, self._ready = self._ready, []
+        return ready
+
+    def _consume(self, data: bytes):
+        view = memoryview(data)
+        pos, end = 0, len(view)
+        while pos < end and not self.finished:
+            if self._remaining:
+                take = min(self._remaining, end - pos)
+                if self._content is not None:
+                    room = self._content_limit - len(self._content)
+                    if room > 0:
+                        self._content += view[pos : pos + min(take, room)]
+                pos += take
+                self._remaining -= take
+                if not self._remaining:
+                    self._end_member()
+            elif self._padding:
+                take = min(self._padding, end - pos)
+                pos += take
+                self._padding -= take
+            else:
+                take = min(BLOCK_SIZE - len(self._header), end - pos)
+                self._header += view[pos : pos + take]
+                pos += take
+                if len(self._header) == BLOCK_SIZE:
+                    block = bytes(self._header)
+                    self._header.clear()
+                    self._start_member(block)
+
+    def _start_member(self, block: bytes):
+        if not any(block):
+            # Two zero blocks mark the end of the archive
+            self._zero_blocks += 1
+            self.finished = self._zero_blocks >= 2
+            return
+        self._zero_blocks = 0
+
+        stored = _parse_number(block[148:156])
+        if stored != sum(block[:148]) + 8 * 32 + sum(block[156:]):
+            raise ValueError("Invalid tar header checksum.")
+
+        size = _parse_number(block[124:136])
+        type_flag = block[156:157]
+        self._remaining = size
+        self._padding = -size % BLOCK_SIZE
+
+        if type_flag in _META_TYPES:
+            self._meta_type = type_flag
+            self._content = bytearray()
+            self._content_limit = size
+        else:
+            name = _decode(block[0:100])
+            if block[257:262] == b"ustar" and block[345:500].strip(b"\0"):
+                name = _decode(block[345:500]) + "/" + name
+            path = self._longname or self._pax.get("path") or name
+            if "size" in self._pax:
+                size = self._remaining = int(self._pax["size"])
+                self._padding = -size % BLOCK_SIZE
+            self._pax, self._longname = {}, None
+
+            is_dir = type_flag == b"5" or path.endswith("/")
+            self._entry = TarEntry(path.rstrip("/"), is_dir, size)
+            if type_flag not in _ENTRY_TYPES:
+                self._entry = None  # devices and fifos are skipped
+            if self._entry and not is_dir and self.capture(self._entry.path):
+                self._content = bytearray()
+                self._content_limit = self.max_content_bytes
+
+        if not self._remaining:
+            self._end_member()
+
+    def _end_member(self):
+        content = bytes(self._content) if self._content is not None else None
+        self._content = None
+
+        if self._meta_type is not None:
+            meta_type, self._meta_type = self._meta_type, None
+            if meta_type == _PAX_HEADER:
+                self._pax = _parse_pax(content)  # type: ignore
+            elif meta_type == _PAX_GLOBAL_HEADER:
+                self.global_headers.update(_parse_pax(content))  # type: ignore
+            elif meta_type == _GNU_LONGNAME:
+                self._longname = _decode(content)  # type: ignore
+            return
+
+        if self._entry is not None:
+            self._entry.content = content
+            self._ready.append(self._entry)
+            self._entry = None
+
+
+def _decode(field: bytes) -> str:
+    return field.split(b"\0", 1)[0].decode("utf-8", "replace")
+
+
+def _parse_number(field: bytes) -> int:
+    """Reads an octal header number, or a GNU base-256 one (high bit set)."""
+    if field[0] & 0x80:
+        return int.from_bytes(bytes([field[0] & 0x7F]) + field[1:], "big")
+    digits = field.replace(b"\0", b" ").strip()
+    return int(digits, 8) if digits else 0
+
+
+def _parse_pax(data: bytes) -> dict[str, str]:
+    """Parses pax extended header records ("<length> <key>=<value>\\n")."""
+    headers = {}
+    pos = 0
+    while pos < len(data):
+        space = data.index(b" ", pos)
+        length = int(data[pos:space])
+        if length <= 0:
+            raise ValueError("Invalid pax header.")
+        key, _, value = data[space + 1 : pos + length - 1].partition(b"=")
+        headers[key.decode("utf-8", "replace")] = value.decode("utf-8", "replace")
+        pos += length
+    return headers
@@ -0,0 +1,114 @@
+from typing import Callable
+import codecs
+import json
+import re
+
+_TREE_START = re.compile(r'"tree"\s*:\s*\[')
+_ROOT_SHA = re.compile(r'"sha"\s*:\s*"([0-9a-f]{40})"')
+_TRUNCATED = re.compile(r'"truncated"\s*:\s*(true|false)')
+_SEPARATORS = re.compile(r"[\s,]*")
+
+# Scans one JSON value at an offset; the entry dict it builds is dropped as
+# soon as the needed fields have been read
+_scan = json.JSONDecoder().raw_decode
+
+
+class TreeStreamDecoder:
+    """
+    Incremental decoder for GitHub git tree responses.
+
+    Parses the `tree` array of /git/trees/{sha} as bytes arrive and keeps
+    only what the file tree needs: each entry's path, whether it is a
+    directory, and (for directories) its SHA. Entries are decoded one at a
+    time, so neither the full payload nor the list of entry dicts (with
+    their mode, size and url fields) is ever held in memory.
+
+    Args:
+        prefix (str): Prepended to every path (for subtree listings)
+        skip (Callable[[str, bool], bool]): Drops (path, is_dir) entries as they are decoded
+    """
+
+    def __init__(
+        self,
+        prefix: str = "",
+        skip: Callable[[str, bool], bool] | None = None,
+    ):
+        self.prefix = prefix
+        self.skip = skip
+        self.sha: str | None = None
+        self.truncated = False
+        # (path, is_dir, sha of directories / None for files)
+        self.entries: list[tuple[str, bool, str | None]] = []
+
+        self._text = ""
+        self._outside = ""  # top-level fields around the tree array
+        self._state = "head"
+        self._utf8 = codecs.getincrementaldecoder("utf-8")("replace")
+
+    def feed(self, data: bytes):
+        """Decodes the entries completed by the next chunk of the response."""
+        text = self._text + self._utf8.decode(data)
+
+        if self._state == "head":
+            match = _TREE_START.search(text)
+            if match is None:
+                self._text = text
+                return
+            self._outside += text[: match.start()]
+            text = text[match.end():]
+            self._state = "tree"
+
+        if self._state == "tree":
+            pos, end = 0, len(text)
+            entries, prefix, skip = self.entries, self.prefix, self.skip
+            while True:
+                pos = _SEPARATORS.match(text, pos).end()
+                if pos == end:
+                    break
+                if text[pos] == "]":
+                    self._state = "tail"
+                    pos += 1
+                    break
+                if text[pos] != "{":
+                    raise ValueError("Malformed tree response.")
+                try:
+                    item, pos = _scan(text, pos)
+                except json.JSONDecodeError:
+                    break  # the entry continues in the next chunk
+
+                path = prefix + item["path"]
+                is_dir = item["type"] == "tree"
+                if skip is None or not skip(path, is_dir):
+                    entries.append((path, is_dir, item.get("sha") if is_dir else None))
+            text = text[pos:]
+
+        if self._state == "tail":
+            self._outside += text
+            text = ""
+        self._text = text
+
+    def close(self):
+        """
+        Finishes decoding and reads the top-level `sha` and `truncated` fields.
+
+        Raises:
+            ValueError: If the response ended before the tree array did.
+        """
+        if self._state != "tail":
+            raise ValueError("Incomplete tree response.")
+        sha = _ROOT_SHA.search(self._outside)
+        self.sha = sha.group(1) if sha else None
+        truncated = _TRUNCATED.search(self._outside)
+        self.truncated = truncated is not None and truncated.group(1) == "true"
+
+
+def decode_tree(
+    data: bytes,
+    prefix: str = "",
+    skip: Callable[[str, bool], bool] | None = None,
+) -> TreeStreamDecoder:
+    """Decodes a complete tree response held in memory."""
+    decoder = TreeStreamDecoder(prefix, skip)
+    decoder.feed(data)
+    decoder.close()
+    return decoder
@@ -0,0 +1,79 @@
+"""
+Benchmark: filtering a synthetic 500k-path monorepo tree.
+
+Compares the previous substring-scan `should_include_file` with the compiled
+PathFilter. Run from the backend directory:
+
+    python -m benchmarks.bench_path_filter [--paths 500000]
+"""
+
+import argparse
+import random
+import time
+
+from app.utils.path_filter import PathFilter
+
+LEGACY_EXCLUDED_PATTERNS = [
+    "node_modules/", "vendor/", "venv/", ".min.", ".pyc", ".pyo", ".pyd", ".so",
+    ".dll", ".class", ".jpg", ".jpeg", ".png", ".gif", ".ico", ".svg", ".ttf",
+    ".woff", ".webp", "__pycache__/", ".cache/", ".tmp/", "yarn.lock",
+    "poetry.lock", "*.log", ".vscode/", ".idea/",
+]
+
+
+def legacy_should_include_file(path):
+    """The filter GitHubService used before PathFilter."""
+    return not any(pattern in path.lower() for pattern in LEGACY_EXCLUDED_PATTERNS)
+
+
+def synthetic_tree(count: int, seed: int = 42) -> list[tuple[str, bool]]:
+    """Builds a deterministic monorepo-like tree of (path, is_dir) entries."""
+    rng = random.Random(seed)
+    top = ["packages", "services", "apps", "libs", "tools", "docs"]
+    dirs = ["src", "lib", "components", "utils", "api", "tests", "assets",
+            "node_modules", "vendor", "__pycache__", "generated", "internal"]
+    extensions = [".ts", ".tsx", ".js", ".py", ".go", ".md", ".json", ".png",
+                  ".svg", ".min.js", ".pyc", ".log", ".css", ".rs", ".java"]
+
+    entries: list[tuple[str, bool]] = []
+    seen_dirs: set[str] = set()
+    while len(entries) < count:
+        depth = rng.randint(1, 6)
+        parts = [rng.choice(top), f"pkg{rng.randint(0, 400)}"]
+        parts += [rng.choice(dirs) for _ in range(depth)]
+        for i in range(1, len(parts) + 1):
+            directory = "/".join(parts[:i])
+            if directory not in seen_dirs:
+                seen_dirs.add(directory)
+                entries.append((directory, True))
+        # Real trees hold several files per directory
+        for _ in range(rng.randint(1, 20)):
+            name = f"file{rng.randint(0, 5000)}{rng.choice(extensions)}"
+            entries.append(("/".join(parts) + "/" + name, False))
+    return entries[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paths", type=int, default=500_000)
+    args = parser.parse_args()
+
+    entries = synthetic_tree(args.paths)
+    print(f"Synthetic tree: {len(entries):,} entries")
+
+    start = time.perf_counter()
+    legacy = [path for path, _ in entries if legacy_should_include_file(path)]
+    legacy_seconds = time.perf_counter() - start
+
+    path_filter = PathFilter()
+    start = time.perf_counter()
+    compiled = path_filter.filter(entries)
+    compiled_seconds = time.perf_counter() - start
+
+    print(f"legacy substring scan: {legacy_seconds * 1000:8.1f} ms  ({len(legacy):,} kept)")
+    print(f"compiled PathFilter:   {compiled_seconds * 1000:8.1f} ms  ({len(compiled):,} kept)")
+    print(f"speedup: {legacy_seconds / compiled_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
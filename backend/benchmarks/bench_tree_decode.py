@@ -0,0 +1,111 @@
+"""
+Benchmark: peak memory of decoding a large recursive /git/trees response.
+
+Compares `response.json()` followed by filtering with the streaming
+TreeStreamDecoder fed in 64 KiB chunks. Each variant runs in a fresh
+subprocess so peak RSS is not shared between them. Run from the backend
+directory:
+
+    python -m benchmarks.bench_tree_decode [--paths 300000]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_path_filter import synthetic_tree
+
+CHUNK_SIZE = 64 * 1024
+
+
+def write_response(path: str, count: int):
+    """Writes a GitHub-shaped tree response for a synthetic monorepo."""
+    tree = []
+    for i, (entry_path, is_dir) in enumerate(synthetic_tree(count)):
+        sha = f"{i:040x}"
+        entry = {
+            "path": entry_path,
+            "mode": "040000" if is_dir else "100644",
+            "type": "tree" if is_dir else "blob",
+            "sha": sha,
+        }
+        if not is_dir:
+            entry["size"] = 1000 + i % 5000
+        entry["url"] = f"https://api.github.com/repos/octo/mono/git/{'trees' if is_dir else 'blobs'}/{sha}"
+        tree.append(entry)
+    with open(path, "w") as f:
+        json.dump({"sha": "0" * 40, "url": "", "tree": tree, "truncated": False}, f)
+
+
+def run_variant(variant: str, path: str):
+    from app.utils.path_filter import PathFilter
+    from app.utils.tree_decoder import TreeStreamDecoder
+
+    path_filter = PathFilter()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    if variant == "json":
+        with open(path, "rb") as f:
+            body = f.read()  # what response.json() decodes from
+        data = json.loads(body)
+        entries = [(item["path"], item["type"] == "tree") for item in data["tree"]]
+        kept = path_filter.filter(entries)
+    else:
+        decoder = TreeStreamDecoder(skip=path_filter.exclusion_checker())
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                decoder.feed(chunk)
+        decoder.close()
+        entries = [(p, d) for p, d, _ in decoder.entries]
+        kept = [p for p, _ in path_filter.apply_include_rules(entries)]
+    file_tree = "\n".join(kept)
+
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # ru_maxrss is in KiB on Linux (bytes on macOS)
+    scale = 1 if sys.platform == "darwin" else 1024
+    rss = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) * scale
+    print(json.dumps({"seconds": seconds, "peak": peak, "rss": rss, "lines": file_tree.count("\n") + 1}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paths", type=int, default=300_000)
+    parser.add_argument("--variant", choices=["json", "stream"], help=argparse.SUPPRESS)
+    parser.add_argument("--response", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.response)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tree.json")
+        write_response(path, args.paths)
+        print(f"Tree response: {args.paths:,} entries, {os.path.getsize(path) / 2**20:.1f} MiB")
+
+        for variant, label in [("json", "response.json() + filter"), ("stream", "TreeStreamDecoder")]:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_tree_decode",
+                 "--variant", variant, "--response", path],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output)
+            print(
+                f"{label:26} {result['seconds'] * 1000:8.1f} ms  "
+                f"peak alloc {result['peak'] / 2**20:7.1f} MiB  "
+                f"peak RSS +{result['rss'] / 2**20:7.1f} MiB  ({result['lines']:,} kept)"
+            )
+
+
+if __name__ == "__main__":
+    main()
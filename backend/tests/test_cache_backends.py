@@ -0,0 +1,339 @@
+"""
+Tests for the shared cache backends.
+
+The Redis backend runs against a small in-process stand-in server that
+speaks the subset of RESP2 the backend uses.
+"""
+
+import asyncio
+import fnmatch
+import time
+import pytest
+from app.core.cache import MemoryCacheBackend, RedisCacheBackend, SQLiteCacheBackend
+
+
+class RedisStandIn:
+    """Minimal Redis-protocol server holding its data in memory."""
+
+    def __init__(self):
+        self.strings: dict[bytes, tuple[bytes, float | None]] = {}
+        self.hashes: dict[bytes, dict[bytes, bytes]] = {}
+        self.zsets: dict[bytes, dict[bytes, float]] = {}
+        # Bumped on every write, for WATCH
+        self.versions: dict[bytes, int] = {}
+        # Seconds to wait before each reply, to catch callers mid-command
+        self.reply_delay = 0.0
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"redis://127.0.0.1:{port}/0"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        # Per-connection transaction state: watched key versions and queued commands
+        watched: dict[bytes, int] = {}
+        queued: list | None = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                args = []
+                for _ in range(int(line[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+
+                command = args[0].upper()
+                if command == b"WATCH":
+                    watched.update((k, self.versions.get(k, 0)) for k in args[1:])
+                    reply = "OK"
+                elif command == b"UNWATCH":
+                    watched.clear()
+                    reply = "OK"
+                elif command == b"MULTI":
+                    queued, reply = [], "OK"
+                elif command == b"EXEC":
+                    changed = any(self.versions.get(k, 0) != v for k, v in watched.items())
+                    reply = None if changed else [self._handle(c) for c in queued]
+                    watched.clear()
+                    queued = None
+                elif queued is not None:
+                    queued.append(args)
+                    reply = "QUEUED"
+                else:
+                    reply = self._handle(args)
+                if self.reply_delay:
+                    await asyncio.sleep(self.reply_delay)
+                writer.write(self._reply(reply))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _reply(self, value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, bool):
+            return b":%d\r\n" % value
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, str):
+            return b"+%s\r\n" % value.encode()
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        return b"*%d\r\n" % len(value) + b"".join(self._reply(v) for v in value)
+
+    def _string(self, key):
+        entry = self.strings.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.time():
+            del self.strings[key]
+            return None
+        return entry[0] if entry else None
+
+    def _handle(self, args):
+        command, *rest = args
+        command = command.upper()
+        if command in (b"SET", b"DEL", b"INCRBY", b"DECRBY", b"HSET", b"HDEL", b"ZADD", b"ZREM"):
+            keys = rest if command == b"DEL" else rest[:1]
+            for key in keys:
+                self.versions[key] = self.versions.get(key, 0) + 1
+        if command in (b"PING", b"SELECT", b"AUTH"):
+            return "OK"
+        if command == b"EXISTS":
+            return sum(self._string(k) is not None for k in rest)
+        if command == b"GET":
+            return self._string(rest[0])
+        if command == b"SET":
+            key, value, *options = rest
+            expires_at = None
+            if b"NX" in options and self._string(key) is not None:
+                return None
+            if b"PX" in options:
+                expires_at = time.time() + int(options[options.index(b"PX") + 1]) / 1000
+            self.strings[key] = (value, expires_at)
+            return "OK"
+        if command == b"DEL":
+            return sum(self.strings.pop(k, None) is not None for k in rest)
+        if command == b"INCRBY" or command == b"DECRBY":
+            sign = 1 if command == b"INCRBY" else -1
+            value = int(self._string(rest[0]) or 0) + sign * int(rest[1])
+            self.strings[rest[0]] = (str(value).encode(), None)
+            return value
+        if command == b"HGET":
+            return self.hashes.get(rest[0], {}).get(rest[1])
+        if command == b"HMGET":
+            return [self.hashes.get(rest[0], {}).get(f) for f in rest[1:]]
+        if command == b"HSET":
+            self.hashes.setdefault(rest[0], {})[rest[1]] = rest[2]
+            return 1
+        if command == b"HDEL":
+            return int(self.hashes.get(rest[0], {}).pop(rest[1], None) is not None)
+        if command == b"ZADD":
+            key, *options = rest
+            only_existing = options[0] == b"XX"
+            if only_existing:
+                options = options[1:]
+            zset = self.zsets.setdefault(key, {})
+            if not only_existing or options[1] in zset:
+                zset[options[1]] = float(options[0])
+            return 0
+        if command == b"ZREM":
+            return int(self.zsets.get(rest[0], {}).pop(rest[1], None) is not None)
+        if command == b"ZRANGE":
+            members = sorted(self.zsets.get(rest[0], {}).items(), key=lambda m: m[1])
+            return [m for m, _ in members][int(rest[1]) : int(rest[2]) + 1]
+        if command == b"SCAN":
+            pattern = rest[rest.index(b"MATCH") + 1].decode().replace("\\", "")
+            names = [k for k in list(self.strings) if self._string(k) is not None]
+            names += list(self.hashes) + list(self.zsets)
+            return [b"0", [k for k in names if fnmatch.fnmatchcase(k.decode(), pattern)]]
+        raise AssertionError(f"Unsupported command {command!r}")
+
+
+def run_backend_test(kind, tmp_path, test):
+    """Run `test(backend)` against a fresh backend of the given kind."""
+
+    async def main():
+        stand_in = None
+        if kind == "memory":
+            backend = MemoryCacheBackend(max_bytes=1000)
+        elif kind == "sqlite":
+            backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_bytes=1000)
+        else:
+            stand_in = RedisStandIn()
+            backend = RedisCacheBackend(await stand_in.start(), max_bytes=1000)
+        try:
+            await test(backend)
+        finally:
+            await backend.close()
+            if stand_in:
+                await stand_in.stop()
+
+    asyncio.run(main())
+
+
+BACKENDS = ["memory", "sqlite", "redis"]
+
+
+class TestCacheBackends:
+    """Behaviour shared by every cache backend."""
+
+    @pytest.mark.parametrize("kind", BACKENDS)
+    def test_round_trip(self, kind, tmp_path):
+        """Test storing, reading and deleting a JSON value."""
+
+        async def test(backend):
+            value = {"default_branch": "main", "file_tree": "src/app.py", "readme": None}
+            await backend.set("repo:octo/demo:anonymous", value)
+            assert await backend.get("repo:octo/demo:anonymous") == value
+            await backend.delete("repo:octo/demo:anonymous")
+            assert await backend.get("repo:octo/demo:anonymous") is None
+
+        run_backend_test(kind, tmp_path, test)
+
+    @pytest.mark.parametrize("kind", BACKENDS)
+    def test_ttl_expiry(self, kind, tmp_path):
+        """Test that entries disappear once their TTL has passed."""
+
+        async def test(backend):
+            await backend.set("short", "value", ttl=0.05)
+            await backend.set("forever", "value")
+            await asyncio.sleep(0.1)
+            assert await backend.get("short") is None
+            assert await backend.get("forever") == "value"
+
+        run_backend_test(kind, tmp_path, test)
+
+    @pytest.mark.parametrize("kind", BACKENDS)
+    def test_size_eviction(self, kind, tmp_path):
+        """Test that least recently used entries are evicted over the size budget."""
+
+        async def test(backend):
+            await backend.set("a", "x" * 400)
+            await asyncio.sleep(0.01)
+            await backend.set("b", "x" * 400)
+            await asyncio.sleep(0.01)
+            await backend.get("a")  # "a" is now the most recently used
+            await asyncio.sleep(0.01)
+            await backend.set("c", "x" * 400)
+            assert await backend.get("b") is None
+            assert await backend.get("a") is not None
+            assert await backend.get("c") is not None
+
+        run_backend_test(kind, tmp_path, test)
+
+    @pytest.mark.parametrize("kind", BACKENDS)
+    def test_keys_by_prefix(self, kind, tmp_path):
+        """Test listing keys by prefix."""
+
+        async def test(backend):
+            await backend.set("repo:octo/a:anonymous", 1)
+            await backend.set("repo:octo/b:anonymous", 2)
+            await backend.set("other", 3)
+            assert await backend.keys("repo:") == [
+                "repo:octo/a:anonymous",
+                "repo:octo/b:anonymous",
+            ]
+
+        run_backend_test(kind, tmp_path, test)
+
+    @pytest.mark.parametrize("kind", BACKENDS)
+    def test_add_only_if_absent(self, kind, tmp_path):
+        """Test that add() refuses live keys but replaces expired ones."""
+
+        async def test(backend):
+            assert await backend.add("lease", 1, ttl=0.05)
+            assert not await backend.add("lease", 2, ttl=0.05)
+            assert await backend.get("lease") == 1
+            await asyncio.sleep(0.1)
+            assert await backend.add("lease", 3)
+            assert await backend.get("lease") == 3
+
+        run_backend_test(kind, tmp_path, test)
+
+    def test_sqlite_survives_reopen(self, tmp_path):
+        """Test that the SQLite cache is shared by separate connections."""
+        path = str(tmp_path / "cache.sqlite3")
+
+        async def main():
+            first = SQLiteCacheBackend(path)
+            await first.set("repo:octo/demo:anonymous", {"readme": "# Demo"})
+            second = SQLiteCacheBackend(path)
+            assert await second.get("repo:octo/demo:anonymous") == {"readme": "# Demo"}
+            await first.close()
+            await second.close()
+
+        asyncio.run(main())
+
+    def test_redis_concurrent_writers_keep_exact_size(self):
+        """Test that workers writing the same keys at once keep the byte total exact."""
+
+        async def main():
+            stand_in = RedisStandIn()
+            url = await stand_in.start()
+            workers = [RedisCacheBackend(url, max_bytes=10_000) for _ in range(2)]
+            names = [f"key{i}" for i in range(5)]
+
+            await asyncio.gather(*(
+                worker.set(name, "x" * (10 * n + len(name)))
+                for n, worker in enumerate(workers * 10)
+                for name in names
+            ))
+            await workers[0].delete("key0")
+
+            backend = workers[0]
+            sizes = await backend.execute("HMGET", backend._sizes_key, *(backend.namespace + n for n in names))
+            total = await backend.execute("GET", backend._bytes_key)
+            assert int(total) == sum(int(size or 0) for size in sizes)
+            for worker in workers:
+                await worker.close()
+            await stand_in.stop()
+
+        asyncio.run(main())
+
+    def test_redis_eviction_prunes_expired_entries(self):
+        """Test that expired entries leave the size index before live ones are evicted."""
+
+        async def test(backend):
+            await backend.set("live", "x" * 300)
+            await asyncio.sleep(0.01)
+            await backend.set("short", "x" * 600, ttl=0.05)
+            await asyncio.sleep(0.1)
+            await backend.set("new", "x" * 200)
+
+            assert await backend.get("live") is not None
+            assert await backend.get("new") is not None
+            name = backend.namespace + "short"
+            assert await backend.execute("HGET", backend._sizes_key, name) is None
+            assert name.encode() not in await backend.execute("ZRANGE", backend._index_key, 0, -1)
+            assert int(await backend.execute("GET", backend._bytes_key)) < 1000
+
+        run_backend_test("redis", None, test)
+
+    def test_redis_cancelled_call_does_not_leak_its_reply(self):
+        """Test that a call cancelled before its reply arrives does not hand the reply to the next call."""
+
+        async def main():
+            stand_in = RedisStandIn()
+            backend = RedisCacheBackend(await stand_in.start())
+            await backend.set("a", "value of a")
+            await backend.set("b", "value of b")
+
+            stand_in.reply_delay = 0.05
+            task = asyncio.create_task(backend.get("a"))
+            await asyncio.sleep(0.01)  # the GET is sent, its reply not read yet
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            stand_in.reply_delay = 0
+
+            value = await backend.get("b")
+            await backend.close()
+            await stand_in.stop()
+            return value
+
+        assert asyncio.run(main()) == "value of b"
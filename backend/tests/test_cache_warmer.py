@@ -0,0 +1,101 @@
+"""
+Tests for the background cache warmer.
+"""
+
+import asyncio
+import pytest
+from app.core.cache import MemoryCacheBackend, set_cache_backend
+from app.services import cache_warmer as cache_warmer_module
+from app.services.cache_warmer import CacheWarmer
+
+
+@pytest.fixture
+def cache():
+    backend = MemoryCacheBackend()
+    set_cache_backend(backend)
+    yield backend
+    set_cache_backend(None)
+
+
+def recording_warmer(**kwargs) -> tuple[CacheWarmer, list]:
+    """A warmer that records what it would fetch instead of calling GitHub."""
+    warmer = CacheWarmer(**kwargs)
+    warmed = []
+
+    async def warm(username, repo):
+        warmed.append(f"{username}/{repo}")
+
+    warmer.warm = warm
+    return warmer, warmed
+
+
+class TestCacheWarmer:
+    """Test suite for CacheWarmer."""
+
+    def test_warms_most_requested(self, cache):
+        """Test that only the top repositories are warmed, most requested first."""
+        warmer, warmed = recording_warmer(top_n=2, concurrency=1)
+        for full_name, count in [("octo/a", 1), ("Octo/B", 5), ("octo/c", 3)]:
+            for _ in range(count):
+                warmer.record(*full_name.split("/"))
+
+        asyncio.run(warmer.run_once())
+
+        assert warmed == ["octo/b", "octo/c"]
+        assert warmer.requests[("octo", "b")] == 2.5
+
+    def test_lease_prevents_duplicate_work(self, cache):
+        """Test that two workers sharing a cache warm each repository once per round."""
+        first, first_warmed = recording_warmer(top_n=5)
+        second, second_warmed = recording_warmer(top_n=5)
+        first.record("octo", "demo")
+        second.record("octo", "demo")
+
+        async def main():
+            await first.run_once()
+            await second.run_once()
+
+        asyncio.run(main())
+
+        assert first_warmed == ["octo/demo"]
+        assert second_warmed == []
+
+    def test_skips_subscribed_repositories(self, cache):
+        """Test that repositories refreshed by push webhooks are not polled."""
+        warmer, warmed = recording_warmer()
+        warmer.record("octo", "demo")
+        asyncio.run(cache.set("webhook:octo/demo", True))
+
+        asyncio.run(warmer.run_once())
+
+        assert warmed == []
+
+    def test_respects_quota_budget(self, cache, monkeypatch):
+        """Test that nothing is warmed when the GitHub rate limit runs low."""
+        warmer, warmed = recording_warmer(min_headroom=0.5)
+        warmer.record("octo", "demo")
+
+        class LowPool:
+            def headroom_fraction(self):
+                return 0.1
+
+        monkeypatch.setattr(cache_warmer_module, "get_default_credential_pool", LowPool)
+
+        asyncio.run(warmer.run_once())
+
+        assert warmed == []
+        assert warmer.skipped_for_quota == 1
+
+    def test_failed_repositories_are_dropped(self, cache):
+        """Test that repositories the server cannot read stop being warmed."""
+        warmer = CacheWarmer()
+        warmer.record("octo", "private")
+
+        async def warm(username, repo):
+            raise ValueError("Repository not found.")
+
+        warmer.warm = warm
+        asyncio.run(warmer.run_once())
+
+        assert warmer.failed == 1
+        assert warmer.popular() == []
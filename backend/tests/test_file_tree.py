@@ -0,0 +1,64 @@
+"""
+Tests for the compact prefix-compressed file tree.
+"""
+
+import json
+from app.utils.file_tree import FileTree
+
+ENTRIES = [
+    ("README.md", False),
+    ("src", True),
+    ("src/app", True),
+    ("src/app/main.py", False),
+    ("src/app/utils.py", False),
+    ("src/version", False),
+    ("tests", True),
+    ("tests/app", True),
+    ("tests/app/main.py", False),
+]
+
+
+class TestFileTree:
+    """Test suite for FileTree."""
+
+    def test_render_round_trip(self):
+        """Test that rendering reproduces the newline-separated prompt format."""
+        tree = FileTree.from_entries(ENTRIES)
+
+        assert tree.render() == "\n".join(path for path, _ in ENTRIES)
+        assert list(tree.entries()) == ENTRIES
+        assert len(tree) == len(ENTRIES)
+
+    def test_segments_are_interned(self):
+        """Test that repeated directory and file names are stored once."""
+        tree = FileTree.from_entries(ENTRIES)
+
+        assert sorted(tree.segments) == [
+            "README.md", "app", "main.py", "src", "tests", "utils.py", "version"
+        ]
+
+    def test_lookup(self):
+        """Test telling files from directories, including extension-less files."""
+        tree = FileTree.from_entries(ENTRIES)
+
+        assert tree.is_dir("src/app") is True
+        assert tree.is_dir("src/app/") is True
+        assert tree.is_dir("src/version") is False
+        assert tree.is_dir("tests/app/main.py") is False
+        assert tree.is_dir("src/missing.py") is None
+        assert tree.is_dir("docs") is None
+
+    def test_json_round_trip(self):
+        """Test that the cache serialization survives JSON."""
+        tree = FileTree.from_entries(ENTRIES)
+
+        restored = FileTree.from_json(json.loads(json.dumps(tree.to_json())))
+
+        assert restored == tree
+        assert restored.is_dir("src/app") is True
+
+    def test_from_text_infers_directories(self):
+        """Test loading the plain-text format used by older cache entries."""
+        tree = FileTree.from_text("src\nsrc/main.py\nLICENSE")
+
+        assert list(tree.entries()) == [("src", True), ("src/main.py", False), ("LICENSE", False)]
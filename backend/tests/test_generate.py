@@ -0,0 +1,168 @@
+"""
+Tests for the streaming generation endpoint, run against a mocked GitHub API
+and a fake LLM provider.
+"""
+
+import json
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.cache import MemoryCacheBackend, set_cache_backend
+from app.prompts import SYSTEM_FIRST_PROMPT, SYSTEM_SECOND_PROMPT
+from app.routers import generate
+from app.services import github_service
+from app.services.github_response_cache import response_cache
+from app.services.llm_provider import LLMProvider
+from app.utils import prompt_packer
+from tests.test_github_service import REPO_ROUTES, SHA, github_api
+
+MAPPING = "<component_mapping>\n1. Main: src/main.py\n</component_mapping>"
+DIAGRAM = 'flowchart TD\n    Main["Main"]\n    click Main "main.py"'
+
+
+class FakeProvider(LLMProvider):
+    """Answers each generation phase with a canned response, recording every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def stream(self, system_prompt, data, api_key=None, model=None, reasoning_effort="low"):
+        self.calls.append({"system_prompt": system_prompt, "data": data, "model": model})
+        if system_prompt.startswith(SYSTEM_FIRST_PROMPT):
+            yield "A web "
+            yield "app."
+        elif system_prompt == SYSTEM_SECOND_PROMPT:
+            yield MAPPING
+        else:
+            yield f"```mermaid\n{DIAGRAM}\n```"
+
+    async def complete(self, system_prompt, data, api_key=None, model=None, reasoning_effort="low"):
+        return "".join([chunk async for chunk in self.stream(system_prompt, data)])
+
+    def count_tokens(self, prompt):
+        return len(prompt) // 4
+
+
+SCOPED_ROUTES = {
+    **REPO_ROUTES,
+    f"/repos/octo/demo/git/trees/{SHA}": (200, {"sha": SHA, "tree": [
+        {"path": "README.md", "type": "blob", "sha": "1" * 40},
+        {"path": "src", "type": "tree", "sha": "b" * 40},
+        {"path": "src/main.py", "type": "blob", "sha": "2" * 40},
+    ]}),
+    f"/repos/octo/demo/git/trees/{'b' * 40}": (200, {"sha": "b" * 40, "tree": [
+        {"path": "main.py", "type": "blob", "sha": "2" * 40},
+    ]}),
+}
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """The generate router with a mocked GitHub API, a fresh cache and a fake "openai" provider."""
+    client = httpx.AsyncClient(
+        base_url="https://api.github.com",
+        transport=httpx.MockTransport(github_api(SCOPED_ROUTES)),
+    )
+    monkeypatch.setattr(github_service, "_http_client", client)
+    monkeypatch.setenv("GITHUB_PAT", "test-token")
+    # Count tokens without downloading a tiktoken encoding
+    monkeypatch.setattr(prompt_packer, "_o200k", lambda: None)
+    fake = FakeProvider()
+    monkeypatch.setitem(generate.SERVICES, "openai", fake)
+    set_cache_backend(MemoryCacheBackend())
+    response_cache.clear()
+
+    api = FastAPI()
+    api.include_router(generate.router)
+    yield fake, TestClient(api)
+    set_cache_backend(None)
+
+
+def stream(client: TestClient, **overrides) -> list[dict]:
+    """Posts to /generate/stream and returns the server-sent events."""
+    body = {"username": "octo", "repo": "demo", "service": "openai", **overrides}
+    response = client.post("/generate/stream", json=body)
+    assert response.status_code == 200
+    return [
+        json.loads(line[len("data: "):])
+        for line in response.text.split("\n")
+        if line.startswith("data: ")
+    ]
+
+
+def statuses(events: list[dict]) -> list[str]:
+    return [event.get("status", "error") for event in events]
+
+
+class TestGenerate:
+    """Test suite for POST /generate/stream."""
+
+    def test_streams_every_phase(self, app):
+        """Test that the explanation, mapping and diagram are streamed, with preflight first."""
+        fake, client = app
+
+        events = stream(client)
+
+        assert statuses(events)[:2] == ["started", "preflight"]
+        assert events[1]["strategy"] == "tree"
+        assert [e["chunk"] for e in events if e.get("status") == "explanation_chunk"] == ["A web ", "app."]
+        complete = events[-1]
+        assert complete["status"] == "complete"
+        assert complete["explanation"] == "A web app."
+        assert complete["mapping"] == MAPPING
+        assert complete["model_used"] == generate.DEFAULT_MODELS["openai"]
+        assert "cached" not in complete
+        assert len(fake.calls) == 3
+        assert fake.calls[0]["data"]["file_tree"] == "README.md\nsrc\nsrc/main.py"
+
+    def test_condensed_event(self, app, monkeypatch):
+        """Test that a prompt over the budget is condensed and reported."""
+        fake, client = app
+        monkeypatch.setattr(generate, "get_prompt_budget", lambda *args: 5)
+
+        events = stream(client)
+
+        condensed = next(e for e in events if e.get("status") == "condensed")
+        assert condensed["budget"] == 5
+        assert condensed["tokens"] < condensed["original_tokens"]
+        assert events[-1]["status"] == "complete"
+        assert fake.calls[0]["data"]["file_tree"] != "README.md\nsrc\nsrc/main.py"
+
+    def test_click_links_follow_path_and_ref(self, app, monkeypatch):
+        """Test that click paths relative to a scoped subdirectory link to the requested ref."""
+        fake, client = app
+        routes = {**SCOPED_ROUTES, "/repos/octo/demo/commits/v1.0": (200, SHA)}
+        github_service._http_client._transport = httpx.MockTransport(github_api(routes))
+
+        events = stream(client, path="src", ref="v1.0")
+
+        assert events[-1]["status"] == "complete"
+        assert 'click Main "https://github.com/octo/demo/blob/v1.0/src/main.py"' in events[-1]["diagram"]
+        assert fake.calls[0]["data"]["file_tree"] == "src\nsrc/main.py"
+
+    def test_invalid_ref_is_reported(self, app):
+        """Test that an invalid ref ends the stream with an error before any model call."""
+        fake, client = app
+
+        events = stream(client, ref="../../../../user")
+
+        assert "Invalid ref" in events[-1]["error"]
+        assert fake.calls == []
+
+    def test_artifact_replay_and_regenerate(self, app):
+        """Test that an identical request replays the stored diagram unless regenerate is set."""
+        fake, client = app
+
+        first = stream(client)[-1]
+        replayed = stream(client)
+        assert len(fake.calls) == 3
+        regenerated = stream(client, regenerate=True)[-1]
+        other = stream(client, instructions="Zoom in on the API")[-1]
+
+        assert statuses(replayed) == ["started", "preflight", "complete"]
+        assert replayed[-1]["cached"] is True
+        assert replayed[-1]["diagram"] == first["diagram"]
+        assert "cached" not in regenerated
+        assert "cached" not in other
+        assert len(fake.calls) == 9
@@ -0,0 +1,141 @@
+"""
+Tests for the shared GitHub App installation-token manager.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from app.core.cache import MemoryCacheBackend, set_cache_backend
+from app.services.github_auth import InstallationTokenManager
+
+
+@pytest.fixture(scope="module")
+def private_key():
+    """PEM-encoded RSA key for signing app JWTs."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+@pytest.fixture
+def cache():
+    backend = MemoryCacheBackend()
+    set_cache_backend(backend)
+    yield backend
+    set_cache_backend(None)
+
+
+def token_api(calls, lifetime):
+    """Mock installation-token endpoint issuing tokens valid for `lifetime` seconds."""
+
+    def handler(request):
+        calls.append(request)
+        expires_at = datetime.fromtimestamp(time.time() + lifetime, tz=timezone.utc)
+        return httpx.Response(
+            201,
+            json={
+                "token": f"ghs_{len(calls)}",
+                "expires_at": expires_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            },
+        )
+
+    return httpx.AsyncClient(
+        base_url="https://api.github.com", transport=httpx.MockTransport(handler)
+    )
+
+
+class TestInstallationTokenManager:
+    """Test suite for InstallationTokenManager."""
+
+    def test_concurrent_requests_share_one_token(self, private_key, cache):
+        """Test that concurrent callers trigger a single token request."""
+        calls = []
+
+        async def main():
+            client = token_api(calls, lifetime=3600)
+            manager = InstallationTokenManager("123", private_key, "42")
+            tokens = await asyncio.gather(*(manager.get_token(client) for _ in range(10)))
+            return manager, tokens
+
+        manager, tokens = asyncio.run(main())
+
+        assert set(tokens) == {"ghs_1"}
+        assert len(calls) == 1
+        assert calls[0].url.path == "/app/installations/42/access_tokens"
+        claims = jwt.decode(
+            calls[0].headers["Authorization"].removeprefix("Bearer "),
+            options={"verify_signature": False},
+        )
+        assert claims["iss"] == "123"
+        # The real expiry from GitHub is used, not an assumed hour
+        assert abs(manager.expires_at - (time.time() + 3600)) < 5
+
+    def test_workers_share_tokens_through_the_cache(self, private_key, cache):
+        """Test that a second worker adopts the token the first one stored."""
+        calls = []
+
+        async def main():
+            client = token_api(calls, lifetime=3600)
+            first = InstallationTokenManager("123", private_key, "42")
+            second = InstallationTokenManager("123", private_key, "42")
+            return await first.get_token(client), await second.get_token(client)
+
+        assert asyncio.run(main()) == ("ghs_1", "ghs_1")
+        assert len(calls) == 1
+
+    def test_keeps_another_workers_lease(self, private_key, cache, monkeypatch):
+        """Test that a worker which gave up waiting does not release the lease it never held."""
+        calls = []
+        sleep = asyncio.sleep
+        monkeypatch.setattr(asyncio, "sleep", lambda delay: sleep(0))
+
+        async def main():
+            client = token_api(calls, lifetime=3600)
+            manager = InstallationTokenManager("123", private_key, "42")
+            lease_key = manager.cache_key + ":lease"
+            await cache.add(lease_key, "other worker", ttl=30)
+            token = await manager.get_token(client)
+            return token, await cache.get(lease_key)
+
+        assert asyncio.run(main()) == ("ghs_1", "other worker")
+
+    def test_refreshes_ahead_of_expiry(self, private_key, cache):
+        """Test that a token near expiry is served while a new one is fetched."""
+        calls = []
+
+        async def main():
+            client = token_api(calls, lifetime=200)
+            manager = InstallationTokenManager("123", private_key, "42", refresh_margin=300)
+            first = await manager.get_token(client)
+            second = await manager.get_token(client)
+            await manager._refresh_task
+            return first, second, manager.token
+
+        first, second, latest = asyncio.run(main())
+
+        assert (first, second) == ("ghs_1", "ghs_1")
+        assert latest == "ghs_2"
+        assert len(calls) == 2
+
+    def test_failed_request_raises(self, private_key, cache):
+        """Test that GitHub errors are surfaced instead of caching a bad token."""
+
+        async def main():
+            client = httpx.AsyncClient(
+                base_url="https://api.github.com",
+                transport=httpx.MockTransport(lambda request: httpx.Response(401)),
+            )
+            manager = InstallationTokenManager("123", private_key, "42")
+            with pytest.raises(Exception, match="installation token: 401"):
+                await manager.get_token(client)
+            assert manager.token is None
+
+        asyncio.run(main())
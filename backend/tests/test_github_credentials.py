@@ -0,0 +1,156 @@
+"""
+Tests for the rate-limit-aware GitHub credential pool.
+"""
+
+import asyncio
+import time
+import httpx
+import pytest
+from app.services.github_credentials import GRAPHQL, CredentialPool, GitHubCredential
+from app.services.github_response_cache import GitHubResponseCache
+from app.services.github_service import GitHubService
+
+
+def rate_limited_api(budgets: dict, calls: list):
+    """Mock API where each token has `budgets[token]` requests left."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        token = request.headers["Authorization"].removeprefix("token ")
+        calls.append(token)
+        budgets[token] -= 1
+        headers = {
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": str(max(budgets[token], 0)),
+            "X-RateLimit-Reset": str(int(time.time()) + 3600),
+            "X-RateLimit-Resource": "core",
+        }
+        if budgets[token] < 0:
+            return httpx.Response(403, json={"message": "API rate limit exceeded"}, headers=headers)
+        return httpx.Response(200, json={"default_branch": "main"}, headers=headers)
+
+    return handler
+
+
+def make_pool_service(handler, tokens, max_wait=60):
+    client = httpx.AsyncClient(
+        base_url="https://api.github.com", transport=httpx.MockTransport(handler)
+    )
+    pool = CredentialPool([GitHubCredential("pat", token=t) for t in tokens], max_wait)
+    return GitHubService(client=client, cache=GitHubResponseCache(), pool=pool), pool
+
+
+class TestCredentialPool:
+    """Test suite for CredentialPool scheduling."""
+
+    def test_prefers_credential_with_most_headroom(self):
+        """Test that requests move to the credential with the most quota left."""
+        calls = []
+        budgets = {"a": 3, "b": 100}
+        service, _ = make_pool_service(rate_limited_api(budgets, calls), ["a", "b"])
+
+        async def main():
+            for _ in range(4):
+                await service.get_default_branch("octo", "demo")
+
+        asyncio.run(main())
+
+        # The first request learns the budgets; afterwards "b" has more headroom
+        assert calls.count("b") >= 3
+
+    def test_rate_limited_request_is_retried_on_another_credential(self):
+        """Test that a 403 rate limit response is retried transparently."""
+        calls = []
+        budgets = {"a": 0, "b": 10}
+        service, pool = make_pool_service(rate_limited_api(budgets, calls), ["a", "b"])
+
+        branch = asyncio.run(service.get_default_branch("octo", "demo"))
+
+        assert branch == "main"
+        assert calls == ["a", "b"]
+        assert pool.rate_limited == 1
+
+    def test_exhausted_pool_waits_for_reset(self):
+        """Test that requests queue until the earliest reset."""
+        pool = CredentialPool([GitHubCredential("pat", token="a")], max_wait=1)
+        pool.credentials[0].budget().remaining = 0
+        pool.credentials[0].budget().reset_at = time.time() + 0.2
+
+        async def main():
+            start = time.perf_counter()
+            credential = await pool.acquire()
+            return credential, time.perf_counter() - start
+
+        credential, waited = asyncio.run(main())
+
+        assert credential.token == "a"
+        assert waited >= 0.15
+        assert pool.waits == 1
+
+    def test_exhausted_pool_fails_clearly(self):
+        """Test that a reset beyond the maximum wait raises a readable ValueError."""
+        pool = CredentialPool([GitHubCredential("pat", token="a")], max_wait=1)
+        pool.credentials[0].budget().remaining = 0
+        pool.credentials[0].budget().reset_at = time.time() + 600
+
+        with pytest.raises(ValueError, match="rate limit exceeded.*10 minutes"):
+            asyncio.run(pool.acquire())
+
+    def test_graphql_rate_limit_is_retried_on_another_credential(self):
+        """Test that a RATE_LIMITED GraphQL error only exhausts that credential's GraphQL budget."""
+        calls = []
+        reset = int(time.time()) + 900
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            token = request.headers["Authorization"].removeprefix("token ")
+            calls.append(token)
+            headers = {
+                "X-RateLimit-Limit": "5000",
+                "X-RateLimit-Remaining": "0" if token == "a" else "4999",
+                "X-RateLimit-Reset": str(reset),
+                "X-RateLimit-Resource": "graphql",
+            }
+            if token == "a":
+                errors = [{"type": "RATE_LIMITED", "message": "API rate limit exceeded"}]
+                return httpx.Response(200, json={"errors": errors}, headers=headers)
+            return httpx.Response(200, json={"data": {"viewer": {"login": "b"}}}, headers=headers)
+
+        service, pool = make_pool_service(handler, ["a", "b"])
+        # "a" has the most core quota left, which must not matter for GraphQL
+        pool.credentials[1].budget().remaining = 10
+        pool.credentials[1].budget().reset_at = time.time() + 600
+
+        payload = asyncio.run(service._post_graphql("{ viewer { login } }", {}))
+
+        assert payload == {"data": {"viewer": {"login": "b"}}}
+        assert calls == ["a", "b"]
+        assert pool.rate_limited == 1
+        a, b = pool.credentials
+        assert a.budget(GRAPHQL).headroom(time.time()) == 0
+        assert a.budget(GRAPHQL).reset_at == reset
+        assert a.budget().remaining is None  # core budget untouched
+        assert b.budget(GRAPHQL).remaining == 4999
+
+    def test_resources_are_scheduled_separately(self):
+        """Test that an exhausted core budget does not hold back GraphQL requests, and vice versa."""
+        pool = CredentialPool([GitHubCredential("pat", token="a")], max_wait=1)
+        pool.credentials[0].budget().remaining = 0
+        pool.credentials[0].budget().reset_at = time.time() + 600
+
+        credential = asyncio.run(pool.acquire(GRAPHQL))
+
+        assert credential.token == "a"
+        assert credential.budget(GRAPHQL).remaining == 4999
+        with pytest.raises(ValueError, match="rate limit exceeded"):
+            asyncio.run(pool.acquire())
+        anonymous = CredentialPool([GitHubCredential("anonymous", limit=60)])
+        with pytest.raises(ValueError, match="graphql"):
+            asyncio.run(anonymous.acquire(GRAPHQL))
+
+    def test_scope_identifies_the_pool(self):
+        """Test that single-credential pools keep the credential's own scope."""
+        single = CredentialPool([GitHubCredential("pat", token="a")])
+        multi = CredentialPool([GitHubCredential("pat", token=t) for t in ("a", "b")])
+
+        assert single.scope.startswith("pat:")
+        assert multi.scope.startswith("pool:")
+        assert multi.scope != single.scope
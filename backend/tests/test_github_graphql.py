@@ -0,0 +1,160 @@
+"""
+Tests for fetching repository metadata and README with one GraphQL query,
+run against a stub GraphQL server.
+"""
+
+import asyncio
+import json
+import httpx
+import pytest
+from app.services.github_credentials import CredentialPool, GitHubCredential
+from app.services.github_response_cache import GitHubResponseCache
+from app.services.github_service import GitHubService
+
+SHA = "3f786850e387550fdab836ed7e6dc881de23001b"
+OLD_SHA = "a" * 40
+
+
+def graphql_server(repositories: dict, calls: list):
+    """
+    Stub GitHub API: answers repository queries from a
+    {"owner/name": {"files": {rev: {path: text}}, ...}} mapping, and serves
+    the tree and README endpoints over REST.
+    """
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if request.url.path != "/graphql":
+            return rest(request)
+
+        body = json.loads(request.content)
+        variables = body["variables"]
+        repository = repositories.get(f"{variables['owner']}/{variables['name']}")
+        if repository is None:
+            return httpx.Response(200, json={
+                "data": {"repository": None},
+                "errors": [{"type": "NOT_FOUND", "message": "Could not resolve to a Repository"}],
+            })
+
+        data = {
+            "defaultBranchRef": repository.get("branch"),
+            "visibility": "PUBLIC",
+            "diskUsage": repository.get("size", 120),
+            "isArchived": False,
+            "isFork": False,
+            "parent": None,
+        }
+        # Each aliased object(expression: "<rev>:<path>") lookup, as declared
+        for name, value in variables.items():
+            if name.startswith("readme"):
+                revision, path = value.split(":", 1)
+                text = repository["files"].get(revision, {}).get(path)
+                data[name] = None if text is None else {"text": text, "isBinary": False}
+        return httpx.Response(200, json={"data": {"repository": data}})
+
+    def rest(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.startswith("/repos/octo/demo/git/trees/"):
+            return httpx.Response(200, json={"truncated": False, "tree": [
+                {"path": "docs", "type": "tree", "sha": "d" * 40},
+                {"path": "docs/README.md", "type": "blob"},
+                {"path": "src/main.py", "type": "blob"},
+            ]})
+        if path == "/repos/octo/demo/readme":
+            return httpx.Response(200, text="Plain readme")
+        if path == "/repos/octo/demo":
+            return httpx.Response(200, json={"default_branch": "trunk", "size": 120})
+        if path == "/repos/octo/demo/commits/HEAD":
+            return httpx.Response(200, text=SHA)
+        return httpx.Response(404, json={"message": "Not Found"})
+
+    return handler
+
+
+def make_service(handler, pool: CredentialPool | None = None) -> GitHubService:
+    client = httpx.AsyncClient(
+        base_url="https://api.github.com", transport=httpx.MockTransport(handler)
+    )
+    return GitHubService(
+        pat="test-token", client=client, cache=GitHubResponseCache(), pool=pool, metadata_api="graphql"
+    )
+
+
+def demo(files: dict) -> dict:
+    return {"octo/demo": {"branch": {"name": "trunk", "target": {"oid": SHA}}, "files": files}}
+
+
+class TestGitHubGraphQL:
+    """Test suite for GraphQL metadata fetching."""
+
+    def test_one_round_trip(self):
+        """Test that the SHA, metadata and README come from one query, then the tree."""
+        calls = []
+        service = make_service(graphql_server(demo({"HEAD": {"README.md": "# Demo"}}), calls))
+
+        data = asyncio.run(service.fetch_repository("octo", "demo"))
+
+        assert data.sha == SHA
+        assert data.default_branch == "trunk"
+        assert data.readme == "# Demo"
+        assert data.preflight["size_kb"] == 120
+        assert [c.url.path for c in calls] == ["/graphql", f"/repos/octo/demo/git/trees/{SHA}"]
+        assert calls[0].method == "POST"
+        assert calls[0].headers["Authorization"] == "token test-token"
+
+    def test_readme_candidates(self):
+        """Test that README names are tried in order at the requested commit."""
+        calls = []
+        files = {OLD_SHA: {"readme.md": "lower", "README.rst": "rst"}, "HEAD": {"README.md": "new"}}
+        service = make_service(graphql_server(demo(files), calls))
+
+        data = asyncio.run(service.fetch_repository("octo", "demo", sha=OLD_SHA))
+
+        assert data.sha == OLD_SHA
+        assert data.readme == "lower"
+
+    def test_subdirectory_readme_is_preferred(self):
+        """Test that a scoped request reads the subdirectory's README first."""
+        calls = []
+        files = {"HEAD": {"README.md": "# Root", "docs/README.md": "# Docs"}}
+        service = make_service(graphql_server(demo(files), calls))
+
+        data = asyncio.run(service.fetch_repository("octo", "demo", path="docs"))
+
+        assert data.readme == "# Docs"
+
+    def test_other_readme_names_fall_back_to_rest(self):
+        """Test that a README the query does not try is fetched from the REST endpoint."""
+        calls = []
+        service = make_service(graphql_server(demo({"HEAD": {"README.txt": "Plain readme"}}), calls))
+
+        data = asyncio.run(service.fetch_repository("octo", "demo"))
+
+        assert data.readme == "Plain readme"
+        assert "/repos/octo/demo/readme" in [c.url.path for c in calls]
+
+    def test_missing_and_empty_repositories(self):
+        """Test that missing and empty repositories raise ValueError."""
+        repositories = {"octo/empty": {"branch": None, "files": {}}}
+        service = make_service(graphql_server(repositories, []))
+
+        with pytest.raises(ValueError, match="not found"):
+            asyncio.run(service.fetch_repository("octo", "missing"))
+        with pytest.raises(ValueError, match="empty"):
+            asyncio.run(service.fetch_repository("octo", "empty"))
+
+    def test_anonymous_requests_use_rest(self):
+        """Test that GraphQL, which requires a token, is skipped without credentials."""
+        calls = []
+        pool = CredentialPool([GitHubCredential("anonymous", limit=60)])
+        service = make_service(graphql_server(demo({}), calls), pool=pool)
+
+        data = asyncio.run(service.fetch_repository("octo", "demo"))
+
+        assert data.readme == "Plain readme"
+        assert "/graphql" not in [c.url.path for c in calls]
+
+    def test_unknown_metadata_api(self):
+        """Test that an unknown GITHUB_METADATA_API value is rejected."""
+        with pytest.raises(ValueError, match="GITHUB_METADATA_API"):
+            GitHubService(pat="test-token", metadata_api="soap")
@@ -0,0 +1,69 @@
+"""
+Tests for choosing a fetch strategy from repository metadata.
+"""
+
+import asyncio
+import pytest
+from app.services import github_preflight
+from app.services.github_preflight import plan_fetch
+from tests.test_github_service import SHA, github_api, make_service
+
+
+class TestPreflight:
+    """Test suite for plan_fetch and the strategies it picks."""
+
+    def test_strategy_by_size(self):
+        """Test that larger repositories get cheaper, coarser strategies."""
+        assert plan_fetch({"size": 500}).strategy == "tree"
+        assert plan_fetch({"size": 2 * 1024 * 1024}).strategy == "walk"
+        assert plan_fetch({"size": 8 * 1024 * 1024}).strategy == "condensed"
+        assert plan_fetch({}).strategy == "tree"
+
+    def test_tarball_modes(self):
+        """Test that archives are used when configured, or for small repositories in auto mode."""
+        assert plan_fetch({"size": 500}, "auto").strategy == "tarball"
+        assert plan_fetch({"size": 50 * 1024}, "auto").strategy == "tree"
+        assert plan_fetch({"size": 50 * 1024}, "tarball").strategy == "tarball"
+        assert plan_fetch({"size": 500}, "tarball", path="src").strategy == "tree"
+
+    def test_scoped_requests_are_not_condensed(self):
+        """Test that a subdirectory of a huge repository is walked, not condensed."""
+        assert plan_fetch({"size": 8 * 1024 * 1024}, path="src").strategy == "walk"
+
+    def test_rejects_oversized_repositories(self, monkeypatch):
+        """Test that repositories over the size cap fail before any tree is fetched."""
+        monkeypatch.setattr(github_preflight, "GITHUB_PREFLIGHT_MAX_SIZE_KB", 1024)
+
+        with pytest.raises(ValueError, match="too large"):
+            plan_fetch({"size": 4096})
+
+    def test_notes(self):
+        """Test that archived repositories and forks are reported."""
+        plan = plan_fetch({"size": 10, "archived": True, "fork": True, "parent": {"full_name": "up/demo"}})
+
+        assert plan.notes == ["Repository is archived.", "Repository is a fork of up/demo."]
+
+    def test_condensed_lists_top_levels_only(self):
+        """Test that the condensed strategy lists two levels, one request per directory."""
+        src, lib = "b" * 40, "c" * 40
+        calls = []
+        routes = {
+            "/repos/octo/huge": (200, {"default_branch": "main", "size": 8 * 1024 * 1024}),
+            "/repos/octo/huge/readme": (200, "# Huge"),
+            f"/repos/octo/huge/git/trees/{SHA}": (200, {"sha": SHA, "tree": [
+                {"path": "README.md", "type": "blob", "sha": "1" * 40},
+                {"path": "src", "type": "tree", "sha": src},
+            ]}),
+            f"/repos/octo/huge/git/trees/{src}": (200, {"sha": src, "tree": [
+                {"path": "lib", "type": "tree", "sha": lib},
+                {"path": "main.py", "type": "blob", "sha": "2" * 40},
+            ]}),
+        }
+
+        service = make_service(github_api(routes, calls))
+        data = asyncio.run(service.fetch_repository("octo", "huge", sha=SHA))
+
+        assert data.file_tree.split("\n") == ["README.md", "src", "src/lib", "src/main.py"]
+        assert data.preflight["strategy"] == "condensed"
+        assert not any(lib in c.url.path for c in calls)
+        assert all(c.url.params.get("recursive") is None for c in calls)
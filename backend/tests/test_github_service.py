@@ -0,0 +1,332 @@
+"""
+Tests for the async GitHub client, run against a mocked GitHub API.
+"""
+
+import asyncio
+import httpx
+import pytest
+from app.services import github_service
+from app.services.github_service import GitHubService
+from app.services.github_response_cache import GitHubResponseCache
+
+
+def make_service(handler, pat="test-token", cache=None):
+    """Build a GitHubService whose HTTP client is served by `handler`."""
+    client = httpx.AsyncClient(
+        base_url="https://api.github.com", transport=httpx.MockTransport(handler)
+    )
+    if cache is None:
+        cache = GitHubResponseCache()
+    return GitHubService(pat=pat, client=client, cache=cache)
+
+
+def github_api(routes: dict, calls: list | None = None):
+    """Mock handler that answers from a {path: (status, json_or_text)} mapping."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if calls is not None:
+            calls.append(request)
+        status, body = routes.get(request.url.path, (404, {"message": "Not Found"}))
+        if isinstance(body, str):
+            return httpx.Response(status, text=body)
+        return httpx.Response(status, json=body)
+
+    return handler
+
+
+SHA = "3f786850e387550fdab836ed7e6dc881de23001b"
+
+TREE = {
+    "tree": [
+        {"path": "src", "type": "tree"},
+        {"path": "src/main.py", "type": "blob"},
+        {"path": "src/logo.png", "type": "blob"},
+        {"path": "node_modules/react/index.js", "type": "blob"},
+    ]
+}
+
+REPO_ROUTES = {
+    "/repos/octo/demo": (200, {"default_branch": "trunk", "private": False, "visibility": "public"}),
+    "/repos/octo/demo/commits/HEAD": (200, SHA),
+    f"/repos/octo/demo/git/trees/{SHA}": (200, TREE),
+    "/repos/octo/demo/git/trees/trunk": (
+        200,
+        TREE,
+    ),
+    "/repos/octo/demo/readme": (200, "# Demo"),
+}
+
+
+class TestGitHubService:
+    """Test suite for the async GitHub service."""
+
+    def test_default_branch(self):
+        """Test reading the default branch from repository metadata."""
+        service = make_service(github_api(REPO_ROUTES))
+
+        assert asyncio.run(service.get_default_branch("octo", "demo")) == "trunk"
+
+    def test_head_sha_of_ref(self):
+        """Test that refs stay inside the commits URL and only a SHA is accepted back."""
+        calls = []
+        routes = {
+            "/repos/octo/demo/commits/feature/login": (200, SHA),
+            "/repos/octo/demo/commits/broken": (200, '{"login": "octo"}'),
+        }
+        service = make_service(github_api(routes, calls))
+
+        assert asyncio.run(service.get_head_sha("octo", "demo", "feature/login")) == SHA
+        with pytest.raises(Exception, match="unexpected response"):
+            asyncio.run(service.get_head_sha("octo", "demo", "broken"))
+        with pytest.raises(ValueError, match="Invalid ref"):
+            asyncio.run(service.get_head_sha("octo", "demo", "../../../../user"))
+        assert [c.url.path for c in calls] == [
+            "/repos/octo/demo/commits/feature/login",
+            "/repos/octo/demo/commits/broken",
+        ]
+
+    def test_file_tree_is_filtered(self):
+        """Test that excluded paths are dropped from the file tree."""
+        service = make_service(github_api(REPO_ROUTES))
+
+        tree = asyncio.run(service.get_github_file_paths_as_list("octo", "demo"))
+
+        assert tree.split("\n") == ["src", "src/main.py"]
+
+    def test_readme(self):
+        """Test fetching README contents."""
+        service = make_service(github_api(REPO_ROUTES))
+
+        assert asyncio.run(service.get_github_readme("octo", "demo")) == "# Demo"
+
+    def test_missing_repository(self):
+        """Test that a missing repository raises ValueError."""
+        service = make_service(github_api({}))
+
+        with pytest.raises(ValueError):
+            asyncio.run(service.get_github_readme("octo", "missing"))
+
+    def test_sends_pat(self):
+        """Test that the PAT is sent as the Authorization header."""
+        calls = []
+        service = make_service(github_api(REPO_ROUTES, calls))
+
+        asyncio.run(service.get_default_branch("octo", "demo"))
+
+        assert calls[0].headers["Authorization"] == "token test-token"
+
+    def test_fetch_repository_plan(self):
+        """Test that a cold fetch resolves the HEAD SHA, then fetches the rest by SHA."""
+        calls = []
+        service = make_service(github_api(REPO_ROUTES, calls))
+
+        data = asyncio.run(service.fetch_repository("octo", "demo"))
+
+        assert data.default_branch == "trunk"
+        assert data.sha == SHA
+        assert data.file_tree == "src\nsrc/main.py"
+        assert data.readme == "# Demo"
+        assert len(calls) == 4
+        assert calls[0].headers["Accept"] == "application/vnd.github.sha"
+        readme_call = next(c for c in calls if c.url.path.endswith("/readme"))
+        assert readme_call.headers["Accept"] == "application/vnd.github.raw"
+        assert readme_call.url.params["ref"] == SHA
+
+    def test_empty_repository(self):
+        """Test that an empty repository (409 on HEAD) raises ValueError."""
+        service = make_service(github_api({"/repos/octo/empty/commits/HEAD": (409, {})}))
+
+        with pytest.raises(ValueError, match="empty"):
+            asyncio.run(service.fetch_repository("octo", "empty"))
+
+    def test_etag_revalidation(self):
+        """Test that a 304 Not Modified is served from the response cache."""
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304, headers={"ETag": '"v1"'})
+            return httpx.Response(
+                200, json={"default_branch": "trunk"}, headers={"ETag": '"v1"'}
+            )
+
+        cache = GitHubResponseCache()
+        service = make_service(handler, cache=cache)
+
+        async def fetch_twice():
+            first = await service.get_default_branch("octo", "demo")
+            second = await service.get_default_branch("octo", "demo")
+            return first, second
+
+        assert asyncio.run(fetch_twice()) == ("trunk", "trunk")
+        assert "If-None-Match" not in calls[0].headers
+        assert calls[1].headers["If-None-Match"] == '"v1"'
+        assert cache.hits == 1
+
+    def test_etag_cache_is_scoped_by_credential(self):
+        """Test that cached validators are not reused across credentials."""
+        calls = []
+        cache = GitHubResponseCache()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(200, json={}, headers={"ETag": '"v1"'})
+
+        asyncio.run(make_service(handler, pat="a", cache=cache).get_default_branch("octo", "demo"))
+        asyncio.run(make_service(handler, pat="b", cache=cache).get_default_branch("octo", "demo"))
+
+        assert "If-None-Match" not in calls[1].headers
+
+    def test_truncated_tree_is_walked_by_subtree(self):
+        """Test that a truncated tree is rebuilt from subtrees, skipping excluded ones."""
+        root, src, deps = "a" * 40, "b" * 40, "c" * 40
+        calls = []
+        routes = {
+            "/repos/octo/big/commits/HEAD": (200, root),
+            "/repos/octo/big": (200, {"default_branch": "main"}),
+            "/repos/octo/big/readme": (200, "# Big"),
+        }
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            path = request.url.path
+            recursive = request.url.params.get("recursive") == "1"
+            if path == f"/repos/octo/big/git/trees/{root}":
+                if recursive:
+                    return httpx.Response(200, json={"sha": root, "tree": [], "truncated": True})
+                return httpx.Response(200, json={"sha": root, "truncated": False, "tree": [
+                    {"path": "README.md", "type": "blob", "sha": "1" * 40},
+                    {"path": "node_modules", "type": "tree", "sha": deps},
+                    {"path": "src", "type": "tree", "sha": src},
+                ]})
+            if path == f"/repos/octo/big/git/trees/{src}" and recursive:
+                return httpx.Response(200, json={"sha": src, "truncated": False, "tree": [
+                    {"path": "lib", "type": "tree", "sha": "2" * 40},
+                    {"path": "lib/b.py", "type": "blob", "sha": "3" * 40},
+                    {"path": "a.py", "type": "blob", "sha": "4" * 40},
+                ]})
+            return github_api(routes)(request)
+
+        service = make_service(handler)
+        data = asyncio.run(service.fetch_repository("octo", "big"))
+
+        assert data.file_tree.split("\n") == ["README.md", "src", "src/a.py", "src/lib", "src/lib/b.py"]
+        assert not any(deps in c.url.path for c in calls)
+
+    def test_tree_walk_request_cap(self, monkeypatch, capsys):
+        """Test that directories past GITHUB_TREE_MAX_REQUESTS are listed and reported as unexpanded."""
+        monkeypatch.setattr(github_service, "GITHUB_TREE_MAX_REQUESTS", 3)
+        root = "a" * 40
+        dirs = [(f"pkg{i}", str(i) * 40) for i in range(5)]
+        routes = {
+            "/repos/octo/big/commits/HEAD": (200, root),
+            "/repos/octo/big": (200, {"default_branch": "main"}),
+            "/repos/octo/big/readme": (200, "# Big"),
+        }
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            path = request.url.path
+            recursive = request.url.params.get("recursive") == "1"
+            if path == f"/repos/octo/big/git/trees/{root}":
+                if recursive:
+                    return httpx.Response(200, json={"sha": root, "tree": [], "truncated": True})
+                return httpx.Response(200, json={"sha": root, "truncated": False, "tree": [
+                    {"path": name, "type": "tree", "sha": sha} for name, sha in dirs
+                ]})
+            for name, sha in dirs:
+                if path == f"/repos/octo/big/git/trees/{sha}":
+                    return httpx.Response(200, json={"sha": sha, "truncated": False, "tree": [
+                        {"path": "main.py", "type": "blob", "sha": "f" * 40},
+                    ]})
+            return github_api(routes)(request)
+
+        data = asyncio.run(make_service(handler).fetch_repository("octo", "big"))
+
+        # The root listing and two subtrees fit in the cap; three directories stay unexpanded
+        assert data.file_tree.split("\n") == [
+            "pkg0", "pkg0/main.py", "pkg1", "pkg1/main.py", "pkg2", "pkg3", "pkg4",
+        ]
+        assert "3 subtrees left unexpanded" in capsys.readouterr().out
+
+    def test_scoped_to_subdirectory(self):
+        """Test that a path-scoped fetch lists only the subtree, by its SHA."""
+        services, payments = "d" * 40, "e" * 40
+        calls = []
+        routes = {
+            "/repos/octo/mono": (200, {"default_branch": "main"}),
+            f"/repos/octo/mono/git/trees/{SHA}": (200, {"sha": SHA, "truncated": False, "tree": [
+                {"path": "README.md", "type": "blob", "sha": "1" * 40},
+                {"path": "services", "type": "tree", "sha": services},
+            ]}),
+            f"/repos/octo/mono/git/trees/{services}": (200, {"sha": services, "truncated": False, "tree": [
+                {"path": "payments", "type": "tree", "sha": payments},
+            ]}),
+            f"/repos/octo/mono/git/trees/{payments}": (200, {"sha": payments, "truncated": False, "tree": [
+                {"path": "api", "type": "tree", "sha": "2" * 40},
+                {"path": "api/handler.go", "type": "blob", "sha": "3" * 40},
+                {"path": "logo.png", "type": "blob", "sha": "4" * 40},
+            ]}),
+            "/repos/octo/mono/readme/services/payments": (200, "# Payments"),
+        }
+
+        service = make_service(github_api(routes, calls))
+        data = asyncio.run(service.fetch_repository("octo", "mono", sha=SHA, path="services/payments"))
+
+        assert data.file_tree.split("\n") == [
+            "services", "services/payments", "services/payments/api", "services/payments/api/handler.go"
+        ]
+        assert data.readme == "# Payments"
+        assert data.path == "services/payments"
+        assert [c.url.params.get("recursive") for c in calls if "/git/trees/" in c.url.path] == [
+            None, None, "1"
+        ]
+
+        with pytest.raises(ValueError, match="Path not found"):
+            asyncio.run(service.fetch_repository("octo", "mono", sha=SHA, path="services/billing"))
+
+    def test_tarball_ingestion(self):
+        """Test that tarball mode builds the tree, README and manifests from one archive."""
+        from tests.test_tar_stream import build_tar
+
+        archive = build_tar(
+            {
+                f"octo-demo-{SHA[:7]}/": None,
+                f"octo-demo-{SHA[:7]}/README.md": b"# Demo",
+                f"octo-demo-{SHA[:7]}/docs/README.md": b"# Docs",
+                f"octo-demo-{SHA[:7]}/src/main.py": b"print()",
+                f"octo-demo-{SHA[:7]}/src/logo.png": b"\x89PNG",
+                f"octo-demo-{SHA[:7]}/web/package.json": b'{"name": "web"}',
+                f"octo-demo-{SHA[:7]}/web/node_modules/react/package.json": b"{}",
+            }
+        )
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            if request.url.path == f"/repos/octo/demo/tarball/{SHA}":
+                return httpx.Response(200, content=archive)
+            return github_api(REPO_ROUTES)(request)
+
+        client = httpx.AsyncClient(
+            base_url="https://api.github.com", transport=httpx.MockTransport(handler)
+        )
+        service = GitHubService(
+            pat="test-token", client=client, cache=GitHubResponseCache(), ingestion_mode="tarball"
+        )
+
+        data = asyncio.run(service.fetch_repository("octo", "demo"))
+
+        assert data.sha == SHA
+        assert data.readme == "# Demo"
+        assert data.file_tree.split("\n") == [
+            "README.md",
+            "docs",
+            "docs/README.md",
+            "src",
+            "src/main.py",
+            "web",
+            "web/package.json",
+        ]
+        assert data.manifests == {"web/package.json": '{"name": "web"}'}
+        assert len(calls) == 3
@@ -0,0 +1,265 @@
+"""
+Tests for the LLM providers, run against mocked provider APIs.
+"""
+
+import asyncio
+import json
+import httpx
+import pytest
+from anthropic import AsyncAnthropic
+from openai import AsyncOpenAI
+from app.services.claude_service import ClaudeService
+from app.services.groq_service import GroqService
+from app.services.llm_clients import ProviderClientRegistry
+from app.services.llm_provider import LLMProvider
+from app.services.ollama_service import OllamaService
+from app.services.openai_service import OpenAIService
+from app.services.openrouter_service import OpenRouterService
+
+
+@pytest.fixture(autouse=True)
+def api_keys(monkeypatch):
+    for name in ("ANTHROPIC_API_KEY", "OPENAI_API_KEY", "GROQ_API_KEY", "OPENROUTER_API_KEY"):
+        monkeypatch.setenv(name, "test-key")
+
+
+def mock_http(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def sse(events: list[tuple[str | None, dict | str]]) -> bytes:
+    """Encodes (event, data) pairs as a server-sent events body."""
+    lines = []
+    for event, data in events:
+        if event:
+            lines.append(f"event: {event}")
+        lines.append(f"data: {data if isinstance(data, str) else json.dumps(data)}")
+        lines.append("")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def openai_chunks(texts: list[str]) -> bytes:
+    events = [
+        (None, {
+            "id": "c1", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o",
+            "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+        })
+        for text in texts
+    ]
+    return sse(events + [(None, "[DONE]")])
+
+
+def anthropic_events(texts: list[str]) -> bytes:
+    message = {
+        "id": "msg_1", "type": "message", "role": "assistant", "model": "claude-3-5-sonnet-latest",
+        "content": [], "stop_reason": None, "stop_sequence": None,
+        "usage": {"input_tokens": 12, "output_tokens": 0},
+    }
+    events = [
+        ("message_start", {"type": "message_start", "message": message}),
+        ("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""},
+        }),
+    ]
+    events += [
+        ("content_block_delta", {
+            "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text},
+        })
+        for text in texts
+    ]
+    events += [
+        ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+        ("message_delta", {
+            "type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+            "usage": {"output_tokens": len(texts)},
+        }),
+        ("message_stop", {"type": "message_stop"}),
+    ]
+    return sse(events)
+
+
+def collect(stream) -> list[str]:
+    async def run():
+        return [chunk async for chunk in stream]
+
+    return asyncio.run(run())
+
+
+class TestLLMProviders:
+    """Test suite for the common LLM provider interface."""
+
+    def test_every_backend_implements_the_interface(self):
+        """Test that every service is an LLMProvider with native stream and complete."""
+        for service in (ClaudeService, OllamaService, GroqService, OpenAIService, OpenRouterService):
+            assert issubclass(service, LLMProvider)
+            assert not getattr(service, "__abstractmethods__", None)
+
+    def test_openai_streams_deltas(self):
+        """Test that OpenAI chunks are yielded as they arrive, with the requested model."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(
+                200, content=openai_chunks(["Hello", ", ", "world"]),
+                headers={"Content-Type": "text/event-stream"},
+            )
+
+        service = OpenAIService(clients=ProviderClientRegistry())
+        service._create_client = lambda key: AsyncOpenAI(api_key="test-key", http_client=mock_http(handler))
+
+        chunks = collect(service.stream("Be brief.", {"readme": "# Demo"}, model="gpt-4o"))
+
+        assert chunks == ["Hello", ", ", "world"]
+        assert requests[0]["stream"] is True
+        assert requests[0]["model"] == "gpt-4o"
+        assert requests[0]["messages"][0] == {"role": "system", "content": "Be brief."}
+
+    def test_claude_streams_text_deltas(self):
+        """Test that Claude text deltas are yielded as they arrive."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert json.loads(request.content)["stream"] is True
+            return httpx.Response(
+                200, content=anthropic_events(["graph", " TD"]),
+                headers={"Content-Type": "text/event-stream"},
+            )
+
+        service = ClaudeService(clients=ProviderClientRegistry())
+        service._create_client = lambda key: AsyncAnthropic(api_key="test-key", http_client=mock_http(handler))
+
+        assert collect(service.stream("Draw.", {"explanation": "x"})) == ["graph", " TD"]
+
+    def test_claude_request_model_and_usage(self):
+        """Test that Claude uses the requested model and records usage from the final message."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(
+                200, content=anthropic_events(["a", "b", "c"]),
+                headers={"Content-Type": "text/event-stream"},
+            )
+
+        service = ClaudeService(clients=ProviderClientRegistry())
+        service._create_client = lambda key: AsyncAnthropic(api_key="test-key", http_client=mock_http(handler))
+
+        collect(service.stream("Draw.", {"explanation": "x"}, model="claude-3-opus-latest"))
+
+        assert requests[0]["model"] == "claude-3-opus-latest"
+        assert service.usage == {"requests": 1, "input_tokens": 12, "output_tokens": 3}
+
+    def test_clients_are_reused_per_provider_and_api_key(self):
+        """Test that each (provider, API key) gets one long-lived client across calls."""
+        clients = ProviderClientRegistry()
+        claude, openai = ClaudeService(clients=clients), OpenAIService(clients=clients)
+
+        assert claude._client("key-a") is claude._client("key-a")
+        assert claude._client("key-a") is not claude._client("key-b")
+        assert claude._client(None) is claude._client(None)
+        assert openai._client("key-a") is not claude._client("key-a")
+        assert clients.stats() == {"clients": 4, "created": 4, "reused": 4, "closed": 0, "in_flight": 0}
+
+    def test_registry_evicts_least_recently_used(self):
+        """Test that the registry keeps at most max_clients clients."""
+        clients = ProviderClientRegistry(max_clients=2)
+        first = clients.get("openai", "a", lambda key: object())
+        clients.get("openai", "b", lambda key: object())
+        clients.get("openai", "a", lambda key: object())
+        clients.get("openai", "c", lambda key: object())
+
+        assert len(clients) == 2
+        assert clients.get("openai", "a", lambda key: object()) is first
+
+    def test_evicted_clients_are_closed_once_idle(self):
+        """Test that an evicted client is closed, but not while a call still holds it."""
+
+        class Client:
+            def __init__(self):
+                self.closed = False
+
+            async def close(self):
+                self.closed = True
+
+        async def run():
+            clients = ProviderClientRegistry(max_clients=1)
+            async with clients.lease("openai", "a", lambda key: Client()) as leased:
+                idle = clients.get("openai", "b", lambda key: Client())
+                clients.get("openai", "c", lambda key: Client())  # Evicts b, which is idle
+                await asyncio.sleep(0)
+                assert idle.closed
+                assert not leased.closed  # Evicted by b, but still in flight
+            assert leased.closed
+
+            current = clients.get("openai", "c", lambda key: Client())
+            await clients.aclose()
+            assert current.closed
+            assert clients.stats()["closed"] == 3
+
+        asyncio.run(run())
+
+    def test_model_is_passed_per_call(self):
+        """Test that one service instance serves any model, without being rebuilt."""
+        models = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            models.append(json.loads(request.content)["model"])
+            return httpx.Response(
+                200, content=openai_chunks(["ok"]), headers={"Content-Type": "text/event-stream"}
+            )
+
+        service = GroqService(clients=ProviderClientRegistry())
+        service._create_client = lambda key: AsyncOpenAI(api_key="test-key", http_client=mock_http(handler))
+
+        collect(service.stream("Be brief.", {}, model="llama-3.3-70b-versatile"))
+        collect(service.stream("Be brief.", {}))
+
+        assert models == ["llama-3.3-70b-versatile", service.default_model]
+
+    def test_ollama_streams_ndjson(self):
+        """Test that Ollama's NDJSON chunks are yielded until the done message."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            lines = [
+                {"message": {"role": "assistant", "content": "graph"}, "done": False},
+                {"message": {"role": "assistant", "content": " TD"}, "done": False},
+                {"message": {"role": "assistant", "content": ""}, "done": True, "eval_count": 2},
+            ]
+            return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines) + "\n")
+
+        client = httpx.AsyncClient(
+            base_url="http://ollama:11434", transport=httpx.MockTransport(handler)
+        )
+        service = OllamaService(client=client)
+
+        assert collect(service.stream("Draw.", {"explanation": "x"}, model="llama3")) == ["graph", " TD"]
+        assert requests[0]["stream"] is True
+        assert requests[0]["model"] == "llama3"
+        assert requests[0]["keep_alive"] == "30m"
+        assert requests[0]["options"]["num_ctx"] == 8192
+
+    def test_ollama_context_size(self):
+        """Test that num_ctx fits the prompt, is capped, and never shrinks for a model."""
+        service = OllamaService()
+
+        assert service._context_size("mistral", 100) == 8192
+        assert service._context_size("mistral", 10_000) == 16384
+        # A shorter later phase keeps the loaded context, so the model is not reloaded
+        assert service._context_size("mistral", 100) == 16384
+        assert service._context_size("llama3", 100) == 8192
+        assert service._context_size("llama3", 1_000_000) == 32768
+
+    def test_ollama_error(self):
+        """Test that an error reported mid-stream is raised."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=json.dumps({"error": "model 'x' not found"}) + "\n")
+
+        client = httpx.AsyncClient(
+            base_url="http://ollama:11434", transport=httpx.MockTransport(handler)
+        )
+
+        with pytest.raises(RuntimeError, match="not found"):
+            collect(OllamaService(client=client).stream("Draw.", {}))
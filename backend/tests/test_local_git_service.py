@@ -0,0 +1,136 @@
+"""
+Tests for reading repositories from local git mirrors.
+"""
+
+import asyncio
+import os
+import subprocess
+import pytest
+from app.core.cache import MemoryCacheBackend, set_cache_backend
+from app.services.local_git_service import LocalGitService
+from app.services.repository_cache import get_cached_github_data
+
+GIT_ENV = {
+    **os.environ,
+    "GIT_AUTHOR_NAME": "Test",
+    "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "Test",
+    "GIT_COMMITTER_EMAIL": "test@example.com",
+}
+
+
+def git(*args, cwd):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, env=GIT_ENV, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.fixture
+def mirrors(tmp_path):
+    """A checkout at work/ and a bare mirror of it at mirrors/octo/demo.git."""
+    work = tmp_path / "work"
+    files = {
+        "README.md": "# Demo",
+        "src/main.py": "print()",
+        "src/logo.png": "png",
+        "web/package.json": '{"name": "web"}',
+        "node_modules/react/package.json": "{}",
+    }
+    for path, content in files.items():
+        (work / path).parent.mkdir(parents=True, exist_ok=True)
+        (work / path).write_text(content)
+    git("init", "-q", "-b", "trunk", cwd=work)
+    git("add", "-A", cwd=work)
+    git("commit", "-q", "-m", "Initial commit", cwd=work)
+
+    (tmp_path / "mirrors" / "octo").mkdir(parents=True)
+    git("clone", "-q", "--mirror", str(work), "mirrors/octo/demo.git", cwd=tmp_path)
+    return tmp_path / "mirrors", git("rev-parse", "HEAD", cwd=work)
+
+
+class TestLocalGitService:
+    """Test suite for LocalGitService."""
+
+    def test_fetch_from_bare_mirror(self, mirrors):
+        """Test reading the tree, README and manifests with git plumbing."""
+        mirrors_dir, sha = mirrors
+        service = LocalGitService(mirrors_dir=str(mirrors_dir))
+
+        data = asyncio.run(service.fetch_repository("Octo", "demo"))
+
+        assert data.sha == sha
+        assert data.default_branch == "trunk"
+        assert data.file_tree.split("\n") == [
+            "README.md",
+            "src",
+            "src/main.py",
+            "web",
+            "web/package.json",
+        ]
+        assert data.readme == "# Demo"
+        assert data.manifests == {"web/package.json": '{"name": "web"}'}
+
+    def test_fetch_subdirectory_at_tag(self, mirrors, tmp_path):
+        """Test that a ref and a path scope the tree, README and manifests."""
+        mirrors_dir, sha = mirrors
+        work = tmp_path / "work"
+        git("tag", "v1.0", cwd=work)
+        (work / "web" / "README.md").write_text("# Web")
+        git("add", "-A", cwd=work)
+        git("commit", "-q", "-m", "Add web README", cwd=work)
+        git("push", "-q", str(mirrors_dir / "octo" / "demo.git"), "trunk", "--tags", cwd=work)
+        service = LocalGitService(mirrors_dir=str(mirrors_dir))
+
+        tagged = asyncio.run(service.get_head_sha("octo", "demo", "v1.0"))
+        old = asyncio.run(service.fetch_repository("octo", "demo", sha=tagged, path="web"))
+        new = asyncio.run(service.fetch_repository("octo", "demo", path="web"))
+
+        assert tagged == sha
+        assert old.file_tree == "web\nweb/package.json"
+        assert old.readme == "# Demo"
+        assert old.manifests == {"web/package.json": '{"name": "web"}'}
+        assert new.file_tree == "web\nweb/README.md\nweb/package.json"
+        assert new.readme == "# Web"
+        with pytest.raises(ValueError, match="Ref not found"):
+            asyncio.run(service.get_head_sha("octo", "demo", "v2.0"))
+        with pytest.raises(ValueError, match="Path not found"):
+            asyncio.run(service.fetch_repository("octo", "demo", path="src/main.py"))
+
+    def test_missing_mirror(self, tmp_path):
+        """Test that a repository without a mirror is reported as not found."""
+        service = LocalGitService(mirrors_dir=str(tmp_path))
+
+        assert not service.has_repository("octo", "demo")
+        with pytest.raises(ValueError, match="not found"):
+            asyncio.run(service.get_head_sha("octo", "demo"))
+
+    def test_names_cannot_escape_mirrors_dir(self, mirrors, tmp_path):
+        """Test that absolute paths, `..` and symlinks out of the mirrors directory never resolve."""
+        mirrors_dir, _ = mirrors
+        (mirrors_dir / "octo" / "outside").symlink_to(tmp_path / "work")
+        service = LocalGitService(mirrors_dir=str(mirrors_dir))
+
+        # Each of these names an existing directory outside mirrors/ once joined
+        assert service.repository_path("/", str(tmp_path / "work")) is None
+        assert service.repository_path(str(tmp_path), "work") is None
+        assert service.repository_path("..", "work") is None
+        assert service.repository_path("octo", "..") is None
+        assert service.repository_path("octo", "outside") is None
+        assert service.repository_path("octo", "demo") is not None
+        with pytest.raises(ValueError, match="not found"):
+            asyncio.run(service.get_head_sha("..", "work"))
+
+    def test_cached_pipeline_with_local_source(self, mirrors):
+        """Test that get_cached_github_data accepts a local source."""
+        mirrors_dir, sha = mirrors
+        set_cache_backend(MemoryCacheBackend())
+        try:
+            data = asyncio.run(
+                get_cached_github_data(
+                    "octo", "demo", source=LocalGitService(mirrors_dir=str(mirrors_dir))
+                )
+            )
+        finally:
+            set_cache_backend(None)
+
+        assert data.sha == sha
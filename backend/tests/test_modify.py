@@ -0,0 +1,129 @@
+"""
+Tests for the diagram modification endpoint.
+"""
+
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers import modify
+from app.services.llm_provider import LLMProvider
+
+
+class FakeProvider(LLMProvider):
+    """Answers after `delay` seconds, recording each call and whether it was cancelled."""
+
+    def __init__(self, response: str = "graph TD\n  A --> B", delay: float = 0.0):
+        self.response = response
+        self.delay = delay
+        self.calls = []
+        self.cancelled = False
+
+    async def complete(self, system_prompt, data, api_key=None, model=None, reasoning_effort="low"):
+        self.calls.append({"data": data, "api_key": api_key, "model": model})
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.response
+
+    async def stream(self, system_prompt, data, api_key=None, model=None, reasoning_effort="low"):
+        yield await self.complete(system_prompt, data, api_key, model)
+
+    def count_tokens(self, prompt):
+        return len(prompt) // 4
+
+
+def modify_body(**overrides) -> dict:
+    body = {
+        "instructions": "Add a database",
+        "current_diagram": "graph TD\n  A",
+        "repo": "demo",
+        "username": "octo",
+        "explanation": "A web app",
+        "service": "openai",
+    }
+    return {**body, **overrides}
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Serves the "openai" service from a fake provider through the modify router."""
+    fake = FakeProvider()
+    monkeypatch.setitem(modify.SERVICES, "openai", fake)
+    app = FastAPI()
+    app.include_router(modify.router)
+    return fake, TestClient(app)
+
+
+class FakeRequest:
+    """Stands in for a request whose client disconnects after `polls` checks."""
+
+    def __init__(self, polls: int):
+        self.polls = polls
+
+    async def is_disconnected(self) -> bool:
+        self.polls -= 1
+        return self.polls < 0
+
+
+class TestModify:
+    """Test suite for POST /modify."""
+
+    def test_modifies_with_requested_model(self, provider):
+        """Test that the diagram comes from the async provider, with the key and model passed."""
+        fake, client = provider
+
+        response = client.post("/modify", json=modify_body(api_key="sk-user", model="gpt-4o"))
+
+        assert response.json() == {
+            "diagram": "graph TD\n  A --> B",
+            "model_used": "gpt-4o",
+            "service_used": "openai",
+        }
+        assert fake.calls[0]["api_key"] == "sk-user"
+        assert fake.calls[0]["model"] == "gpt-4o"
+        assert fake.calls[0]["data"]["diagram"] == "graph TD\n  A"
+
+    def test_timeout(self, provider, monkeypatch):
+        """Test that a model call over MODIFY_TIMEOUT is cancelled and answered with 504."""
+        fake, client = provider
+        fake.delay = 5
+        monkeypatch.setattr(modify, "MODIFY_TIMEOUT", 0.05)
+
+        response = client.post("/modify", json=modify_body())
+
+        assert response.status_code == 504
+        assert fake.cancelled
+
+    def test_cancelled_when_client_disconnects(self, monkeypatch):
+        """Test that the model call is cancelled once the client has gone away."""
+        monkeypatch.setattr(modify, "DISCONNECT_POLL_INTERVAL", 0.01)
+        fake = FakeProvider(delay=5)
+
+        async def run():
+            await modify.run_until_disconnected(FakeRequest(polls=2), fake.complete("", {}), 10)
+
+        with pytest.raises(modify.ClientDisconnected):
+            asyncio.run(run())
+        assert fake.cancelled
+
+    def test_requests_run_concurrently(self, monkeypatch):
+        """Test that slow modifications share the event loop instead of blocking it."""
+        monkeypatch.setattr(modify, "DISCONNECT_POLL_INTERVAL", 0.01)
+        fake = FakeProvider(delay=0.2)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            results = await asyncio.gather(*(
+                modify.run_until_disconnected(FakeRequest(polls=100), fake.complete("", {}), 10)
+                for _ in range(5)
+            ))
+            return results, loop.time() - start
+
+        results, elapsed = asyncio.run(run())
+
+        assert results == [fake.response] * 5
+        assert elapsed < 0.6
@@ -0,0 +1,74 @@
+"""
+Tests for the compiled repository path filter.
+"""
+
+from app.utils.path_filter import PathFilter
+
+
+class TestPathFilter:
+    """Test suite for PathFilter."""
+
+    def test_default_rules(self):
+        """Test the default dependency, asset and cache exclusions."""
+        path_filter = PathFilter()
+
+        assert path_filter.includes("src/app.py")
+        assert path_filter.includes("docs/changelog.md")
+        assert not path_filter.includes("node_modules/react/index.js")
+        assert not path_filter.includes("packages/web/node_modules/a.js")
+        assert not path_filter.includes("node_modules", is_dir=True)
+        assert not path_filter.includes("public/Logo.PNG")
+        assert not path_filter.includes("static/app.min.js")
+        assert not path_filter.includes("frontend/yarn.lock")
+
+    def test_log_glob_matches(self):
+        """Test that *.log is a real glob rather than a literal substring."""
+        path_filter = PathFilter()
+
+        assert not path_filter.includes("logs/server.log")
+        assert path_filter.includes("src/logger.py")
+
+    def test_extensions_match_exactly(self):
+        """Test that extension rules no longer match substrings of other names."""
+        path_filter = PathFilter()
+
+        assert path_filter.includes("contracts/token.sol")
+        assert path_filter.includes("src/classifier.py")
+        assert not path_filter.includes("lib/native.so")
+
+    def test_anchored_and_negated_rules(self):
+        """Test root-anchored patterns, ** globs and ! re-includes."""
+        path_filter = PathFilter(exclude=["/build/", "docs/**/*.md", "*.txt", "!keep.txt"])
+
+        assert not path_filter.includes("build/out.js")
+        assert path_filter.includes("src/build/out.js")
+        assert not path_filter.includes("docs/a/b/page.md")
+        assert path_filter.includes("docs/page.rst")
+        assert not path_filter.includes("notes.txt")
+        assert path_filter.includes("keep.txt")
+
+    def test_include_rules_keep_parent_directories(self):
+        """Test that include rules keep matching files and the directories above them."""
+        path_filter = PathFilter(exclude=[], include=["*.py"])
+        entries = [
+            ("docs", True),
+            ("docs/index.md", False),
+            ("src", True),
+            ("src/pkg", True),
+            ("src/pkg/app.py", False),
+        ]
+
+        assert path_filter.filter(entries) == ["src", "src/pkg", "src/pkg/app.py"]
+
+    def test_filter_prunes_excluded_directories(self):
+        """Test that everything below an excluded directory is dropped."""
+        path_filter = PathFilter(exclude=["generated/"])
+        entries = [
+            ("generated", True),
+            ("generated/api", True),
+            ("generated/api/client.ts", False),
+            ("src/index.ts", False),
+        ]
+
+        assert path_filter.filter(entries) == ["src/index.ts"]
+        assert path_filter.excludes_dir("generated/api")
@@ -0,0 +1,136 @@
+"""
+Tests for token-budgeted prompt packing.
+"""
+
+import tiktoken
+from app.utils import prompt_packer
+from app.utils.prompt_packer import (
+    get_context_window,
+    get_prompt_budget,
+    get_token_counter,
+    pack_prompt,
+    strip_readme,
+)
+
+
+def count_words(text: str) -> int:
+    """A stand-in tokenizer: one token per word or path."""
+    return len(text.split())
+
+
+def monorepo_entries() -> list[tuple[str, bool]]:
+    entries = [("README.md", False), ("src", True), ("src/main.ts", False), ("src/icons", True)]
+    entries += [(f"src/icons/icon{i}.tsx", False) for i in range(300)]
+    entries += [("src/icons/index.ts", False), ("docs", True), ("docs/guide.md", False)]
+    return entries
+
+
+class TestPromptPacker:
+    """Test suite for the prompt packer."""
+
+    def test_fitting_content_is_unchanged(self):
+        """Test that a tree and README within budget are sent as-is."""
+        entries = [("src", True), ("src/main.py", False)]
+        readme = "# Demo\n\n![logo](logo.png)"
+
+        packed = pack_prompt(entries, readme, 100, count_words)
+
+        assert packed.file_tree == "src\nsrc/main.py"
+        assert packed.readme == readme
+        assert not packed.condensed
+        assert packed.tokens == packed.original_tokens == 5
+
+    def test_strip_readme(self):
+        """Test that badges, images, HTML and comments are removed, but not code."""
+        readme = (
+            "# Demo\n"
+            "[![CI](https://ci/badge.svg)](https://ci)\n"
+            '<p align="center"><img src="logo.png"></p>\n'
+            "<!-- generated -->\n\n\n\n"
+            "Fast ![diagram](d.png) tool.\n"
+            "```html\n<div>kept</div>\n```"
+        )
+
+        assert strip_readme(readme) == (
+            "# Demo\n\n"
+            "Fast  tool.\n"
+            "```html\n<div>kept</div>\n```"
+        )
+
+    def test_collapses_homogeneous_directories(self):
+        """Test that a large directory of one file type becomes a summary line."""
+        packed = pack_prompt(monorepo_entries(), "# Demo", 50, count_words)
+
+        assert packed.file_tree.split("\n") == [
+            "README.md",
+            "src",
+            "src/main.ts",
+            "src/icons",
+            "src/icons/ — 300 .tsx files",
+            "src/icons/index.ts",
+            "docs",
+            "docs/guide.md",
+        ]
+        assert packed.readme == "# Demo"
+        assert packed.tokens <= 50
+        assert packed.original_tokens == 309
+        assert packed.dropped == [
+            "300 files in directories with more than 256 files of one type, summarized"
+        ]
+
+    def test_limits_depth_when_collapsing_is_not_enough(self):
+        """Test that deep trees are summarized by directory below a maximum depth."""
+        entries = [("lib", True)]
+        for i in range(20):
+            entries.append((f"lib/m{i}", True))
+            entries.append((f"lib/m{i}/a.py", False))
+            entries.append((f"lib/m{i}/b.js", False))
+
+        packed = pack_prompt(entries, "", 10, count_words)
+
+        assert packed.file_tree == "lib\nlib/ — 40 files"
+        assert packed.dropped == ["60 entries below depth 1, summarized by directory"]
+
+    def test_truncates_as_a_last_resort(self):
+        """Test that the tree is cut off when no summary fits, and the README is capped."""
+        entries = [(f"file{i}.x{i}", False) for i in range(100)]
+        readme = "\n".join(f"line {i}" for i in range(100))
+
+        packed = pack_prompt(entries, readme, 40, count_words)
+
+        assert packed.tokens <= 40
+        assert packed.readme.startswith("line 0\nline 1\n")
+        assert packed.readme.endswith("more lines omitted")
+        assert packed.file_tree.startswith("file0.x0\nfile1.x1\n")
+        assert packed.dropped[0].startswith("README truncated")
+        assert packed.dropped[-1].startswith("File tree truncated")
+
+    def test_deterministic(self):
+        """Test that the same input always packs to the same prompt."""
+        first = pack_prompt(monorepo_entries(), "# Demo", 20, count_words)
+        second = pack_prompt(monorepo_entries(), "# Demo", 20, count_words)
+
+        assert first == second
+
+    def test_budget(self):
+        """Test that the budget leaves room for fixed prompt parts and responses."""
+        assert get_context_window("claude-3-opus") == 200_000
+        assert get_context_window("openai/gpt-4o-mini") == 128_000
+        assert get_context_window("gpt-4") == 8_192
+
+        budget = get_prompt_budget("claude-3-opus", count_words, "one two three", "")
+
+        assert budget == 200_000 - 2 * 12_000 - 3 - 100
+
+    def test_token_counter_works_offline(self, monkeypatch):
+        """Test that counting falls back to an estimate when the encoding cannot be downloaded."""
+
+        def offline(name):
+            raise ConnectionError("no network")
+
+        monkeypatch.setattr(tiktoken, "get_encoding", offline)
+        prompt_packer._o200k.cache_clear()
+        try:
+            assert get_token_counter("openai")("x" * 400) == 100
+        finally:
+            prompt_packer._o200k.cache_clear()
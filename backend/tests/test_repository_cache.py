@@ -0,0 +1,189 @@
+"""
+Tests for the SHA-keyed repository cache in front of GitHubService.
+"""
+
+import asyncio
+import httpx
+import pytest
+from app.core.cache import MemoryCacheBackend, set_cache_backend
+from app.services import github_service
+from app.services.github_credentials import CredentialPool, GitHubCredential
+from app.services.github_response_cache import response_cache
+from app.services.repository_cache import (
+    artifact_cache_key,
+    get_cached_artifact,
+    get_cached_github_data,
+    snapshot_cache_key,
+    store_artifact,
+)
+from tests.test_github_service import REPO_ROUTES, SHA, github_api
+
+
+@pytest.fixture
+def github(monkeypatch):
+    """Route the shared GitHub client to the mock API and use a fresh cache."""
+    calls = []
+    client = httpx.AsyncClient(
+        base_url="https://api.github.com",
+        transport=httpx.MockTransport(github_api(REPO_ROUTES, calls)),
+    )
+    monkeypatch.setattr(github_service, "_http_client", client)
+    monkeypatch.setenv("GITHUB_PAT", "test-token")
+    cache = MemoryCacheBackend()
+    set_cache_backend(cache)
+    response_cache.clear()
+    yield calls, cache
+    set_cache_backend(None)
+
+
+class TestRepositoryCache:
+    """Test suite for get_cached_github_data."""
+
+    def test_second_call_is_served_from_cache(self, github):
+        """Test that a cached HEAD SHA and snapshot avoid GitHub entirely."""
+        calls, _ = github
+
+        async def main():
+            first = await get_cached_github_data("octo", "demo")
+            second = await get_cached_github_data("octo", "demo")
+            return first, second
+
+        first, second = asyncio.run(main())
+
+        assert first == second
+        assert first.sha == SHA
+        assert len(calls) == 4
+
+    def test_unchanged_head_reuses_snapshot(self, github):
+        """Test that an expired HEAD pointer only costs one SHA lookup."""
+        calls, cache = github
+
+        async def main():
+            await get_cached_github_data("octo", "demo")
+            for key in await cache.keys("head:"):
+                await cache.delete(key)
+            return await get_cached_github_data("octo", "demo")
+
+        data = asyncio.run(main())
+
+        assert data.readme == "# Demo"
+        assert len(calls) == 5
+        assert calls[-1].url.path == "/repos/octo/demo/commits/HEAD"
+
+    def test_artifacts_are_keyed_by_input(self, github):
+        """Test that artifacts are only replayed for identical inputs."""
+
+        async def main():
+            await store_artifact("octo", "demo", SHA, "openai", "gpt-4", "", {"diagram": "graph TD"})
+            same = await get_cached_artifact("octo", "demo", SHA, "openai", "gpt-4", "")
+            other = await get_cached_artifact("octo", "demo", SHA, "openai", "gpt-4", "zoom in")
+            return same, other
+
+        same, other = asyncio.run(main())
+
+        assert same == {"diagram": "graph TD"}
+        assert other is None
+
+    def test_private_snapshots_are_scoped_by_credential(self, github):
+        """Test that a private repository's snapshot and artifacts are keyed by credential scope."""
+        calls, cache = github
+        routes = {
+            **REPO_ROUTES,
+            "/repos/octo/demo": (200, {"default_branch": "trunk", "private": True, "visibility": "private"}),
+        }
+        github_service._http_client._transport = httpx.MockTransport(github_api(routes, calls))
+
+        async def main():
+            data = await get_cached_github_data("octo", "demo")
+            again = await get_cached_github_data("octo", "demo")
+            await store_artifact(
+                "octo", "demo", SHA, "openai", "gpt-4", "", {"diagram": "graph TD"}, scope=data.scope
+            )
+            shared = await get_cached_artifact("octo", "demo", SHA, "openai", "gpt-4", "")
+            scoped = await get_cached_artifact(
+                "octo", "demo", SHA, "openai", "gpt-4", "", scope=data.scope
+            )
+            return data, again, await cache.keys("snapshot:"), shared, scoped
+
+        data, again, keys, shared, scoped = asyncio.run(main())
+
+        assert data.visibility == "private"
+        assert data.scope == github_service.GitHubService().credential_scope()
+        assert again == data
+        assert keys == [snapshot_cache_key("octo", "demo", SHA, scope=data.scope)]
+        assert keys[0] != snapshot_cache_key("octo", "demo", SHA)
+        assert artifact_cache_key("octo", "demo", SHA, "openai", "gpt-4", "", scope=data.scope) != (
+            artifact_cache_key("octo", "demo", SHA, "openai", "gpt-4", "")
+        )
+        assert shared is None
+        assert scoped == {"diagram": "graph TD"}
+
+    def test_anonymous_commit_ref_cannot_read_private_snapshot(self, github):
+        """Test that a SHA ref, which skips the HEAD lookup, does not expose a PAT-fetched snapshot."""
+        calls, _ = github
+        private = github_api({
+            **REPO_ROUTES,
+            "/repos/octo/demo": (200, {"default_branch": "trunk", "private": True, "visibility": "private"}),
+        }, calls)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            # GitHub hides private repositories from anonymous requests
+            if "Authorization" not in request.headers:
+                return httpx.Response(404, json={"message": "Not Found"})
+            return private(request)
+
+        github_service._http_client._transport = httpx.MockTransport(handler)
+        anonymous = github_service.GitHubService(
+            pool=CredentialPool([GitHubCredential("anonymous", limit=60)])
+        )
+
+        async def main():
+            await get_cached_github_data("octo", "demo", github_pat="test-token")
+            return await get_cached_github_data("octo", "demo", source=anonymous, ref=SHA)
+
+        with pytest.raises(ValueError, match="not found"):
+            asyncio.run(main())
+
+    def test_invalid_refs_are_rejected(self, github):
+        """Test that refs git check-ref-format rejects never reach GitHub or the cache."""
+        calls, cache = github
+        refs = [
+            "../../../../user", "/main", "main/", "v1.0#x", "v1.0?x=1", "two words",
+            "tab\tref", "nul\x00", "-main", "a..b", "a//b", ".hidden", "x.lock", "main@{1}", "a~1",
+        ]
+
+        for ref in refs:
+            with pytest.raises(ValueError, match="Invalid ref"):
+                asyncio.run(get_cached_github_data("octo", "demo", ref=ref))
+
+        assert calls == []
+        assert asyncio.run(cache.keys("head:")) == []
+
+    def test_scoped_requests_are_cached_separately(self, github):
+        """Test that a commit ref skips the HEAD lookup and paths get their own snapshot."""
+        calls, cache = github
+        routes = {
+            **REPO_ROUTES,
+            f"/repos/octo/demo/git/trees/{SHA}": (200, {"sha": SHA, "tree": [
+                {"path": "src", "type": "tree", "sha": "b" * 40},
+            ]}),
+            f"/repos/octo/demo/git/trees/{'b' * 40}": (200, {"sha": "b" * 40, "tree": [
+                {"path": "main.py", "type": "blob"},
+            ]}),
+        }
+        github_service._http_client._transport = httpx.MockTransport(github_api(routes, calls))
+
+        async def main():
+            scoped = await get_cached_github_data("octo", "demo", ref=SHA, path="/src/")
+            again = await get_cached_github_data("octo", "demo", ref=SHA, path="src")
+            return scoped, again, await cache.keys("snapshot:")
+
+        scoped, again, keys = asyncio.run(main())
+
+        assert scoped == again
+        assert scoped.file_tree == "src\nsrc/main.py"
+        assert keys == [f"snapshot:octo/demo@{SHA}:src"]
+        assert scoped.visibility == "public" and scoped.scope == ""
+        assert not any(c.url.path.endswith("/commits/HEAD") for c in calls)
+        with pytest.raises(ValueError, match="Invalid path"):
+            asyncio.run(get_cached_github_data("octo", "demo", path="../other"))
@@ -0,0 +1,77 @@
+"""
+Tests for single-flight coalescing of concurrent calls.
+"""
+
+import asyncio
+import pytest
+from app.utils.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test suite for SingleFlight."""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that concurrent callers for one key run the work once."""
+        flight = SingleFlight()
+        runs = 0
+
+        async def work():
+            nonlocal runs
+            runs += 1
+            await asyncio.sleep(0.01)
+            return "tree"
+
+        async def main():
+            return await asyncio.gather(*(flight.do("octo/demo", work) for _ in range(5)))
+
+        assert asyncio.run(main()) == ["tree"] * 5
+        assert runs == 1
+        assert flight.stats() == {"calls": 5, "executions": 1, "coalesced": 4, "in_flight": 0}
+
+    def test_different_keys_run_separately(self):
+        """Test that different keys are not coalesced."""
+        flight = SingleFlight()
+
+        async def main():
+            return await asyncio.gather(
+                flight.do("a", lambda: asyncio.sleep(0, "a")),
+                flight.do("b", lambda: asyncio.sleep(0, "b")),
+            )
+
+        assert asyncio.run(main()) == ["a", "b"]
+        assert flight.coalesced == 0
+
+    def test_errors_reach_every_caller(self):
+        """Test that a failed execution raises for all coalesced callers."""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("Repository not found.")
+
+        async def main():
+            return await asyncio.gather(
+                flight.do("k", work), flight.do("k", work), return_exceptions=True
+            )
+
+        results = asyncio.run(main())
+        assert all(isinstance(r, ValueError) for r in results)
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that cancelling one waiter leaves the shared work running."""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def main():
+            first = asyncio.ensure_future(flight.do("k", work))
+            second = asyncio.ensure_future(flight.do("k", work))
+            await asyncio.sleep(0)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(main()) == "done"
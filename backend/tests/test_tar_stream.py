@@ -0,0 +1,81 @@
+"""
+Tests for the incremental tar stream parser, against archives built with tarfile.
+"""
+
+import gzip
+import io
+import tarfile
+import pytest
+from app.utils.tar_stream import TarStreamParser
+
+
+def build_tar(files: dict, format=tarfile.PAX_FORMAT, compress=True, pax_headers=None) -> bytes:
+    """Builds an archive from {path: bytes | None}; None adds a directory."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w", format=format, pax_headers=pax_headers or {}) as tar:
+        for path, content in files.items():
+            info = tarfile.TarInfo(path)
+            if content is None:
+                info.type = tarfile.DIRTYPE
+                tar.addfile(info)
+            else:
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+    data = buffer.getvalue()
+    return gzip.compress(data) if compress else data
+
+
+def parse(data: bytes, chunk_size: int, **kwargs):
+    parser = TarStreamParser(**kwargs)
+    entries = []
+    for i in range(0, len(data), chunk_size):
+        entries += parser.feed(data[i : i + chunk_size])
+    entries += parser.close()
+    return parser, entries
+
+
+FILES = {
+    "repo-abc/": None,
+    "repo-abc/README.md": b"# Demo\n",
+    "repo-abc/src/main.py": b"print('hi')\n" * 100,
+    "repo-abc/" + "deep/" * 30 + "file.txt": b"x",
+}
+
+
+class TestTarStreamParser:
+    """Test suite for TarStreamParser."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 512, 65536])
+    def test_entries_across_chunk_boundaries(self, chunk_size):
+        """Test that entries parse the same however the stream is split."""
+        data = build_tar(FILES, pax_headers={"comment": "abc123"})
+        parser, entries = parse(data, chunk_size, capture=lambda p: p.endswith("README.md"))
+
+        assert [e.path for e in entries] == [p.rstrip("/") for p in FILES]
+        assert entries[0].is_dir
+        assert entries[1].content == b"# Demo\n"
+        assert entries[2].content is None
+        assert entries[2].size == 1200
+        assert parser.global_headers == {"comment": "abc123"}
+        assert parser.finished
+
+    def test_gnu_long_names(self):
+        """Test GNU long name headers for paths over 100 bytes."""
+        data = build_tar(FILES, format=tarfile.GNU_FORMAT, compress=False)
+        _, entries = parse(data, 4096)
+
+        assert entries[-1].path == "repo-abc/" + "deep/" * 30 + "file.txt"
+
+    def test_captured_content_is_truncated(self):
+        """Test that captured contents never exceed the configured limit."""
+        data = build_tar(FILES)
+        _, entries = parse(data, 4096, capture=lambda p: True, max_content_bytes=10)
+
+        assert entries[2].content == b"print('hi'"
+
+    def test_truncated_archive_raises(self):
+        """Test that an archive cut off mid-entry is reported."""
+        data = build_tar(FILES, compress=False)
+
+        with pytest.raises(ValueError, match="Truncated"):
+            parse(data[:1500], 512)
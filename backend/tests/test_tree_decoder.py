@@ -0,0 +1,83 @@
+"""
+Tests for the incremental GitHub tree response decoder.
+"""
+
+import json
+import pytest
+from app.utils.tree_decoder import TreeStreamDecoder, decode_tree
+
+SHA = "3f786850e387550fdab836ed7e6dc881de23001b"
+
+
+def tree_response(paths, truncated=False) -> bytes:
+    """A /git/trees response in GitHub's layout, with every field we ignore."""
+    tree = [
+        {
+            "path": path,
+            "mode": "040000" if kind == "tree" else "100644",
+            "type": kind,
+            "sha": f"{i:040x}",
+            **({} if kind == "tree" else {"size": 42}),
+            "url": f"https://api.github.com/repos/octo/demo/git/blobs/{i:040x}",
+        }
+        for i, (path, kind) in enumerate(paths)
+    ]
+    return json.dumps(
+        {
+            "sha": SHA,
+            "url": f"https://api.github.com/repos/octo/demo/git/trees/{SHA}",
+            "tree": tree,
+            "truncated": truncated,
+        },
+        indent=1,
+    ).encode()
+
+
+PATHS = [
+    ("src", "tree"),
+    ("src/main.py", "blob"),
+    ('src/{id} "quoted".ts', "blob"),
+    ("docs/café.md", "blob"),
+    ("node_modules", "tree"),
+    ("node_modules/react/index.js", "blob"),
+]
+
+
+class TestTreeStreamDecoder:
+    """Test suite for TreeStreamDecoder."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 13, 4096])
+    def test_matches_json_decoding(self, chunk_size):
+        """Test that chunked decoding yields exactly the paths json.loads would."""
+        data = tree_response(PATHS, truncated=True)
+        decoder = TreeStreamDecoder()
+        for i in range(0, len(data), chunk_size):
+            decoder.feed(data[i : i + chunk_size])
+        decoder.close()
+
+        assert [(p, d) for p, d, _ in decoder.entries] == [
+            (path, kind == "tree") for path, kind in PATHS
+        ]
+        assert decoder.entries[0][2] == f"{0:040x}"
+        assert decoder.entries[1][2] is None
+        assert decoder.sha == SHA
+        assert decoder.truncated
+
+    def test_skip_and_prefix(self):
+        """Test that skipped entries are dropped and prefixes applied while decoding."""
+        decoder = decode_tree(
+            tree_response(PATHS),
+            prefix="pkg/",
+            skip=lambda path, is_dir: "node_modules" in path,
+        )
+
+        assert [p for p, _, _ in decoder.entries][:2] == ["pkg/src", "pkg/src/main.py"]
+        assert len(decoder.entries) == 4
+        assert not decoder.truncated
+
+    def test_incomplete_response_raises(self):
+        """Test that a response cut off inside the tree array is reported."""
+        data = tree_response(PATHS)
+
+        with pytest.raises(ValueError, match="Incomplete"):
+            decode_tree(data[: len(data) // 2])
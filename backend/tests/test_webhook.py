@@ -0,0 +1,121 @@
+"""
+Tests for the GitHub push webhook.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.cache import MemoryCacheBackend, set_cache_backend
+from app.routers import webhook
+
+SECRET = "s3cret"
+
+
+def sign(body: bytes) -> str:
+    return "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+def push(ref="refs/heads/main", after="f" * 40) -> bytes:
+    return json.dumps({
+        "ref": ref,
+        "after": after,
+        "repository": {"full_name": "Octo/Demo", "default_branch": "main"},
+    }).encode()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A client for the webhook router, a fresh cache and a recorded refresh."""
+    monkeypatch.setattr(webhook, "GITHUB_WEBHOOK_SECRET", SECRET)
+    refreshed = []
+
+    async def refresh_repository(username, repo, sha):
+        refreshed.append((username, repo, sha))
+
+    monkeypatch.setattr(webhook, "refresh_repository", refresh_repository)
+    cache = MemoryCacheBackend()
+    set_cache_backend(cache)
+
+    app = FastAPI()
+    app.include_router(webhook.router)
+    yield TestClient(app), cache, refreshed
+    set_cache_backend(None)
+
+
+class TestWebhook:
+    """Test suite for POST /github/webhook."""
+
+    def test_rejects_bad_signature(self, client):
+        """Test that unsigned or wrongly signed deliveries are refused."""
+        client, _, refreshed = client
+        body = push()
+
+        unsigned = client.post("/github/webhook", content=body, headers={"X-GitHub-Event": "push"})
+        forged = client.post(
+            "/github/webhook",
+            content=body,
+            headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": "sha256=" + "0" * 64},
+        )
+
+        assert unsigned.status_code == 401
+        assert forged.status_code == 401
+        assert refreshed == []
+
+    def test_ping(self, client):
+        """Test that GitHub's ping event is acknowledged."""
+        client, _, _ = client
+        body = b'{"zen": "Keep it logically awesome."}'
+
+        response = client.post(
+            "/github/webhook",
+            content=body,
+            headers={"X-GitHub-Event": "ping", "X-Hub-Signature-256": sign(body)},
+        )
+
+        assert response.json()["message"] == "pong"
+
+    def test_push_to_default_branch(self, client):
+        """Test that a push drops the repository's resolved refs and refreshes it."""
+        client, cache, refreshed = client
+
+        async def seed():
+            await cache.set("head:octo/demo:anonymous", "a" * 40)
+            await cache.set("head:octo/demo:anonymous:v1.0", "b" * 40)
+            await cache.set("head:octo/demo2:anonymous", "c" * 40)
+
+        asyncio.run(seed())
+        body = push()
+
+        response = client.post(
+            "/github/webhook",
+            content=body,
+            headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": sign(body)},
+        )
+
+        assert response.json() == {
+            "status": "ok",
+            "repository": "Octo/Demo",
+            "invalidated": 2,
+            "refreshing": True,
+        }
+        assert refreshed == [("Octo", "Demo", "f" * 40)]
+        assert asyncio.run(cache.keys("head:")) == ["head:octo/demo2:anonymous"]
+        assert asyncio.run(cache.get("webhook:octo/demo")) is True
+
+    def test_push_to_other_branch(self, client):
+        """Test that pushes to other branches invalidate without refreshing."""
+        client, _, refreshed = client
+        body = push(ref="refs/heads/feature")
+
+        response = client.post(
+            "/github/webhook",
+            content=body,
+            headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": sign(body)},
+        )
+
+        assert response.json()["refreshing"] is False
+        assert refreshed == []
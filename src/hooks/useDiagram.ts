@@ -58,7 +58,7 @@ export function useDiagram(username: string, repo: string) {
   );
 
   const generateDiagram = useCallback(
-    async (instructions = "", githubPat?: string) => {
+    async (instructions = "", githubPat?: string, regenerate = false) => {
       setState({
         status: "started",
         message: "Starting generation process...",
@@ -90,6 +90,8 @@ export function useDiagram(username: string, repo: string) {
             github_pat: githubPat,
             service: modelConfig.service,
             model: modelConfig.model,
+            // Ask for a fresh generation instead of the cached diagram
+            regenerate,
           }),
         });
         if (!response.ok) {
@@ -524,7 +526,7 @@ export function useDiagram(username: string, repo: string) {
       const github_pat = localStorage.getItem("github_pat");
 
       // Start streaming generation with instructions
-      await generateDiagram(instructions, github_pat ?? undefined);
+      await generateDiagram(instructions, github_pat ?? undefined, true);
     } catch (error) {
       console.error("Error regenerating diagram:", error);
       setError("Failed to regenerate diagram. Please try again later.");